@@ -2,6 +2,7 @@ import 'package:flutter/material.dart';
 import 'package:shared_preferences/shared_preferences.dart';
 import 'port_probe.dart';
 import 'startup_service.dart';
+import 'translation_service.dart';
 
 class SettingsService extends ChangeNotifier {
   ThemeMode _themeMode = ThemeMode.dark;
@@ -112,6 +113,7 @@ class SettingsService extends ChangeNotifier {
   }
 
   Future<void> setLanguage(String langCode) async {
+    await AppTranslations.loadLocale(langCode);
     _language = langCode;
     final prefs = await SharedPreferences.getInstance();
     await prefs.setString('language', langCode);
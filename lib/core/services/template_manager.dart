@@ -1,3 +1,4 @@
+import 'dart:convert';
 import 'dart:io';
 import 'package:archive/archive.dart';
 import 'package:flutter/services.dart';
@@ -5,7 +6,27 @@ import 'package:path/path.dart' as p;
 
 enum TemplateType { laravel, react, vue, nextjs, svelte, angular, nuxt, nodejs, php, fastapi, django, wordpress }
 
+/// Shared blob pack written by tools/make_templates.py: every distinct file
+/// body lives once in `blobs`, and each template maps its paths onto
+/// `[offset, size]` ranges of it (a null entry is a directory).
+class _TemplatePack {
+  final Uint8List blobs;
+  final Map<String, dynamic> blobIndex;
+  final Map<String, dynamic> templates;
+
+  _TemplatePack({
+    required this.blobs,
+    required this.blobIndex,
+    required this.templates,
+  });
+}
+
 class TemplateManager {
+  static const String _packAsset = 'assets/templates/pack.zip';
+  static const String _indexAsset = 'assets/templates/index.json';
+  static Future<_TemplatePack?>? _pack;
+  static Future<Map<String, dynamic>?>? _index;
+
   static const Map<TemplateType, String> _assets = {
     TemplateType.laravel: 'assets/templates/laravel.zip',
     TemplateType.react: 'assets/templates/react.zip',
@@ -21,9 +42,30 @@ class TemplateManager {
     TemplateType.wordpress: 'assets/templates/wordpress.zip',
   };
 
+  /// Compiled template index from tools/template_specs.py, keyed by
+  /// TemplateType name. Lets callers query template metadata without
+  /// loading any archive.
+  static Future<Map<String, dynamic>?> templateIndex() {
+    return _index ??= () async {
+      try {
+        final raw = await rootBundle.loadString(_indexAsset);
+        final json = jsonDecode(raw) as Map<String, dynamic>;
+        final templates = json['templates'] as Map<String, dynamic>;
+        return {
+          for (final entry in templates.values)
+            (entry as Map<String, dynamic>)['templateType'] as String: entry,
+        };
+      } catch (_) {
+        return null;
+      }
+    }();
+  }
+
   static Future<bool> hasTemplate(TemplateType type) async {
     final asset = _assets[type];
     if (asset == null) return false;
+    final index = await templateIndex();
+    if (index != null) return index.containsKey(type.name);
     try {
       await rootBundle.load(asset);
       return true;
@@ -32,18 +74,46 @@ class TemplateManager {
     }
   }
 
+  static Future<_TemplatePack?> _loadPack() {
+    return _pack ??= () async {
+      try {
+        final data = await rootBundle.load(_packAsset);
+        final archive = ZipDecoder().decodeBytes(data.buffer.asUint8List());
+        final blobs = archive.findFile('blobs.bin');
+        final index = archive.findFile('index.json');
+        if (blobs == null || index == null) return null;
+        final json = jsonDecode(utf8.decode(index.content as List<int>)) as Map<String, dynamic>;
+        return _TemplatePack(
+          blobs: blobs.content as Uint8List,
+          blobIndex: json['blobs'] as Map<String, dynamic>,
+          templates: json['templates'] as Map<String, dynamic>,
+        );
+      } catch (_) {
+        return null;
+      }
+    }();
+  }
+
   static Future<void> extractTemplate(TemplateType type, String destinationPath) async {
     final asset = _assets[type];
     if (asset == null) throw Exception('Template not found');
-    final data = await rootBundle.load(asset);
-    final bytes = data.buffer.asUint8List();
-    final archive = ZipDecoder().decodeBytes(bytes);
 
     final destDir = Directory(destinationPath);
     if (!await destDir.exists()) {
       await destDir.create(recursive: true);
     }
 
+    final pack = await _loadPack();
+    final entries = pack?.templates[p.basenameWithoutExtension(asset)] as Map<String, dynamic>?;
+    if (pack != null && entries != null) {
+      await _extractFromPack(pack, entries, destinationPath);
+      return;
+    }
+
+    final data = await rootBundle.load(asset);
+    final bytes = data.buffer.asUint8List();
+    final archive = ZipDecoder().decodeBytes(bytes);
+
     for (final file in archive) {
       final filename = file.name;
       if (filename.isEmpty) continue;
@@ -58,4 +128,26 @@ class TemplateManager {
       }
     }
   }
+
+  static Future<void> _extractFromPack(
+    _TemplatePack pack,
+    Map<String, dynamic> entries,
+    String destinationPath,
+  ) async {
+    for (final entry in entries.entries) {
+      final outPath = p.join(destinationPath, entry.key);
+      final key = entry.value as String?;
+      if (key == null) {
+        await Directory(outPath).create(recursive: true);
+        continue;
+      }
+      final range = pack.blobIndex[key] as List<dynamic>?;
+      if (range == null) throw Exception('Template pack is missing blob $key');
+      final offset = range[0] as int;
+      final size = range[1] as int;
+      final outFile = File(outPath);
+      await outFile.parent.create(recursive: true);
+      await outFile.writeAsBytes(Uint8List.sublistView(pack.blobs, offset, offset + size), flush: true);
+    }
+  }
 }
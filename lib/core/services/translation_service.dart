@@ -1,8 +1,14 @@
+import 'dart:convert';
+
+import 'package:crypto/crypto.dart';
 import 'package:flutter/material.dart';
+import 'package:flutter/services.dart' show rootBundle;
 import 'package:provider/provider.dart';
 import 'settings_service.dart';
 
 class AppTranslations {
+  // English only: the built-in fallback when a catalog is missing or stale.
+  // Other locales live in tools/locales/ and ship only as compiled catalogs.
   static const Map<String, Map<String, String>> translations = {
     'en': {
       'app_name': 'LocalX',
@@ -91,97 +97,46 @@ class AppTranslations {
       'docker_fallback': 'Docker Fallback',
       'checksum_mismatch': 'Bundle checksum mismatch',
     },
-    'fa': {
-      'app_name': 'لوکال‌ایکس',
-      'version_manager': 'مدیریت نسخه‌ها',
-      'scanning': 'در حال اسکن...',
-      'rescan': 'اسکن مجدد',
-      'manage_installed': 'مدیریت نسخه‌های نصب شده',
-      'not_installed': 'نصب نشده',
-      'download': 'دانلود',
-      'available_versions': 'نسخه‌های در دسترس',
-      'active': 'فعال',
-      'installed': 'نصب شده',
-      'use': 'استفاده',
-      'install': 'نصب',
-      'settings': 'تنظیمات',
-      'configure_env': 'پیکربندی محیط توسعه',
-      'appearance': 'ظاهر',
-      'theme': 'پوسته',
-      'choose_theme': 'پوسته دلخواه خود را انتخاب کنید',
-      'light': 'روشن',
-      'dark': 'تاریک',
-      'system': 'سیستم',
-      'language': 'زبان',
-      'choose_language': 'زبان برنامه را انتخاب کنید',
-      'ports': 'پورت‌ها',
-      'general': 'عمومی',
-      'auto_start': 'شروع خودکار سرویس‌ها',
-      'auto_start_desc': 'شروع سرویس‌ها هنگام باز شدن برنامه',
-      'start_minimized': 'شروع به صورت مینیمایز',
-      'start_min_desc': 'هنگام اجرا در System Tray قرار گیرد',
-      'minimize_to_tray': 'مینیمایز به نوار اعلان',
-      'minimize_to_tray_desc': 'هنگام مینیمایز به Tray منتقل می‌شود',
-      'close_to_tray': 'بستن به Tray',
-      'close_to_tray_desc': 'با بستن پنجره همچنان فعال بماند',
-      'about': 'درباره',
-      'dashboard': 'پیشخوان',
-      'projects': 'پروژه‌ها',
-      'services': 'سرویس‌ها',
-      'wizard': 'جادوگر پروژه',
-      'setup': 'راه‌اندازی',
-      'add_project': 'افزودن پروژه',
-      'no_projects': 'هیچ پروژه‌ای وجود ندارد',
-      'add_folder_desc': 'یک پوشه اضافه کنید یا پروژه‌ای جدید بسازید',
-      'custom_domain': 'دامنه سفارشی',
-      'set_custom_url': 'تنظیم آدرس محلی سفارشی',
-      'instead_of_localhost': 'به جای لوکال‌هاست، از آدرس‌های واقعی استفاده کنید:',
-      'domain': 'دامنه',
-      'quick_suggest': 'پیشنهادات سریع',
-      'hosts_mod_info': 'این بخش فایل hosts سیستم را برای اتصال دامنه به 127.0.0.1 تغییر می‌دهد.',
-      'skip': 'پرش',
-      'set_domain': 'ثبت دامنه',
-      'open_browser': 'باز کردن در مرورگر',
-      'terminal': 'ترمینال',
-      'remove': 'حذف',
-      'start_all': 'شروع همه',
-      'stop_all': 'توقف همه',
-      'running': 'در حال اجرا',
-      'stopped': 'متوقف شده',
-      'error': 'خطا',
-      'start': 'شروع',
-      'stop': 'توقف',
-      'restart': 'راه‌اندازی مجدد',
-      'logs': 'لاگ‌ها',
-      'clear': 'پاکسازی',
-      'phpmyadmin': 'پی‌اچ‌پی مای ادمین',
-      'localhost': 'لوکال‌هاست',
-      'wizard_title': 'جادوگر پروژه جدید',
-      'wizard_desc': 'ساخت پروژه‌های جدید با فریم‌ورک‌های مدرن محبوب.',
-      'step_1': '1. انتخاب فریم‌ورک',
-      'step_2': '2. مشخصات پروژه',
-      'step_3': '3. ساخت پروژه',
-      'project_name': 'نام پروژه',
-      'project_location': 'محل نگهداری پروژه',
-      'browse': 'انتخاب پوشه',
-      'next': 'بعدی',
-      'back': 'قبلی',
-      'create': 'ساختن',
-      'creating': 'در حال ساخت پروژه...',
-      'success': 'موفقیت‌آمیز',
-      'project_created': 'پروژه با موفقیت ساخته شد!',
-      'tray_open': 'باز کردن LocalX',
-      'tray_exit': 'خروج',
-      'runtime': 'ران‌تایم',
-      'native': 'بومی',
-      'docker': 'داکر',
-      'docker_fallback': 'داکر (پشتیبان)',
-      'checksum_mismatch': 'ناهمخوانی چک‌سام باندل',
-    }
   };
 
+  // Per-locale catalogs compiled from [translations] and tools/locales/ by
+  // tools/compile_translations.py: one shared key table plus a dense list of
+  // values per locale, loaded only for the locales actually used.
+  static const String _catalogDir = 'assets/translations';
+  static final Map<String, Map<String, String>> _catalogs = {};
+  static Future<List<String>>? _keys;
+  static String? _keysSha256;
+
+  static Future<void> loadLocale(String locale) async {
+    if (_catalogs.containsKey(locale)) return;
+    try {
+      _keys ??= rootBundle.loadString('$_catalogDir/keys.json').then((raw) {
+        final keys = List<String>.from(jsonDecode(raw)['keys'] as List);
+        _keysSha256 = sha256.convert(utf8.encode(raw)).toString();
+        return keys;
+      });
+      final keys = await _keys!;
+      final data = jsonDecode(await rootBundle.loadString('$_catalogDir/$locale.json')) as Map<String, dynamic>;
+      if (data['keysSha256'] != _keysSha256) return;
+      final values = data['values'] as List;
+      final strings = <String, String>{};
+      for (var i = 0; i < keys.length && i < values.length; i++) {
+        final value = values[i];
+        if (value is String) strings[keys[i]] = value;
+      }
+      _catalogs[locale] = strings;
+    } catch (_) {
+      // Missing or stale catalog: tr() falls back to English. A failed
+      // keys.json load is dropped so the next call retries it.
+      if (_keysSha256 == null) _keys = null;
+    }
+  }
+
   static String tr(String locale, String key, [String fallback = '']) {
-    return translations[locale]?[key] ?? translations['en']?[key] ?? (fallback.isEmpty ? key : fallback);
+    return _catalogs[locale]?[key] ??
+        _catalogs['en']?[key] ??
+        translations['en']?[key] ??
+        (fallback.isEmpty ? key : fallback);
   }
 }
 
@@ -172,6 +172,11 @@ class BundleManifestEntry {
   final String sourceUrl;
   final String installMode;
 
+  // Hash of the archive before tools/repack_bundles.py re-encoded it, i.e.
+  // what sourceUrl and older local bundles hold. Same as sha256 for entries
+  // that were never repacked.
+  final String sourceSha256;
+
   const BundleManifestEntry({
     required this.software,
     required this.version,
@@ -180,17 +185,20 @@ class BundleManifestEntry {
     required this.sha256,
     required this.sourceUrl,
     required this.installMode,
+    required this.sourceSha256,
   });
 
   factory BundleManifestEntry.fromJson(Map<String, dynamic> json) {
+    final sha256 = json['sha256'] as String? ?? '';
     return BundleManifestEntry(
       software: json['software'] as String? ?? '',
       version: json['version'] as String? ?? '',
       platform: json['platform'] as String? ?? '',
       archive: json['archive'] as String? ?? '',
-      sha256: json['sha256'] as String? ?? '',
+      sha256: sha256,
       sourceUrl: json['sourceUrl'] as String? ?? '',
       installMode: json['installMode'] as String? ?? 'archive',
+      sourceSha256: json['sourceSha256'] as String? ?? sha256,
     );
   }
 }
@@ -1043,8 +1051,16 @@ class VersionManager extends ChangeNotifier {
       _throwIfCancelled(key);
 
       if (manifestEntry != null) {
+        // The shipped asset is the (possibly repacked) archive; a download
+        // from the vendor is the original one, and a local bundle may be
+        // either.
+        final expected = embeddedBundle != null && localBundle == null
+            ? {manifestEntry.sha256}
+            : localBundle != null
+            ? {manifestEntry.sha256, manifestEntry.sourceSha256}
+            : {manifestEntry.sourceSha256};
         final digest = await _sha256File(downloadPath);
-        if (digest != manifestEntry.sha256) {
+        if (!expected.contains(digest)) {
           throw Exception(
             'Bundle checksum mismatch for ${manifestEntry.archive}',
           );
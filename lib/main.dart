@@ -71,6 +71,7 @@ void main() async {
   final settings = SettingsService();
   await settings.loadSettings();
   await settings.ensureSafeDefaults();
+  await AppTranslations.loadLocale(settings.language);
   await LogService.instance.info('app', 'LocalX starting, version=1.4.0');
 
   // Check if this is the first run
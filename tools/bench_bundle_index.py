@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from bundle_index import OUT_DIR, SeekableBundle, safe_member_name, pak_path_for
+from bundles import BUNDLE_DIR, BUNDLES, CHUNK_SIZE, MANIFEST_PATH, bundle_path, manifest_entries, repacked_entry
+from repack_bundles import iter_members
+
+
+# Binaries the installer or a service start actually needs from each bundle.
+# Source tarballs (php, python, apache on Linux) fall back to their largest
+# member.
+REPRESENTATIVE = {
+    'php': ('php.exe', 'php', 'php-cgi.exe'),
+    'python': ('python.exe', 'python'),
+    'nodejs': ('node.exe', 'node'),
+    'mysql': ('mysqld.exe', 'mysqld'),
+    'apache': ('httpd.exe', 'httpd'),
+    'mailhog': ('MailHog_windows_amd64.exe', 'MailHog_linux_amd64'),
+    'smtp': ('mailpit.exe', 'mailpit'),
+    'websocket': ('websocat.x86_64-pc-windows-gnu.exe', 'websocat.x86_64-unknown-linux-musl'),
+}
+
+
+def pick_members(bundle, pak):
+    found = []
+    for basename in REPRESENTATIVE.get(bundle['software'], ()):
+        found.extend(pak.find(basename))
+    if not found and pak.names():
+        found.append(max(pak.names(), key=lambda n: pak.info(n)['size']))
+    return found
+
+
+def full_extract(src, dest_dir):
+    # Same work as the installer's tar/unzip call: decode and write everything.
+    for member, f in iter_members(src):
+        path = os.path.join(dest_dir, *safe_member_name(member.name).split('/'))
+        if member.isdir():
+            os.makedirs(path, exist_ok=True)
+        elif f is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as out:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    out.write(chunk)
+
+
+def _best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as dest:
+            start = time.perf_counter()
+            fn(dest)
+            timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_bundle(src, pak_path, bundle, repeat):
+    full = _best_of(repeat, lambda dest: full_extract(src, dest))
+    members = {}
+    with SeekableBundle(pak_path) as pak:
+        for name in pick_members(bundle, pak):
+            seconds = _best_of(repeat, lambda dest: pak.extract(name, dest))
+            members[name] = {
+                'bytes': pak.info(name)['size'],
+                'extractSeconds': round(seconds, 4),
+                'speedup': round(full / max(seconds, 1e-9), 1),
+            }
+        member_count = len(pak.names())
+    return {
+        'archiveBytes': os.path.getsize(src),
+        'pakBytes': os.path.getsize(pak_path),
+        'members': member_count,
+        'fullExtractSeconds': round(full, 4),
+        'representative': members,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare single-member extraction from seekable bundles with a full extract.')
+    parser.add_argument('archives', nargs='*', metavar='archive', help='BUNDLES archive paths (default: all indexed)')
+    parser.add_argument('--bundles', default=BUNDLE_DIR, help='bundle directory')
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help='manifest used to find repacked bundles')
+    parser.add_argument('--paks', default=OUT_DIR, help='directory written by bundle_index.py')
+    parser.add_argument('-n', '--repeat', type=int, default=3, help='runs per measurement (fastest is kept)')
+    parser.add_argument('-o', '--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    bundles = [b for b in BUNDLES if not args.archives or b['archive'] in args.archives]
+    unknown = set(args.archives) - {b['archive'] for b in bundles}
+    if unknown:
+        parser.error(f"Unknown bundle(s): {', '.join(sorted(unknown))}")
+
+    manifest = manifest_entries(args.manifest)
+    results = {}
+    for bundle in bundles:
+        repacked = repacked_entry(bundle, manifest, args.bundles)
+        src = bundle_path((repacked or bundle)['archive'], args.bundles)
+        pak_path = pak_path_for(bundle['archive'], args.paks)
+        if not (os.path.isfile(src) and os.path.isfile(pak_path)):
+            continue
+        results[bundle['archive']] = bench_bundle(src, pak_path, bundle, max(args.repeat, 1))
+
+    report = {
+        'schemaVersion': 1,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'bundles': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
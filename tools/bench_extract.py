@@ -0,0 +1,154 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tarfile
+import tempfile
+import zipfile
+
+from bundles import BUNDLE_DIR, BUNDLES, MANIFEST_PATH, bundle_path, manifest_entries, repacked_entry, sha256_file
+from repack_bundles import source_format
+from stream_extract import MODES
+
+
+EXTRACTOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stream_extract.py')
+# One synthetic archive per layout the manifest ships.
+SYNTHETIC_FORMATS = {
+    'tar.xz': 'w:xz',
+    'tar.gz': 'w:gz',
+    'tgz': 'w:gz',
+    'tar': 'w',
+    'zip': zipfile.ZIP_DEFLATED,
+}
+
+
+def _synthetic_files(total_bytes, seed=1):
+    # Roughly what a runtime bundle looks like: one dominant binary, many
+    # small text files, and some incompressible data.
+    rng = random.Random(seed)
+    words = [bytes(rng.choice(b'abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randrange(2, 10))) for _ in range(2000)]
+    yield 'bin/server', rng.randbytes(total_bytes // 4) + b'\0' * (total_bytes // 4)
+    written = total_bytes // 2
+    n = 0
+    while written < total_bytes:
+        size = rng.randrange(1024, 256 * 1024)
+        if n % 4 == 0:
+            data = rng.randbytes(size)
+        else:
+            data = b' '.join(rng.choice(words) for _ in range(size // 6))
+        yield f'lib/{n // 100}/file{n}.dat', data
+        written += len(data)
+        n += 1
+
+
+def make_synthetic(path, fmt, total_bytes):
+    mode = SYNTHETIC_FORMATS[fmt]
+    if isinstance(mode, str):
+        with tarfile.open(path, mode, **({'preset': 6} if mode == 'w:xz' else {})) as tar:
+            for name, data in _synthetic_files(total_bytes):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mode = 0o755
+                tar.addfile(info, io.BytesIO(data))
+    else:
+        with zipfile.ZipFile(path, 'w', mode) as z:
+            for name, data in _synthetic_files(total_bytes):
+                z.writestr(name, data)
+
+
+def run_once(archive, sha256, mode, dest):
+    # Each run is a fresh interpreter, so ru_maxrss is that run's peak.
+    proc = subprocess.run([sys.executable, EXTRACTOR, archive, dest, '--sha256', sha256, '--mode', mode, '--json'],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f'{os.path.basename(archive)} ({mode}): {proc.stderr.strip()}')
+    return json.loads(proc.stdout)
+
+
+def bench_archive(archive, sha256, fmt, repeat):
+    size = os.path.getsize(archive)
+    result = {'format': fmt, 'archiveBytes': size}
+    for mode in MODES:
+        runs = []
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                runs.append(run_once(archive, sha256, mode, os.path.join(tmp, 'out')))
+        best = min(runs, key=lambda r: r['seconds'])
+        peaks = [r['peakRssBytes'] for r in runs if r['peakRssBytes'] is not None]
+        result[mode] = {
+            'seconds': best['seconds'],
+            'throughputMBps': round(size / 1e6 / max(best['seconds'], 1e-9), 1),
+            'peakRssBytes': max(peaks) if peaks else None,
+            'files': best['files'],
+        }
+    stream, two_pass = result['stream'], result['two-pass']
+    result['speedup'] = round(two_pass['seconds'] / max(stream['seconds'], 1e-9), 2)
+    if stream['peakRssBytes'] and two_pass['peakRssBytes']:
+        result['peakRssSavedBytes'] = two_pass['peakRssBytes'] - stream['peakRssBytes']
+    return result
+
+
+def manifest_archives(bundle_dir, manifest_path):
+    # (label, path, sha256, format) for each bundle actually on disk; LFS
+    # pointers that were never fetched are skipped.
+    entries = manifest_entries(manifest_path)
+    for bundle in BUNDLES:
+        entry = repacked_entry(bundle, entries, bundle_dir) or entries.get((bundle['software'], bundle['version'], bundle['platform']))
+        if not entry or not entry.get('sha256'):
+            continue
+        path = bundle_path(entry['archive'], bundle_dir)
+        if not os.path.isfile(path) or not (zipfile.is_zipfile(path) or tarfile.is_tarfile(path)):
+            continue
+        yield bundle['archive'], path, entry['sha256'], entry.get('format') or source_format(entry['archive'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare single-pass hash-and-extract with the current read, hash, then extract flow.')
+    parser.add_argument('--bundles', default=BUNDLE_DIR, help='bundle directory')
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help='manifest listing the bundles and their SHA-256')
+    parser.add_argument('--synthetic-mb', type=int, default=0,
+                        help='also benchmark one synthetic archive of this size per bundle format')
+    parser.add_argument('-n', '--repeat', type=int, default=3, help='runs per measurement (fastest time, highest RSS kept)')
+    parser.add_argument('-o', '--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+    repeat = max(args.repeat, 1)
+
+    results = {}
+    try:
+        for label, path, sha256, fmt in manifest_archives(args.bundles, args.manifest):
+            results[label] = bench_archive(path, sha256, fmt, repeat)
+        if args.synthetic_mb:
+            with tempfile.TemporaryDirectory() as tmp:
+                for fmt in SYNTHETIC_FORMATS:
+                    path = os.path.join(tmp, f'synthetic.{fmt}')
+                    make_synthetic(path, fmt, args.synthetic_mb * 1024 * 1024)
+                    results[f'synthetic.{fmt}'] = bench_archive(path, sha256_file(path), fmt, repeat)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if not results:
+        print('No fetched bundles found; run fetch_bundles.py or pass --synthetic-mb', file=sys.stderr)
+        return 1
+
+    report = {
+        'schemaVersion': 1,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'archives': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from hosts_file import LEGACY_TAG, update
+
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_DOMAINS = 25
+
+
+def synthetic_hosts(entries):
+    # An ad-blocking list: a stock header, then blackhole entries with a
+    # section comment every few hundred lines.
+    lines = ['# Copyright (c) 1993-2009 Microsoft Corp.', '#', '127.0.0.1 localhost', '::1 localhost', '']
+    for i in range(entries):
+        if i % 500 == 0:
+            lines.append(f'# section {i // 500}')
+        lines.append(f'0.0.0.0 ads{i}.tracker{i % 97}.example')
+    return '\n'.join(lines) + '\n'
+
+
+def per_domain(path, domains):
+    # DomainService today: a full read and rewrite for every domain added,
+    # and again for every domain removed.
+    writes = written = 0
+    for domain in domains:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        entry = f'127.0.0.1    {domain}    {LEGACY_TAG}'
+        if entry in content:
+            continue
+        data = f'{content}\n{entry}\n'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        writes, written = writes + 1, written + len(data)
+    for domain in domains:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        data = '\n'.join(line for line in lines if f'{domain}    {LEGACY_TAG}' not in line)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        writes, written = writes + 1, written + len(data)
+    return writes, written
+
+
+def batched(path, domains):
+    writes = written = 0
+    for adds, removes in ((domains, ()), ((), domains)):
+        changed, _ = update(path, adds, removes)
+        if changed:
+            writes, written = writes + 1, written + os.path.getsize(path)
+    return writes, written
+
+
+def _timed(text, fn, domains, repeat):
+    best = None
+    for _ in range(repeat):
+        root = tempfile.mkdtemp(prefix='hosts-')
+        path = os.path.join(root, 'hosts')
+        try:
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+            start = time.perf_counter()
+            writes, written = fn(path, domains)
+            seconds = time.perf_counter() - start
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        best = seconds if best is None else min(best, seconds)
+    return {'seconds': round(best, 4), 'writes': writes, 'bytesWritten': written}
+
+
+def bench_noop(text, domains, repeat):
+    # Re-applying a batch that is already in place: parse and compare only.
+    root = tempfile.mkdtemp(prefix='hosts-')
+    path = os.path.join(root, 'hosts')
+    try:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        update(path, domains)
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            changed, _ = update(path, domains)
+            seconds = time.perf_counter() - start
+            if changed:
+                raise RuntimeError('re-applying an applied batch rewrote the hosts file')
+            best = seconds if best is None else min(best, seconds)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {'seconds': round(best, 4), 'writes': 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare per-domain hosts rewrites with one batched, atomic write on large hosts files.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='hosts entries per synthetic file')
+    parser.add_argument('--domains', type=int, default=DEFAULT_DOMAINS, help='project domains added and then removed')
+    parser.add_argument('-n', '--repeat', type=int, default=3, help='runs per measurement (fastest is kept)')
+    parser.add_argument('-o', '--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    domains = [f'project{i}.local' for i in range(max(args.domains, 1))]
+    repeat = max(args.repeat, 1)
+    results = []
+    for entries in args.sizes:
+        text = synthetic_hosts(entries)
+        row = {
+            'entries': entries,
+            'bytes': len(text.encode('utf-8')),
+            'perDomain': _timed(text, per_domain, domains, repeat),
+            'batched': _timed(text, batched, domains, repeat),
+            'noop': bench_noop(text, domains, repeat),
+        }
+        row['speedup'] = round(row['perDomain']['seconds'] / max(row['batched']['seconds'], 1e-9), 1)
+        results.append(row)
+
+    report = {
+        'schemaVersion': 1,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'domains': len(domains),
+        'sizes': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from query_logs import ACTIVE_NAME, Query, save_index, search, update_index
+
+
+# Matches LogService: 5 MB rotation, DEBUG/INFO/WARN/ERROR, categories as
+# used across lib/core/services.
+ROTATE_BYTES = 5 * 1024 * 1024
+CATEGORIES = ('app', 'system', 'process', 'versions', 'mysql', 'apache', 'php', 'redis',
+              'nodejs', 'postgres', 'mailhog', 'domains', 'projects', 'settings')
+LEVEL_WEIGHTS = (('DEBUG', 12), ('INFO', 80), ('WARN', 6), ('ERROR', 2))
+MESSAGES = (
+    'Service started pid={n} port={p}',
+    'Health check ok in {n}ms',
+    'Process exited with code {n}',
+    'Reloaded configuration from {p}.conf',
+    'Port {p} already in use, retrying',
+    'Download progress {n}%',
+)
+
+
+def generate(logs_dir, total_bytes, span_days=30, seed=1):
+    # Writes rotated files oldest first, named the way LogService renames
+    # them, and leaves the newest part in localx.log.
+    rng = random.Random(seed)
+    levels = [name for name, weight in LEVEL_WEIGHTS for _ in range(weight)]
+    span = timedelta(days=span_days)
+    start = datetime.now() - span
+    written = 0
+    while written < total_bytes:
+        lines = []
+        size = 0
+        while size < ROTATE_BYTES and written + size < total_bytes:
+            # Time advances with the byte position, so the newest record is
+            # written "now" whatever the volume.
+            ts = start + span * ((written + size) / total_bytes)
+            level = rng.choice(levels)
+            message = rng.choice(MESSAGES).format(n=rng.randrange(10000), p=rng.randrange(1024, 65535))
+            line = f'[{ts.isoformat(timespec="microseconds")}] [{level}] [{rng.choice(CATEGORIES)}] {message}\n'
+            if level == 'ERROR' and rng.random() < 0.3:
+                line += '#0      ProcessManager.start (package:localx/core/services/process_manager.dart:120)\n'
+            lines.append(line)
+            size += len(line)
+        data = ''.join(lines).encode('utf-8')
+        written += len(data)
+        name = ACTIVE_NAME if written >= total_bytes else f"localx-{ts.isoformat().replace(':', '-')}.log"
+        with open(os.path.join(logs_dir, name), 'wb') as f:
+            f.write(data)
+    return written
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(logs_dir, repeat=3):
+    index, build_seconds = _timed(lambda: update_index(logs_dir)[0])
+    save_index(logs_dir, index)
+    _, noop_seconds = _timed(lambda: update_index(logs_dir, index))
+
+    now = datetime.now()
+    queries = {
+        'errors mysql last hour': Query(since=(now - timedelta(hours=1)).isoformat(), levels=['ERROR'], categories=['mysql']),
+        'errors mysql last day': Query(since=(now - timedelta(days=1)).isoformat(), levels=['ERROR'], categories=['mysql']),
+        'warnings redis all time': Query(levels=['WARN'], categories=['redis']),
+    }
+    results = {}
+    for name, query in queries.items():
+        timings = {}
+        for mode, idx in (('indexed', index), ('unindexed', None)):
+            best = None
+            for _ in range(repeat):
+                count, seconds = _timed(lambda: sum(1 for _ in search(logs_dir, query, idx)))
+                best = seconds if best is None else min(best, seconds)
+            timings[mode] = {'matches': count, 'seconds': round(best, 4)}
+        timings['speedup'] = round(timings['unindexed']['seconds'] / max(timings['indexed']['seconds'], 1e-9), 1)
+        results[name] = timings
+    return {
+        'indexBuildSeconds': round(build_seconds, 3),
+        'indexRefreshSeconds': round(noop_seconds, 4),
+        'indexBytes': len(json.dumps(index, separators=(',', ':'))),
+        'queries': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark indexed against unindexed LocalX log queries on synthetic logs.')
+    parser.add_argument('--size-mb', type=int, default=2048, help='synthetic log volume to generate')
+    parser.add_argument('--dir', help='reuse or create the synthetic log set here (default: a temporary directory)')
+    parser.add_argument('-n', '--repeat', type=int, default=3, help='runs per query (fastest is kept)')
+    parser.add_argument('-o', '--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        logs_dir = args.dir or tmp
+        os.makedirs(logs_dir, exist_ok=True)
+        if not os.path.exists(os.path.join(logs_dir, ACTIVE_NAME)):
+            generate(logs_dir, args.size_mb * 1024 * 1024)
+        total = sum(os.path.getsize(os.path.join(logs_dir, n)) for n in os.listdir(logs_dir) if n.endswith('.log'))
+        report = dict(run(logs_dir, max(args.repeat, 1)), logBytes=total,
+                      python=platform.python_version(), platform=platform.platform())
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
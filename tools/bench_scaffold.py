@@ -0,0 +1,135 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from scaffold_templates import (
+    DEFAULT_JOBS, INDEX_PATH, ScaffoldError, load_templates, read_plan,
+    scaffold, scaffold_per_file_flush, verify_tree,
+)
+
+
+def filesystem_type(path):
+    # Longest matching mount point in /proc/mounts; None off Linux.
+    path = os.path.realpath(path)
+    best = ('', None)
+    try:
+        with open('/proc/mounts', 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                mount, fs_type = fields[1], fields[2]
+                if (path == mount or path.startswith(mount.rstrip('/') + '/')) and len(mount) > len(best[0]):
+                    best = (mount, fs_type)
+    except OSError:
+        pass
+    return best[1]
+
+
+def default_filesystems():
+    roots = [tempfile.gettempdir()]
+    if os.path.isdir('/dev/shm'):
+        roots.append('/dev/shm')
+    return roots
+
+
+def replicate(files, dirs, expected, copies):
+    # Real templates are a handful of files; copies stand in for the larger
+    # scaffolds (vendor trees, node_modules) where per-file cost dominates.
+    if copies <= 1:
+        return files, dirs, expected
+    return ([(f'copy{i}/{name}', data) for i in range(copies) for name, data in files],
+            [f'copy{i}/{d}' for i in range(copies) for d in dirs],
+            [dict(want, path=f"copy{i}/{want['path']}") for i in range(copies) for want in expected])
+
+
+def _timed(root, fn, files, dirs, expected, repeat):
+    best = None
+    for _ in range(repeat):
+        dest = tempfile.mkdtemp(prefix='scaffold-', dir=root)
+        try:
+            start = time.perf_counter()
+            fn(files, dirs, dest)
+            seconds = time.perf_counter() - start
+            verify_tree(expected, dest)
+        finally:
+            shutil.rmtree(dest, ignore_errors=True)
+        best = seconds if best is None else min(best, seconds)
+    return {'seconds': round(best, 4), 'filesPerSecond': round(len(files) / max(best, 1e-9), 1)}
+
+
+def bench_filesystem(root, plans, jobs, repeat):
+    strategies = {
+        'perFileFlush': scaffold_per_file_flush,
+        'batched': lambda files, dirs, dest: scaffold(files, dirs, dest, jobs),
+    }
+    templates = {}
+    totals = {name: 0.0 for name in strategies}
+    total_files = 0
+    for name, (files, dirs, expected) in plans.items():
+        row = {'files': len(files)}
+        for strategy, fn in strategies.items():
+            row[strategy] = _timed(root, fn, files, dirs, expected, repeat)
+            totals[strategy] += row[strategy]['seconds']
+        row['speedup'] = round(row['perFileFlush']['seconds'] / max(row['batched']['seconds'], 1e-9), 1)
+        templates[name] = row
+        total_files += len(files)
+    return {
+        'path': root,
+        'fsType': filesystem_type(root),
+        'files': total_files,
+        'filesPerSecond': {name: round(total_files / max(seconds, 1e-9), 1) for name, seconds in totals.items()},
+        'speedup': round(totals['perFileFlush'] / max(totals['batched'], 1e-9), 1),
+        'templates': templates,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare batched, parallel-fsync scaffolding with per-file flushing over the template archives.')
+    parser.add_argument('templates', nargs='*', metavar='template', help='templates to scaffold (default: all)')
+    parser.add_argument('--fs', action='append', metavar='DIR',
+                        help='directory on a filesystem to test, e.g. a network home share (repeatable; default: temp dir and /dev/shm)')
+    parser.add_argument('--index', default=INDEX_PATH, help='template index with the expected file hashes')
+    parser.add_argument('--copies', type=int, default=50, help='replicate each template this many times per scaffold')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS, help='writer threads for the batched engine')
+    parser.add_argument('-n', '--repeat', type=int, default=3, help='runs per measurement (fastest is kept)')
+    parser.add_argument('-o', '--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    index = load_templates(args.index)
+    names = args.templates or sorted(index)
+    unknown = set(names) - set(index)
+    if unknown:
+        parser.error(f"Unknown template(s): {', '.join(sorted(unknown))}")
+    try:
+        plans = {}
+        for name in names:
+            files, dirs = read_plan(os.path.join(os.path.dirname(args.index), index[name]['archive']), index[name])
+            plans[name] = replicate(files, dirs, index[name]['files'], max(args.copies, 1))
+        results = [bench_filesystem(root, plans, max(args.jobs, 1), max(args.repeat, 1)) for root in args.fs or default_filesystems()]
+    except (OSError, ScaffoldError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    report = {
+        'schemaVersion': 1,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'copies': args.copies,
+        'jobs': args.jobs,
+        'filesystems': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
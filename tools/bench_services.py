@@ -0,0 +1,387 @@
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RUNTIME_PATH = os.path.join(BASE, 'lib', 'core', 'services', 'service_runtime.dart')
+PROCESS_MANAGER_PATH = os.path.join(BASE, 'lib', 'core', 'services', 'process_manager.dart')
+# Committed beside asset_budget.json, so every checkout compares against the
+# same numbers; --baseline points elsewhere for a machine of its own.
+BASELINE_PATH = os.path.join(BASE, 'tools', 'service_startup_baseline.json')
+
+CASE_RE = re.compile(r"\n      case '(\w+)':\n(.*?)(?=\n      case '|\n      default:)", re.S)
+COMMAND_RE = re.compile(r"command: (?:Platform\.isWindows \? '([^']*)' : )?'([^']*)'")
+ARGS_RE = re.compile(r"args: (?:Platform\.isWindows\s*\?\s*(\[.*?\])\s*:\s*)?(\[.*?\])", re.S)
+ITEM_RE = re.compile(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"|([A-Za-z_]\w*)")
+SERVICE_RE = re.compile(r"_services\['(\w+)'\] = ServiceInfo\((.*?)\);", re.S)
+PORT_RE = re.compile(r'\$\{?port\}?')
+
+# Stand-ins are this script re-entered through a shim named after the real
+# binary, so command lookup on PATH is exercised as it is in the app.
+STAND_IN_PORT = 'LOCALX_BENCH_PORT'
+STAND_IN_DELAY = 'LOCALX_BENCH_DELAY_MS'
+STAND_IN_RSS = 'LOCALX_BENCH_RSS_MB'
+
+
+def default_ports(path=PROCESS_MANAGER_PATH):
+    # ProcessManager's service order, which is also Start All's order.
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    ports = {}
+    for key, body in SERVICE_RE.findall(source):
+        m = re.search(r'defaultPort: (\d+)', body)
+        if m:
+            ports[key] = int(m.group(1))
+    return ports
+
+
+def _parse_list(literal, block, port):
+    items = []
+    for single, double, ident in ITEM_RE.findall(literal[1:-1]):
+        if ident:
+            # A local such as nodejs's inline script.
+            m = re.search(r'final %s =\s*(?:\'((?:[^\'\\]|\\.)*)\'|"((?:[^"\\]|\\.)*)")' % ident, block)
+            if not m:
+                raise ValueError(f'Cannot resolve {ident} in service_runtime.dart')
+            single, double = m.groups()
+        items.append(PORT_RE.sub(str(port), single or double or ''))
+    return items
+
+
+def native_specs(ports, path=RUNTIME_PATH, windows=os.name == 'nt'):
+    # The native command lines ServiceRuntimeResolver.resolve builds, read
+    # without a Dart toolchain.
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    specs = {}
+    for key, block in CASE_RE.findall(source):
+        native = block.split('dockerFallback:')[0]
+        command = COMMAND_RE.search(native)
+        args = ARGS_RE.search(native)
+        if not (command and args) or key not in ports:
+            continue
+        specs[key] = {
+            'command': (command.group(1) if windows else None) or command.group(2),
+            'args': _parse_list((args.group(1) if windows else None) or args.group(2), block, ports[key]),
+            'port': ports[key],
+        }
+    if not specs:
+        raise ValueError(f'No services found in {path}')
+    return specs
+
+
+def port_available(port):
+    try:
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', port))
+        return True
+    except OSError:
+        return False
+
+
+def find_available_port(preferred, max_attempts=20):
+    # PortProbe.findAvailablePort; privileged defaults such as Apache's 80
+    # fall through to an ephemeral port when not running as root.
+    for port in range(preferred, preferred + max_attempts):
+        if port_available(port):
+            return port
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _parse_pin(text):
+    key, sep, port = text.partition('=')
+    if not sep or not port.isdigit():
+        raise ValueError(f'Expected KEY=PORT, got {text!r}')
+    return key, int(port)
+
+
+def write_stand_ins(specs, bin_dir):
+    for spec in specs.values():
+        shim = os.path.join(bin_dir, spec['command'])
+        with open(shim, 'w', encoding='utf-8') as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" --stand-in "$@"\n')
+        os.chmod(shim, 0o755)
+
+
+def stand_in():
+    # Minimal server: optional start-up delay and resident ballast, then
+    # accept until killed.
+    time.sleep(int(os.environ.get(STAND_IN_DELAY, '0')) / 1000)
+    ballast = bytearray(int(os.environ.get(STAND_IN_RSS, '0')) * 1024 * 1024)
+    for i in range(0, len(ballast), 4096):
+        ballast[i] = 1
+    server = socket.create_server(('127.0.0.1', int(os.environ[STAND_IN_PORT])))
+    while True:
+        conn, _ = server.accept()
+        conn.close()
+
+
+def _process_tree(pid):
+    children = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'r') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(name))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, ()))
+    return tree
+
+
+def tree_usage(pid):
+    # (peak RSS bytes, CPU seconds) summed over the service and any workers
+    # it forked, e.g. httpd or postgres. None where /proc is unavailable.
+    if not os.path.isdir('/proc'):
+        return None, None
+    ticks = os.sysconf('SC_CLK_TCK')
+    rss = cpu = 0
+    for member in _process_tree(pid):
+        try:
+            with open(f'/proc/{member}/stat', 'r') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{member}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        rss += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+        cpu += (int(fields[11]) + int(fields[12])) / ticks
+    return rss, round(cpu, 4)
+
+
+def drop_caches():
+    # Needs root on Linux; without it, or elsewhere, "cold" only means a
+    # freshly spawned process.
+    if not os.path.isfile('/proc/sys/vm/drop_caches'):
+        return False
+    try:
+        os.sync()
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3\n')
+        return True
+    except OSError:
+        return False
+
+
+def kill_tree(proc, force):
+    # Services and dev servers fork workers; the whole tree has to go.
+    if os.name == 'nt':
+        subprocess.run(['taskkill', '/T', '/PID', str(proc.pid)] + (['/F'] if force else []), capture_output=True)
+    else:
+        os.killpg(proc.pid, signal.SIGKILL if force else signal.SIGTERM)
+
+
+def _stop(proc):
+    try:
+        kill_tree(proc, force=os.name == 'nt')
+        proc.wait(timeout=5)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        try:
+            kill_tree(proc, force=True)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+
+
+def run_trial(spec, env, timeout, poll):
+    command = shutil.which(spec['command'], path=env.get('PATH'))
+    if command is None:
+        raise FileNotFoundError(f"{spec['command']} not found on PATH")
+    start = time.perf_counter()
+    # NativeServiceRuntime runs from the binary's directory.
+    proc = subprocess.Popen([command] + spec['args'], cwd=os.path.dirname(command), env=env,
+                            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=os.name != 'nt')
+    try:
+        while True:
+            code = proc.poll()
+            if code is not None:
+                raise RuntimeError(f"{spec['command']} exited with code {code} before accepting")
+            try:
+                with socket.create_connection(('127.0.0.1', spec['port']), timeout=poll):
+                    ready = time.perf_counter() - start
+                break
+            except OSError:
+                if time.perf_counter() - start > timeout:
+                    raise RuntimeError(f"{spec['command']} did not accept on port {spec['port']} within {timeout}s")
+                time.sleep(poll)
+        rss, cpu = tree_usage(proc.pid)
+    finally:
+        _stop(proc)
+    return {'readyMs': round(ready * 1000, 3), 'peakRssBytes': rss, 'cpuSeconds': cpu}
+
+
+def _summarize(runs):
+    ready = [r['readyMs'] for r in runs]
+    summary = {
+        'medianMs': round(statistics.median(ready), 3),
+        'minMs': min(ready),
+        'maxMs': max(ready),
+        'runs': runs,
+    }
+    for key in ('peakRssBytes', 'cpuSeconds'):
+        values = [r[key] for r in runs if r[key] is not None]
+        summary[key] = statistics.median(values) if values else None
+    return summary
+
+
+def bench_service(spec, env, cold, warm, timeout, poll):
+    result = {'command': spec['command'], 'args': spec['args'], 'port': spec['port']}
+    runs = []
+    for _ in range(cold):
+        dropped = drop_caches()
+        runs.append(dict(run_trial(spec, env, timeout, poll), cacheDropped=dropped))
+    if runs:
+        result['cold'] = _summarize(runs)
+    if warm:
+        run_trial(spec, env, timeout, poll)
+        result['warm'] = _summarize([run_trial(spec, env, timeout, poll) for _ in range(warm)])
+    return result
+
+
+def compare(report, baseline, tolerance, min_delta_ms):
+    # Slower by more than tolerance and by at least min_delta_ms, so
+    # sub-millisecond jitter on fast services does not fail the run.
+    regressions = []
+    for key, current in report['services'].items():
+        previous = baseline.get('services', {}).get(key)
+        if not previous or 'error' in current or 'error' in previous:
+            continue
+        for phase in ('cold', 'warm'):
+            now, then = current.get(phase), previous.get(phase)
+            if not (now and then):
+                continue
+            delta = now['medianMs'] - then['medianMs']
+            if delta > min_delta_ms and delta > then['medianMs'] * tolerance:
+                regressions.append(f"{key} {phase}: {then['medianMs']}ms -> {now['medianMs']}ms")
+            if now['peakRssBytes'] and then['peakRssBytes'] and now['peakRssBytes'] > then['peakRssBytes'] * (1 + tolerance):
+                regressions.append(f"{key} {phase}: peak RSS {then['peakRssBytes']} -> {now['peakRssBytes']} bytes")
+    return regressions
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['--stand-in']:
+        return stand_in()
+
+    parser = argparse.ArgumentParser(description='Measure time from launch to first accepted connection for each LocalX service.')
+    parser.add_argument('services', nargs='*', metavar='service', help='service keys (default: all, in Start All order)')
+    parser.add_argument('--path', action='append', default=[], help='directory to search for service binaries first (repeatable)')
+    parser.add_argument('--port', action='append', default=[], metavar='KEY=PORT',
+                        help='port a service really listens on, e.g. apache=8080 when httpd.conf sets it')
+    parser.add_argument('--stand-ins', action='store_true', help='launch local stand-in servers instead of the real binaries')
+    parser.add_argument('--stand-in-delay-ms', type=int, default=0, help='start-up delay each stand-in simulates')
+    parser.add_argument('--stand-in-rss-mb', type=int, default=0, help='memory each stand-in touches before listening')
+    parser.add_argument('--cold', type=int, default=3, help='cold trials per service (page cache dropped when root)')
+    parser.add_argument('--warm', type=int, default=5, help='warm trials per service, after one unmeasured launch')
+    parser.add_argument('--poll-ms', type=float, default=1.0, help='interval between connection attempts')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for a service to accept')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='earlier report to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown or RSS growth as a fraction')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help='ignore slowdowns smaller than this')
+    parser.add_argument('-o', '--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+    if args.stand_ins and os.name == 'nt':
+        parser.error('--stand-ins is POSIX only: its shims are /bin/sh scripts')
+
+    try:
+        ports = default_ports()
+        pinned = dict(_parse_pin(p) for p in args.port)
+        keys = [k for k in ports if not args.services or k in args.services]
+        unknown = (set(args.services) | set(pinned)) - set(ports)
+        if unknown:
+            parser.error(f"Unknown service(s): {', '.join(sorted(unknown))}")
+        # Resolved up front the way ProcessManager moves a busy port, then
+        # substituted into the command lines.
+        specs = native_specs({k: pinned.get(k) or find_available_port(ports[k]) for k in keys})
+    except (FileNotFoundError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    keys = [k for k in keys if k in specs]
+
+    with tempfile.TemporaryDirectory() as bin_dir:
+        env = dict(os.environ)
+        search = list(args.path)
+        if args.stand_ins:
+            write_stand_ins(specs, bin_dir)
+            search.insert(0, bin_dir)
+            env[STAND_IN_DELAY] = str(args.stand_in_delay_ms)
+            env[STAND_IN_RSS] = str(args.stand_in_rss_mb)
+        env['PATH'] = os.pathsep.join(search + [env.get('PATH', '')])
+
+        results = {}
+        for key in keys:
+            spec = specs[key]
+            env[STAND_IN_PORT] = str(spec['port'])
+            try:
+                results[key] = bench_service(spec, env, max(args.cold, 0), max(args.warm, 0), args.timeout, args.poll_ms / 1000)
+            except (OSError, RuntimeError) as e:
+                results[key] = {'command': spec['command'], 'error': str(e)}
+                print(f'{key}: {e}', file=sys.stderr)
+
+    ready = [r['warm']['medianMs'] for r in results.values() if 'warm' in r]
+    report = {
+        'schemaVersion': 1,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'standIns': args.stand_ins,
+        'trials': {'cold': args.cold, 'warm': args.warm},
+        # ProcessManager.startAll awaits each service in turn.
+        'startAllWarmMs': round(sum(ready), 3),
+        'services': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    status = 0
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = None
+    if baseline and not args.save_baseline:
+        if baseline.get('standIns') != args.stand_ins:
+            print('baseline was recorded with different --stand-ins; not compared', file=sys.stderr)
+        else:
+            regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+            for line in regressions:
+                print(f'regression: {line}', file=sys.stderr)
+            status = 1 if regressions else 0
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        tmp_path = args.baseline + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        os.replace(tmp_path, args.baseline)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import argparse
+import calendar
+import io
+import json
+import lzma
+import platform
+import statistics
+import sys
+import tarfile
+import time
+import tracemalloc
+import zipfile
+
+from make_templates import ZIP_DATE_TIME, pack_zip, render_files, template_index
+
+
+TAR_MTIME = calendar.timegm(ZIP_DATE_TIME)
+
+
+def pack_tar(files, mode):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode, format=tarfile.PAX_FORMAT, **_tar_options(mode)) as tar:
+        for path in sorted(files):
+            content = files[path]
+            info = tarfile.TarInfo(path.rstrip('/'))
+            info.mtime = TAR_MTIME
+            if content is None:
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                tar.addfile(info)
+            else:
+                info.mode = 0o644
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+    return buf.getvalue()
+
+
+def _tar_options(mode):
+    if mode == 'w:gz':
+        return {'compresslevel': 9}
+    if mode == 'w:xz':
+        return {'preset': 9 | lzma.PRESET_EXTREME}
+    return {}
+
+
+def _zip_variant(compression, level=None):
+    def pack(files):
+        return pack_zip(files, compression, level)
+
+    def unpack(data):
+        total = 0
+        with zipfile.ZipFile(io.BytesIO(data)) as z:
+            for info in z.infolist():
+                if not info.is_dir():
+                    total += len(z.read(info))
+        return total
+
+    def overhead(data, files):
+        with zipfile.ZipFile(io.BytesIO(data)) as z:
+            payload = sum(i.compress_size for i in z.infolist())
+        return (len(data) - payload) / max(len(files), 1)
+
+    return pack, unpack, overhead
+
+
+def _tar_variant(mode):
+    def pack(files):
+        return pack_tar(files, mode)
+
+    def unpack(data):
+        total = 0
+        with tarfile.open(fileobj=io.BytesIO(data), mode='r:*') as tar:
+            for member in tar:
+                if member.isfile():
+                    total += len(tar.extractfile(member).read())
+        return total
+
+    def overhead(data, files):
+        # A solid stream has no per-entry payload boundary, so report the
+        # header and padding cost of the uncompressed tar instead.
+        raw = pack_tar(files, 'w')
+        payload = sum(len(c) for c in files.values() if c is not None)
+        return (len(raw) - payload) / max(len(files), 1)
+
+    return pack, unpack, overhead
+
+
+VARIANTS = {'zip-stored': _zip_variant(zipfile.ZIP_STORED)}
+for _level in range(1, 10):
+    VARIANTS[f'zip-deflate{_level}'] = _zip_variant(zipfile.ZIP_DEFLATED, _level)
+VARIANTS['zip-lzma'] = _zip_variant(zipfile.ZIP_LZMA)
+VARIANTS['tar-gz'] = _tar_variant('w:gz')
+VARIANTS['tar-xz'] = _tar_variant('w:xz')
+
+
+def measure(files, variant, repeat):
+    pack, unpack, overhead = VARIANTS[variant]
+    data = pack(files)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        unpack(data)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        unpack(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'archiveBytes': len(data),
+        'decompressMedianMs': round(statistics.median(timings) * 1000, 4),
+        'decompressMinMs': round(min(timings) * 1000, 4),
+        'peakMemoryBytes': peak,
+        'entryOverheadBytes': round(overhead(data, files), 2),
+    }
+
+
+def run(names=None, variants=None, repeat=20):
+    templates = template_index()
+    names = list(names) if names else list(templates)
+    variants = list(variants) if variants else list(VARIANTS)
+    unknown = [n for n in names if n not in templates] + [v for v in variants if v not in VARIANTS]
+    if unknown:
+        raise ValueError(f"Unknown template(s) or variant(s): {', '.join(unknown)}")
+
+    templates = {}
+    for name in names:
+        files = render_files(name)
+        results = {v: measure(files, v, repeat) for v in variants}
+        templates[name] = {
+            'entries': len(files),
+            'uncompressedBytes': sum(len(c) for c in files.values() if c is not None),
+            'smallest': min(results, key=lambda v: results[v]['archiveBytes']),
+            'fastestDecompress': min(results, key=lambda v: results[v]['decompressMedianMs']),
+            'variants': results,
+        }
+
+    totals = {}
+    for v in variants:
+        totals[v] = {
+            'archiveBytes': sum(t['variants'][v]['archiveBytes'] for t in templates.values()),
+            'decompressMedianMs': round(sum(t['variants'][v]['decompressMedianMs'] for t in templates.values()), 4),
+        }
+
+    return {
+        'schemaVersion': 1,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'templates': templates,
+        'totals': totals,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark archive formats for LocalX project templates.')
+    parser.add_argument('names', nargs='*', metavar='name', help='templates to benchmark (default: all)')
+    parser.add_argument('--variant', action='append', dest='variants', metavar='NAME',
+                        help=f"variant to include, repeatable (default: all of {', '.join(VARIANTS)})")
+    parser.add_argument('-n', '--repeat', type=int, default=20, help='decompression runs per measurement')
+    parser.add_argument('-o', '--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    try:
+        report = run(args.names, args.variants, max(args.repeat, 1))
+    except ValueError as e:
+        parser.error(str(e))
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+import warm_cache
+from bench_services import find_available_port, kill_tree
+from make_templates import OUT_DIR
+from scaffold_templates import ScaffoldError, load_templates, read_plan, scaffold
+from template_specs import INDEX_PATH
+
+
+DEFAULT_NPM_REGISTRY = 'https://registry.npmjs.org'
+DEFAULT_PYPI_INDEX = 'https://pypi.org'
+DEFAULT_TIMEOUT = 600
+POLL_SECONDS = 0.05
+VITE_DEV = ['npm', 'run', 'dev', '--', '--port', '{port}', '--strictPort']
+# How each template is first run after creation; {port} and {python} are
+# filled in per run.
+DEV_COMMANDS = {
+    'react': VITE_DEV,
+    'vue': VITE_DEV,
+    'svelte': VITE_DEV,
+    'next': ['npm', 'run', 'dev', '--', '-p', '{port}'],
+    'nuxt': ['npm', 'run', 'dev', '--', '--port', '{port}'],
+    'angular': ['npm', 'start', '--', '--port', '{port}'],
+    'fastapi': ['{python}', '-m', 'uvicorn', 'main:app', '--port', '{port}'],
+    'django': ['{python}', 'manage.py', 'runserver', '{port}', '--noreload'],
+}
+
+
+class BenchError(Exception):
+    pass
+
+
+def _run(command, cwd, timeout):
+    exe = shutil.which(command[0]) or command[0]
+    result = subprocess.run([exe] + command[1:], cwd=cwd, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise BenchError(f"{' '.join(command)} failed in {cwd}:\n{result.stdout[-2000:]}")
+
+
+def venv_python(project):
+    if os.name == 'nt':
+        return os.path.join(project, '.venv', 'Scripts', 'python.exe')
+    return os.path.join(project, '.venv', 'bin', 'python')
+
+
+def install(kind, project, mode, args, scratch):
+    # Every run starts from an empty package-manager cache, as on a machine
+    # that has never installed these packages.
+    if kind == 'npm':
+        command = (['npm', 'ci', '--offline'] if mode == 'pack' else ['npm', 'install', '--registry', args.npm_registry])
+        _run(command + ['--no-audit', '--no-fund', '--cache', os.path.join(scratch, 'npm-cache')], project, args.timeout)
+        return
+    _run([sys.executable, '-m', 'venv', '.venv'], project, args.timeout)
+    pip = [venv_python(project), '-m', 'pip', 'install', '--no-cache-dir', '--disable-pip-version-check']
+    if mode == 'pack':
+        _run(pip + ['--no-index', '--find-links', warm_cache.DEPS_DIR, '-r', warm_cache.PYPI_LOCKFILE], project, args.timeout)
+    else:
+        _run(pip + ['--index-url', args.pypi_index.rstrip('/') + '/simple', '-r', 'requirements.txt'], project, args.timeout)
+
+
+def _accepting(port):
+    # Dev servers bind 'localhost', which is ::1 first on some machines.
+    for host in ('127.0.0.1', '::1'):
+        try:
+            with socket.create_connection((host, port), timeout=POLL_SECONDS):
+                return True
+        except OSError:
+            pass
+    return False
+
+
+def _stop(proc):
+    try:
+        kill_tree(proc, force=os.name == 'nt')
+        proc.wait(timeout=10)
+    except ProcessLookupError:
+        pass
+    except subprocess.TimeoutExpired:
+        try:
+            kill_tree(proc, force=True)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+
+
+def first_dev_run(template, project, timeout):
+    # Seconds from launching the dev command until its server accepts.
+    port = find_available_port(5173)
+    command = [part.format(port=port, python=venv_python(project)) for part in DEV_COMMANDS[template]]
+    command[0] = shutil.which(command[0]) or command[0]
+    log_path = os.path.join(project, '.localx-dev.log')
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.Popen(command, cwd=project, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                                start_new_session=os.name != 'nt')
+        try:
+            while not _accepting(port):
+                if proc.poll() is not None or time.perf_counter() - start > timeout:
+                    with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+                        tail = f.read()[-2000:]
+                    raise BenchError(f'{template} dev server did not accept on port {port}:\n{tail}')
+                time.sleep(POLL_SECONDS)
+            return time.perf_counter() - start
+        finally:
+            _stop(proc)
+
+
+def run_once(template, plan, kind, mode, pack_path, args):
+    scratch = tempfile.mkdtemp(prefix='warm-cache-')
+    project = os.path.join(scratch, 'project')
+    try:
+        start = time.perf_counter()
+        scaffold(*plan, project, durable=False)
+        if mode == 'pack':
+            warm_cache.restore_pack(pack_path, project)
+        scaffolded = time.perf_counter()
+        install(kind, project, mode, args, scratch)
+        installed = time.perf_counter()
+        dev = first_dev_run(template, project, args.timeout)
+        return {
+            'scaffoldSeconds': round(scaffolded - start, 3),
+            'installSeconds': round(installed - scaffolded, 3),
+            'devReadySeconds': round(dev, 3),
+            'totalSeconds': round(installed - start + dev, 3),
+        }
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def bench_template(template, entry, templates_dir, packs_dir, modes, args):
+    plan = read_plan(os.path.join(templates_dir, entry['archive']), entry)
+    kind = warm_cache.ecosystem(dict(plan[0]))
+    pack_path = os.path.join(packs_dir, warm_cache.pack_name(template))
+    if 'pack' in modes and not os.path.exists(pack_path):
+        raise BenchError(f'{pack_path} not found; build it with make_templates.py --warm-cache')
+    row = {'ecosystem': kind}
+    if os.path.exists(pack_path):
+        row['packBytes'] = os.path.getsize(pack_path)
+    for mode in modes:
+        runs = [run_once(template, plan, kind, mode, pack_path, args) for _ in range(args.repeat)]
+        row[mode] = dict(min(runs, key=lambda r: r['totalSeconds']), runs=len(runs))
+    if 'pack' in row and 'resolve' in row:
+        row['speedup'] = round(row['resolve']['totalSeconds'] / max(row['pack']['totalSeconds'], 1e-9), 1)
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Time from creating a project to its first dev server, installing from the warm-cache pack '
+                    'versus resolving against a registry.')
+    parser.add_argument('templates', nargs='*', metavar='template', help=f"templates to run (default: {', '.join(DEV_COMMANDS)})")
+    parser.add_argument('--index', default=INDEX_PATH, help='template index with the expected file hashes')
+    parser.add_argument('--packs', default=os.path.join(OUT_DIR, 'deps'), help='directory holding the <template>.deps.zip packs')
+    parser.add_argument('--npm-registry', default=DEFAULT_NPM_REGISTRY, help='registry the no-pack runs install from')
+    parser.add_argument('--pypi-index', default=DEFAULT_PYPI_INDEX, help='index the no-pack runs install from')
+    parser.add_argument('--mode', choices=('pack', 'resolve'), action='append', help='run only this mode (repeatable; default: both)')
+    parser.add_argument('-n', '--repeat', type=int, default=1, help='runs per template and mode (fastest is kept)')
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT, help='seconds allowed per install and per dev start')
+    parser.add_argument('-o', '--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+    args.repeat = max(args.repeat, 1)
+
+    index = load_templates(args.index)
+    names = args.templates or [n for n in DEV_COMMANDS if n in index]
+    unknown = [n for n in names if n not in DEV_COMMANDS or n not in index]
+    if unknown:
+        parser.error(f"No dev command for template(s): {', '.join(unknown)}")
+    modes = args.mode or ['pack', 'resolve']
+    results = {}
+    try:
+        for name in names:
+            results[name] = bench_template(name, index[name], os.path.dirname(args.index), args.packs, modes, args)
+    except (OSError, zipfile.BadZipFile, subprocess.TimeoutExpired, ScaffoldError,
+            warm_cache.WarmCacheError, BenchError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    report = {
+        'schemaVersion': 1,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'npmRegistry': args.npm_registry,
+        'pypiIndex': args.pypi_index,
+        'templates': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from bundles import (
+    BASE, BUNDLE_DIR, BUNDLES, DELTA_KEY, ENTRY_KEYS, MANIFEST_PATH, REPACK_KEYS,
+    bundle_path, entry_key, generated_at, load_manifest, manifest_entries, repacked_entry,
+    sha256_file, write_manifest,
+)
+
+
+HASH_CACHE_PATH = os.path.join(BASE, 'tools', '.cache', 'bundle_hashes.json')
+DEFAULT_JOBS = min(8, os.cpu_count() or 1)
+
+
+def load_hash_cache(path=HASH_CACHE_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_hash_cache(cache, path=HASH_CACHE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def hash_bundles(archives, bundle_dir=BUNDLE_DIR, jobs=DEFAULT_JOBS, cache=None):
+    # hashlib and file reads both release the GIL, so threads hash several
+    # archives at disk speed without the cost of worker processes.
+    digests = {}
+    pending = []
+    for archive in archives:
+        path = bundle_path(archive, bundle_dir)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f'Bundle file not found: {path}')
+        st = os.stat(path)
+        key = os.path.abspath(path)
+        hit = cache.get(key) if cache is not None else None
+        if hit and hit['size'] == st.st_size and hit['mtimeNs'] == st.st_mtime_ns:
+            digests[archive] = hit['sha256']
+        else:
+            pending.append((archive, key, st))
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        hashed = pool.map(sha256_file, [key for _, key, _ in pending])
+        for (archive, key, st), digest in zip(pending, hashed):
+            digests[archive] = digest
+            if cache is not None:
+                cache[key] = {'size': st.st_size, 'mtimeNs': st.st_mtime_ns, 'sha256': digest}
+    return digests, len(pending)
+
+
+def build_manifest(bundle_dir=BUNDLE_DIR, manifest_path=MANIFEST_PATH, jobs=DEFAULT_JOBS, use_cache=True,
+                   keep_missing=False):
+    # keep_missing lets a partial tree (a selective fetch) refresh the bundles
+    # it has while carrying the existing entries for the rest over unchanged.
+    previous = manifest_entries(manifest_path)
+    sources = []
+    for bundle in BUNDLES:
+        repacked = repacked_entry(bundle, previous, bundle_dir)
+        if repacked:
+            bundle = dict(bundle, archive=repacked['archive'], **{k: repacked[k] for k in REPACK_KEYS if k in repacked})
+        prev = previous.get(entry_key(bundle))
+        deltas = [d for d in (prev or {}).get(DELTA_KEY, []) if os.path.isfile(bundle_path(d['archive'], bundle_dir))]
+        if deltas:
+            bundle = dict(bundle, **{DELTA_KEY: deltas})
+        sources.append(bundle)
+
+    kept = {}
+    if keep_missing:
+        for bundle in sources:
+            if not os.path.isfile(bundle_path(bundle['archive'], bundle_dir)):
+                kept[entry_key(bundle)] = previous.get(entry_key(bundle))
+
+    cache = load_hash_cache() if use_cache else None
+    present = [b['archive'] for b in sources if entry_key(b) not in kept]
+    digests, hashed = hash_bundles(present, bundle_dir, jobs, cache)
+    if cache is not None and hashed:
+        save_hash_cache(cache)
+
+    entries = []
+    for bundle in sources:
+        if entry_key(bundle) in kept:
+            entry = kept[entry_key(bundle)]
+            if entry:
+                entries.append({k: entry[k] for k in ENTRY_KEYS + REPACK_KEYS + (DELTA_KEY,) if k in entry})
+            continue
+        entry = dict(bundle, sha256=digests[bundle['archive']])
+        entries.append({k: entry[k] for k in ENTRY_KEYS + REPACK_KEYS + (DELTA_KEY,) if k in entry})
+
+    try:
+        current = load_manifest(manifest_path)
+    except (FileNotFoundError, ValueError):
+        current = None
+    if current and current.get('schemaVersion') == 1 and current.get('entries') == entries:
+        return False, hashed
+
+    write_manifest({'schemaVersion': 1, 'generatedAt': generated_at(), 'entries': entries}, manifest_path)
+    return True, hashed
+
+
+def verify_manifest(bundle_dir=BUNDLE_DIR, manifest_path=MANIFEST_PATH, jobs=DEFAULT_JOBS):
+    entries = load_manifest(manifest_path).get('entries', [])
+    entries = entries + [d for e in entries for d in e.get(DELTA_KEY, [])]
+    present = [e for e in entries if os.path.isfile(bundle_path(e['archive'], bundle_dir))]
+    digests, _ = hash_bundles([e['archive'] for e in present], bundle_dir, jobs)
+
+    problems = []
+    for entry in entries:
+        actual = digests.get(entry['archive'])
+        if actual is None:
+            problems.append((entry['archive'], entry.get('sha256'), None))
+        elif actual != entry.get('sha256'):
+            problems.append((entry['archive'], entry.get('sha256'), actual))
+    return len(entries), problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or verify assets/bundles/manifest.json.')
+    parser.add_argument('--verify', action='store_true', help='re-hash every manifest entry and report mismatches')
+    parser.add_argument('--bundles', default=BUNDLE_DIR, help='bundle directory')
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help='manifest path')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS, help='concurrent hash workers')
+    parser.add_argument('--no-cache', action='store_true', help='ignore the size/mtime hash cache')
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        try:
+            total, problems = verify_manifest(args.bundles, args.manifest, args.jobs)
+        except (FileNotFoundError, ValueError) as e:
+            print(f'Cannot read manifest: {e}', file=sys.stderr)
+            return 1
+        for archive, expected, actual in problems:
+            print(f"{'MISSING' if actual is None else 'MISMATCH'} {archive} expected={expected} actual={actual}")
+        print(f'{total - len(problems)}/{total} bundles ok')
+        return 1 if problems else 0
+
+    try:
+        written, hashed = build_manifest(args.bundles, args.manifest, args.jobs, use_cache=not args.no_cache)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    state = 'written to' if written else 'unchanged at'
+    print(f'Manifest {state} {args.manifest} ({hashed} of {len(BUNDLES)} bundles hashed)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import json
+import os
+import platform
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+
+BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PUBSPEC_PATH = os.path.join(BASE, 'pubspec.yaml')
+HISTORY_PATH = os.path.join(BASE, 'tools', '.cache', 'build_trace_history.jsonl')
+
+# None while tracing is off, so an untraced build pays one attribute check
+# per stage.
+_events = None
+
+
+class Span:
+    # Filled in by the stage while it runs; only recorded when tracing is on.
+    __slots__ = ('bytes_in', 'bytes_out', 'files')
+
+    def __init__(self):
+        self.bytes_in = None
+        self.bytes_out = None
+        self.files = None
+
+
+def enable():
+    global _events
+    _events = []
+
+
+def enabled():
+    return _events is not None
+
+
+def events():
+    return list(_events or ())
+
+
+def extend(recorded):
+    # Spans returned from worker processes.
+    if _events is not None:
+        _events.extend(recorded)
+
+
+@contextmanager
+def span(name, cat='build', **args):
+    s = Span()
+    if _events is None:
+        yield s
+        return
+    start = time.perf_counter_ns()
+    # Thread CPU, so stages running side by side in a pool are not charged
+    # for each other.
+    cpu_start = time.thread_time_ns()
+    try:
+        yield s
+    finally:
+        args = dict(args, cpuMs=round((time.thread_time_ns() - cpu_start) / 1e6, 3))
+        for key, value in (('bytesIn', s.bytes_in), ('bytesOut', s.bytes_out), ('files', s.files)):
+            if value is not None:
+                args[key] = value
+        # perf_counter is a system-wide monotonic clock on Linux, macOS and
+        # Windows, so spans from worker processes line up with the parent's.
+        _events.append({
+            'name': name,
+            'cat': cat,
+            'ph': 'X',
+            'ts': start / 1000,
+            'dur': (time.perf_counter_ns() - start) / 1000,
+            'pid': os.getpid(),
+            'tid': threading.get_native_id(),
+            'args': args,
+        })
+
+
+def _label(event):
+    # The argument identifying what a span worked on, e.g. template or size.
+    detail = {k: v for k, v in event['args'].items() if k not in ('cpuMs', 'bytesIn', 'bytesOut', 'files')}
+    return ' '.join(f'{k}={v}' for k, v in detail.items())
+
+
+def summarize(recorded, top=5):
+    stages = {}
+    for e in recorded:
+        row = stages.setdefault(e['name'], {'count': 0, 'wallMs': 0.0, 'cpuMs': 0.0, 'bytesIn': 0, 'bytesOut': 0, 'files': 0})
+        row['count'] += 1
+        row['wallMs'] += e['dur'] / 1000
+        row['cpuMs'] += e['args']['cpuMs']
+        for key in ('bytesIn', 'bytesOut', 'files'):
+            row[key] += e['args'].get(key, 0)
+    for row in stages.values():
+        row['wallMs'] = round(row['wallMs'], 3)
+        row['cpuMs'] = round(row['cpuMs'], 3)
+    slowest = sorted((e for e in recorded if _label(e)), key=lambda e: e['dur'], reverse=True)[:top]
+    return {
+        'wallMs': round((max(e['ts'] + e['dur'] for e in recorded) - min(e['ts'] for e in recorded)) / 1000, 3) if recorded else 0,
+        'stages': stages,
+        'slowest': [{'name': e['name'], 'item': _label(e), 'wallMs': round(e['dur'] / 1000, 3)} for e in slowest],
+    }
+
+
+def format_summary(summary):
+    lines = [f"{'stage':<12} {'count':>6} {'wall ms':>10} {'cpu ms':>10} {'bytes in':>12} {'bytes out':>12} {'files':>6}"]
+    for name, row in sorted(summary['stages'].items(), key=lambda kv: kv[1]['wallMs'], reverse=True):
+        lines.append(f"{name:<12} {row['count']:>6} {row['wallMs']:>10.1f} {row['cpuMs']:>10.1f} "
+                     f"{row['bytesIn']:>12} {row['bytesOut']:>12} {row['files']:>6}")
+    for item in summary['slowest']:
+        lines.append(f"slowest: {item['name']} {item['item']} {item['wallMs']:.1f} ms")
+    lines.append(f"total: {summary['wallMs']:.1f} ms wall")
+    return '\n'.join(lines)
+
+
+def app_version(path=PUBSPEC_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            m = re.search(r'^version:\s*(\S+)', f.read(), re.M)
+    except FileNotFoundError:
+        return None
+    return m.group(1) if m else None
+
+
+def write_chrome_trace(path, tool, recorded):
+    # Loadable in chrome://tracing and Perfetto.
+    meta = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f'{tool} ({pid})'}}
+            for pid in sorted({e['pid'] for e in recorded})]
+    doc = {
+        'traceEvents': meta + sorted(recorded, key=lambda e: e['ts']),
+        'displayTimeUnit': 'ms',
+        'otherData': {'tool': tool, 'version': app_version(), 'python': platform.python_version(), 'platform': platform.platform()},
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(doc, f)
+    os.replace(tmp_path, path)
+
+
+def append_history(tool, summary, path=HISTORY_PATH):
+    # One line per traced build, keyed by the pubspec version, for
+    # following build time across releases.
+    record = {
+        'tool': tool,
+        'version': app_version(),
+        'at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'wallMs': summary['wallMs'],
+        'stages': {name: row['wallMs'] for name, row in summary['stages'].items()},
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+def add_argument(parser):
+    parser.add_argument('--trace', metavar='PATH',
+                        help='record per-stage spans as Chrome trace JSON at PATH and print a summary table')
+
+
+def finish(path, tool):
+    # Writes everything recorded since enable(): the trace file, the summary
+    # table on stderr and a history line.
+    recorded = events()
+    summary = summarize(recorded)
+    write_chrome_trace(path, tool, recorded)
+    append_history(tool, summary)
+    print(format_summary(summary), file=sys.stderr)
+    return summary
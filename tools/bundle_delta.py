@@ -0,0 +1,419 @@
+import argparse
+import hashlib
+import json
+import lzma
+import os
+import posixpath
+import shutil
+import sys
+import tarfile
+import tempfile
+import zipfile
+
+try:
+    import bsdiff4
+except ImportError:
+    # Needed to build and apply patches (pip install bsdiff4); make refuses
+    # to run without it unless --no-patch asks for whole-file deltas.
+    bsdiff4 = None
+
+from bundles import (
+    BUNDLE_DIR, BUNDLES, CHUNK_SIZE, MANIFEST_PATH,
+    bundle_path, entry_key, generated_at, load_manifest, sha256_file, write_manifest,
+)
+from bundle_index import BundleIndexError, safe_member_name
+from repack_bundles import RepackError, iter_members, source_format
+
+
+DELTA_FORMAT = 1
+DELTA_SUFFIX = '.delta.zip'
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class DeltaError(Exception):
+    pass
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class _HashSink:
+    # Write-only file object that only hashes, for checking a canonical tar
+    # without keeping it.
+    def __init__(self):
+        self.hash = hashlib.sha256()
+        self.offset = 0
+
+    def write(self, data):
+        self.hash.update(data)
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _store(store_dir, data_or_file):
+    # Files are staged on disk under unique names, so runtimes larger than
+    # memory can be diffed and rebuilt one file at a time.
+    fd, path = tempfile.mkstemp(dir=store_dir)
+    h = hashlib.sha256()
+    size = 0
+    with os.fdopen(fd, 'wb') as out:
+        chunks = [data_or_file] if isinstance(data_or_file, bytes) else iter(lambda: data_or_file.read(CHUNK_SIZE), b'')
+        for chunk in chunks:
+            h.update(chunk)
+            size += len(chunk)
+            out.write(chunk)
+    return path, h.hexdigest(), size
+
+
+def read_tree(src, store_dir):
+    # (path -> entry, path -> staged file) for an archive, read once in
+    # archive order.
+    entries = {}
+    contents = {}
+    for member, f in iter_members(src):
+        path = safe_member_name(member.name)
+        entry = {'path': path, 'mode': member.mode & 0o7777, 'mtime': int(member.mtime)}
+        if member.isdir():
+            entry['type'] = 'dir'
+        elif member.issym() or member.islnk():
+            entry['type'] = 'symlink' if member.issym() else 'hardlink'
+            entry['target'] = member.linkname
+        elif f is not None:
+            contents[path], digest, size = _store(store_dir, f)
+            entry.update(type='file', size=size, sha256=digest)
+        else:
+            continue
+        entries[path] = entry
+    return entries, contents
+
+
+def tree_sha256(entries):
+    # Hash of the install tree: paths, types, modes, link targets and file
+    # hashes, independent of the archive format that carried them.
+    h = hashlib.sha256()
+    for path in sorted(entries):
+        e = entries[path]
+        h.update(f"{path}\0{e['type']}\0{e['mode']:o}\0{e.get('target', '')}\0{e.get('sha256', '')}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def write_canonical_tar(entries, contents, fileobj):
+    # Deterministic uncompressed tar of a tree; apply rebuilds the same bytes,
+    # so its SHA-256 can be checked end to end.
+    with tarfile.open(fileobj=fileobj, mode='w', format=tarfile.PAX_FORMAT) as tar:
+        for path in sorted(entries):
+            e = entries[path]
+            info = tarfile.TarInfo(path)
+            info.mode = e['mode']
+            info.mtime = e['mtime']
+            if e['type'] == 'dir':
+                info.type = tarfile.DIRTYPE
+                tar.addfile(info)
+            elif e['type'] in ('symlink', 'hardlink'):
+                info.type = tarfile.SYMTYPE if e['type'] == 'symlink' else tarfile.LNKTYPE
+                info.linkname = e['target']
+                tar.addfile(info)
+            else:
+                info.size = e['size']
+                with open(contents[path], 'rb') as f:
+                    tar.addfile(info, f)
+
+
+def canonical_tar_sha256(entries, contents):
+    sink = _HashSink()
+    write_canonical_tar(entries, contents, sink)
+    return sink.hash.hexdigest()
+
+
+def make_delta(old_src, new_src, delta_path, patch=True):
+    # patch=False ships every changed file whole (xz-compressed); unchanged
+    # and renamed files are still skipped.
+    if patch and bsdiff4 is None:
+        raise DeltaError('bsdiff4 is required to build patches: pip install bsdiff4, or pass --no-patch')
+    with tempfile.TemporaryDirectory() as old_store, tempfile.TemporaryDirectory() as new_store:
+        old_entries, old_contents = read_tree(old_src, old_store)
+        new_entries, new_contents = read_tree(new_src, new_store)
+        by_hash = {e['sha256']: path for path, e in old_entries.items() if e['type'] == 'file'}
+
+        tmp_path = delta_path + '.tmp'
+        os.makedirs(os.path.dirname(delta_path) or '.', exist_ok=True)
+        ops = []
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as z:
+            for path in sorted(new_entries):
+                entry = dict(new_entries[path])
+                if entry['type'] == 'file':
+                    old = old_entries.get(path)
+                    if old and old.get('sha256') == entry['sha256']:
+                        entry['op'] = 'same'
+                    elif entry['sha256'] in by_hash:
+                        entry.update(op='copy', source=by_hash[entry['sha256']])
+                    else:
+                        data = _read(new_contents[path])
+                        blob = lzma.compress(data, preset=9)
+                        entry['op'] = 'add'
+                        if patch and old and old['type'] == 'file':
+                            diff = bsdiff4.diff(_read(old_contents[path]), data)
+                            if len(diff) < len(blob):
+                                blob = diff
+                                entry.update(op='patch', source=path)
+                        entry['blob'] = f'data/{len(ops)}'
+                        z.writestr(zipfile.ZipInfo(entry['blob'], date_time=ZIP_DATE_TIME), blob)
+                ops.append(entry)
+
+            delta = {
+                'format': DELTA_FORMAT,
+                'from': {'source': os.path.basename(old_src), 'sha256': sha256_file(old_src), 'treeSha256': tree_sha256(old_entries)},
+                'to': {
+                    'source': os.path.basename(new_src),
+                    'sha256': sha256_file(new_src),
+                    'treeSha256': tree_sha256(new_entries),
+                    'tarSha256': canonical_tar_sha256(new_entries, new_contents),
+                },
+                'entries': ops,
+            }
+            z.writestr(zipfile.ZipInfo('delta.json', date_time=ZIP_DATE_TIME), json.dumps(delta, indent=1))
+    os.replace(tmp_path, delta_path)
+    return delta
+
+
+def _old_reader(old_src, store_dir):
+    # Old content comes from an installed tree or from the previous archive.
+    if os.path.isdir(old_src):
+        return lambda path: _read(os.path.join(old_src, *path.split('/')))
+    _, contents = read_tree(old_src, store_dir)
+    return lambda path: _read(contents[path])
+
+
+def recorded_sha256(delta_path, manifest_path=MANIFEST_PATH):
+    # The delta's own hash, from the manifest entry whose archive path the
+    # file name ends with.
+    name = os.path.abspath(delta_path).replace(os.sep, '/')
+    for entry in load_manifest(manifest_path).get('entries', []):
+        for d in entry.get('deltas', []):
+            if name.endswith('/' + d['archive']):
+                return d['sha256']
+    raise DeltaError(f'{delta_path} is not recorded in {manifest_path}')
+
+
+def apply_delta(old_src, delta_path, out_dir=None, out_archive=None, expected_sha256=None):
+    # expected_sha256 is the hash recorded for the delta in the manifest; a
+    # file that does not match is refused before any of it is read.
+    if expected_sha256 and sha256_file(delta_path) != expected_sha256:
+        raise DeltaError(f'{delta_path}: SHA-256 does not match the manifest')
+    with tempfile.TemporaryDirectory() as old_store, tempfile.TemporaryDirectory() as new_store:
+        with zipfile.ZipFile(delta_path) as z:
+            delta = json.loads(z.read('delta.json'))
+            if delta.get('format') != DELTA_FORMAT:
+                raise DeltaError(f'{delta_path}: unsupported delta format {delta.get("format")!r}')
+            read_old = _old_reader(old_src, old_store)
+
+            entries = {}
+            contents = {}
+            for entry in delta['entries']:
+                try:
+                    path = safe_member_name(entry['path'])
+                    source = safe_member_name(entry['source']) if entry.get('op') in ('copy', 'patch') else path
+                except BundleIndexError as e:
+                    raise DeltaError(str(e))
+                entries[path] = entry
+                if entry['type'] != 'file':
+                    continue
+                op = entry['op']
+                try:
+                    if op in ('same', 'copy'):
+                        data = read_old(source)
+                    elif op == 'patch':
+                        if bsdiff4 is None:
+                            raise DeltaError('bsdiff4 is required to apply this delta')
+                        data = bsdiff4.patch(read_old(source), z.read(entry['blob']))
+                    elif op == 'add':
+                        data = lzma.decompress(z.read(entry['blob']))
+                    else:
+                        raise DeltaError(f'{path}: unknown op {op!r}')
+                except (FileNotFoundError, KeyError):
+                    raise DeltaError(f'{path}: source file missing from {old_src}')
+                if _sha256(data) != entry['sha256']:
+                    # Typically a locally edited file in the old install tree.
+                    raise DeltaError(f'{path}: SHA-256 mismatch after {op}')
+                contents[path] = _store(new_store, data)[0]
+
+        if tree_sha256(entries) != delta['to']['treeSha256']:
+            raise DeltaError(f'{delta_path}: rebuilt tree does not match the target')
+
+        if out_archive:
+            tmp_path = out_archive + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                write_canonical_tar(entries, contents, f)
+            if sha256_file(tmp_path) != delta['to']['tarSha256']:
+                os.remove(tmp_path)
+                raise DeltaError(f'{delta_path}: rebuilt archive does not match the target')
+            os.replace(tmp_path, out_archive)
+        if out_dir:
+            _write_tree(entries, contents, out_dir)
+    return delta
+
+
+def _within(root, path):
+    return os.path.commonpath([root, path]) == root
+
+
+def _staged_path(staging, path):
+    # Where an entry may be written: its parent must resolve inside staging
+    # and the path must not already be a symlink, which writes would follow.
+    target = os.path.join(staging, *path.split('/'))
+    if not _within(os.path.realpath(staging), os.path.realpath(os.path.dirname(target))) or os.path.islink(target):
+        raise DeltaError(f'{path}: path escapes the install tree')
+    return target
+
+
+def _check_link(path, target):
+    resolved = posixpath.normpath(posixpath.join(posixpath.dirname(path), target))
+    if target.startswith('/') or '\\' in target or resolved == '..' or resolved.startswith('../'):
+        raise DeltaError(f'{path}: link escapes the install tree ({target})')
+
+
+def _write_tree(entries, contents, out_dir):
+    # Built beside the destination and swapped in, so a failed apply never
+    # leaves a half-updated runtime.
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    # mkdtemp creates 0700; the runtime gets the mode of the tree it replaces,
+    # or what makedirs would have given it.
+    if os.path.isdir(out_dir):
+        mode = os.stat(out_dir).st_mode & 0o7777
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o777 & ~umask
+    staging = tempfile.mkdtemp(prefix='.delta-', dir=parent)
+    try:
+        os.chmod(staging, mode)
+        # Directories and regular files first, so nothing is written through
+        # a link; then symlinks, then hard links, whose targets must exist.
+        by_type = {kind: [] for kind in ('dir', 'file', 'symlink', 'hardlink')}
+        for path in sorted(entries):
+            by_type[entries[path]['type']].append(path)
+        for path in by_type['dir']:
+            os.makedirs(_staged_path(staging, path), exist_ok=True)
+        for path in by_type['file']:
+            target = _staged_path(staging, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(contents[path], target)
+            os.chmod(target, entries[path]['mode'] & 0o777 or 0o644)
+        for path in by_type['symlink']:
+            _check_link(path, entries[path]['target'])
+            target = _staged_path(staging, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.symlink(entries[path]['target'], target)
+        # Each link passed _check_link alone, but a chain (d/l -> .., then
+        # x -> d/l/..) can still leave the tree, so all of them are resolved
+        # for real once they exist.
+        root = os.path.realpath(staging)
+        for path in by_type['symlink']:
+            if not _within(root, os.path.realpath(os.path.join(staging, *path.split('/')))):
+                raise DeltaError(f"{path}: link escapes the install tree ({entries[path]['target']})")
+        for path in by_type['hardlink']:
+            link = entries[path]['target']
+            source = os.path.realpath(os.path.join(staging, *link.split('/')))
+            if link.startswith('/') or '\\' in link or not _within(root, source):
+                raise DeltaError(f'{path}: link escapes the install tree ({link})')
+            target = _staged_path(staging, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(staging, out_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def delta_archive_name(bundle, from_version):
+    base = bundle['archive'][:-len(source_format(bundle['archive'])) - 1]
+    folder, _, name = base.rpartition('/')
+    return f"{folder}/{from_version}-to-{name}{DELTA_SUFFIX}"
+
+
+def record_delta(bundle, from_version, archive, delta, delta_path, manifest_path=MANIFEST_PATH):
+    # Kept on the new version's entry; build_bundle_manifest carries the list
+    # over while the delta files stay on disk.
+    manifest = load_manifest(manifest_path)
+    for entry in manifest.get('entries', []):
+        if entry_key(entry) == entry_key(bundle):
+            break
+    else:
+        raise DeltaError(f"{bundle['archive']} has no manifest entry; run build_bundle_manifest.py first")
+    deltas = [d for d in entry.get('deltas', []) if d.get('fromVersion') != from_version]
+    deltas.append({
+        'fromVersion': from_version,
+        'fromSha256': delta['from']['sha256'],
+        'archive': archive,
+        'sha256': sha256_file(delta_path),
+        'treeSha256': delta['to']['treeSha256'],
+        'tarSha256': delta['to']['tarSha256'],
+    })
+    entry['deltas'] = sorted(deltas, key=lambda d: d['fromVersion'])
+    manifest['generatedAt'] = generated_at()
+    write_manifest(manifest, manifest_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build and apply per-file binary deltas between bundle versions.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    make = sub.add_parser('make', help='diff an older archive against a current bundle')
+    make.add_argument('old', help='archive of the previous version')
+    make.add_argument('archive', help='BUNDLES archive path of the new version, e.g. php/8.5.1-windows.zip')
+    make.add_argument('--from-version', required=True, help='version string of the old archive')
+    make.add_argument('--bundles', default=BUNDLE_DIR, help='bundle directory')
+    make.add_argument('--manifest', default=MANIFEST_PATH, help='manifest to record the delta in')
+    make.add_argument('--no-manifest', action='store_true', help='write the delta without touching the manifest')
+    make.add_argument('--no-patch', action='store_true', help='ship changed files whole instead of as bsdiff4 patches')
+
+    apply = sub.add_parser('apply', help='rebuild a new version from the old one plus a delta')
+    apply.add_argument('old', help='previous archive or installed directory')
+    apply.add_argument('delta', help='.delta.zip file')
+    apply.add_argument('--out-dir', help='install tree to write (replaced atomically)')
+    apply.add_argument('--out-archive', help='canonical .tar to write and verify')
+    apply.add_argument('--manifest', default=MANIFEST_PATH, help="manifest holding the delta's SHA-256")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'make':
+            bundle = next((b for b in BUNDLES if b['archive'] == args.archive), None)
+            if bundle is None:
+                parser.error(f'Unknown bundle: {args.archive}')
+            archive = delta_archive_name(bundle, args.from_version)
+            delta_path = bundle_path(archive, args.bundles)
+            delta = make_delta(args.old, bundle_path(bundle['archive'], args.bundles), delta_path, not args.no_patch)
+            if not args.no_manifest:
+                record_delta(bundle, args.from_version, archive, delta, delta_path, args.manifest)
+            ops = {}
+            for e in delta['entries']:
+                if 'op' in e:
+                    ops[e['op']] = ops.get(e['op'], 0) + 1
+            print(f"delta ok: {archive} ({os.path.getsize(delta_path)} bytes, "
+                  f"{', '.join(f'{n} {op}' for op, n in sorted(ops.items()))})")
+        else:
+            if not (args.out_dir or args.out_archive):
+                parser.error('apply needs --out-dir and/or --out-archive')
+            expected = recorded_sha256(args.delta, args.manifest)
+            delta = apply_delta(args.old, args.delta, args.out_dir, args.out_archive, expected)
+            print(f"apply ok (tree {delta['to']['treeSha256'][:16]})")
+    except (DeltaError, RepackError, OSError, ValueError, zipfile.BadZipFile, tarfile.TarError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
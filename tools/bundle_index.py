@@ -0,0 +1,211 @@
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import sys
+import tarfile
+import zipfile
+import zlib
+
+from bundles import (
+    BASE, BUNDLE_DIR, BUNDLES, CHUNK_SIZE, MANIFEST_PATH,
+    bundle_path, manifest_entries, repacked_entry, sha256_file,
+)
+from repack_bundles import RepackError, iter_members, source_format
+
+
+OUT_DIR = os.path.join(BASE, 'tools', '.cache', 'seekable')
+PAK_SUFFIX = '.pak'
+DEFAULT_LEVEL = 6
+
+
+class BundleIndexError(Exception):
+    pass
+
+
+def index_path(pak_path):
+    return pak_path + '.json'
+
+
+def safe_member_name(name):
+    while name.startswith('./'):
+        name = name[2:]
+    if not name or name.startswith('/') or '\\' in name or posixpath.normpath(name) != name or name.startswith('..'):
+        raise BundleIndexError(f'Unsafe member path: {name!r}')
+    return name
+
+
+def _write_member(out, f, level):
+    # Each member is its own raw deflate stream, so any one of them can be
+    # inflated on its own from (offset, compressedSize).
+    start = out.tell()
+    h = hashlib.sha256()
+    size = 0
+    comp = zlib.compressobj(level, zlib.DEFLATED, -15)
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+        h.update(chunk)
+        size += len(chunk)
+        out.write(comp.compress(chunk))
+    out.write(comp.flush())
+    # zlib falls back to stored blocks for incompressible data, so binaries
+    # and nested archives cost a few bytes per 64 KiB rather than a re-read.
+    return {
+        'offset': start,
+        'size': size,
+        'compressedSize': out.tell() - start,
+        'compression': 'deflate',
+        'sha256': h.hexdigest(),
+    }
+
+
+def build_seekable(src, pak_path, level=DEFAULT_LEVEL):
+    members = {}
+    links = {}
+    dirs = []
+    tmp_path = pak_path + '.tmp'
+    os.makedirs(os.path.dirname(pak_path) or '.', exist_ok=True)
+    with open(tmp_path, 'wb') as out:
+        for member, f in iter_members(src):
+            name = safe_member_name(member.name)
+            if member.isdir():
+                dirs.append(name + '/')
+            elif member.islnk():
+                # A hardlink shares its target's data, which tar always stores
+                # earlier in the stream, so it reuses that member's offset.
+                target = members.get(safe_member_name(member.linkname))
+                if target is None:
+                    raise BundleIndexError(f'Hardlink {name!r} points to unknown member {member.linkname!r}')
+                members[name] = dict(target, mode=member.mode)
+            elif member.issym():
+                links[name] = member.linkname
+            elif f is not None:
+                entry = _write_member(out, f, level)
+                entry['mode'] = member.mode
+                members[name] = entry
+    os.replace(tmp_path, pak_path)
+
+    index = {
+        'schemaVersion': 1,
+        'source': os.path.basename(src),
+        'sourceSha256': sha256_file(src),
+        'pakSha256': sha256_file(pak_path),
+        'members': dict(sorted(members.items())),
+        'links': dict(sorted(links.items())),
+        'dirs': sorted(dirs),
+    }
+    tmp_path = index_path(pak_path) + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        json.dump(index, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, index_path(pak_path))
+    return index
+
+
+class SeekableBundle:
+    def __init__(self, pak_path):
+        self.path = pak_path
+        with open(index_path(pak_path), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        self._file = open(pak_path, 'rb')
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def names(self):
+        return list(self.index['members'])
+
+    def find(self, basename):
+        return [n for n in self.index['members'] if posixpath.basename(n) == basename]
+
+    def info(self, name):
+        try:
+            return self.index['members'][name]
+        except KeyError:
+            raise BundleIndexError(f'No member {name!r} in {self.path}')
+
+    def iter_chunks(self, name, verify=True):
+        entry = self.info(name)
+        h = hashlib.sha256()
+        remaining = entry['compressedSize']
+        inflate = zlib.decompressobj(-15) if entry['compression'] == 'deflate' else None
+        self._file.seek(entry['offset'])
+        while remaining:
+            chunk = self._file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise BundleIndexError(f'{self.path} is truncated inside {name!r}')
+            remaining -= len(chunk)
+            if inflate:
+                chunk = inflate.decompress(chunk)
+            h.update(chunk)
+            yield chunk
+        if inflate:
+            tail = inflate.flush()
+            h.update(tail)
+            yield tail
+        if verify and h.hexdigest() != entry['sha256']:
+            raise BundleIndexError(f'Checksum mismatch for {name!r} in {self.path}')
+
+    def read(self, name, verify=True):
+        return b''.join(self.iter_chunks(name, verify))
+
+    def extract(self, name, dest_dir, verify=True):
+        dest = os.path.join(dest_dir, *name.split('/'))
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp_path = dest + '.tmp'
+        with open(tmp_path, 'wb') as out:
+            for chunk in self.iter_chunks(name, verify):
+                out.write(chunk)
+        os.chmod(tmp_path, self.info(name)['mode'] & 0o777 or 0o644)
+        os.replace(tmp_path, dest)
+        return dest
+
+
+def pak_path_for(archive, out_dir=OUT_DIR):
+    stem = archive[:-len(source_format(archive)) - 1]
+    return os.path.join(out_dir, *stem.split('/')) + PAK_SUFFIX
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build seekable, per-member indexed copies of LocalX runtime bundles.')
+    parser.add_argument('archives', nargs='*', metavar='archive', help='BUNDLES archive paths to index (default: all downloaded)')
+    parser.add_argument('--bundles', default=BUNDLE_DIR, help='bundle directory')
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help='manifest used to find repacked bundles')
+    parser.add_argument('-o', '--out', default=OUT_DIR, help='output directory for .pak files and their indexes')
+    parser.add_argument('--level', type=int, default=DEFAULT_LEVEL, choices=range(0, 10), metavar='0-9', help='deflate level per member')
+    args = parser.parse_args(argv)
+
+    bundles = [b for b in BUNDLES if not args.archives or b['archive'] in args.archives]
+    unknown = set(args.archives) - {b['archive'] for b in bundles}
+    if unknown:
+        parser.error(f"Unknown bundle(s): {', '.join(sorted(unknown))}")
+
+    manifest = manifest_entries(args.manifest)
+    failed = 0
+    for bundle in bundles:
+        repacked = repacked_entry(bundle, manifest, args.bundles)
+        src = bundle_path((repacked or bundle)['archive'], args.bundles)
+        if not os.path.isfile(src):
+            if args.archives:
+                print(f"missing: {bundle['archive']}", file=sys.stderr)
+                failed += 1
+            continue
+        try:
+            index = build_seekable(src, pak_path_for(bundle['archive'], args.out), args.level)
+        except (RepackError, BundleIndexError, OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as e:
+            # tarfile lists every compression it tried on separate lines.
+            print(f"failed: {bundle['archive']} ({' '.join(str(e).split())})", file=sys.stderr)
+            failed += 1
+            continue
+        print(f"indexed: {bundle['archive']} ({len(index['members'])} members)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
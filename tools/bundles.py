@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+
+BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BUNDLE_DIR = os.path.join(BASE, 'assets', 'bundles')
+MANIFEST_PATH = os.path.join(BUNDLE_DIR, 'manifest.json')
+CHUNK_SIZE = 1 << 20
+
+# Same table as tools/build_bundle_manifest.ps1.
+BUNDLES = [
+    {'software': 'php', 'version': '8.5.1', 'platform': 'windows', 'archive': 'php/8.5.1-windows.zip', 'sourceUrl': 'https://windows.php.net/downloads/releases/php-8.5.1-Win32-vs17-x64.zip', 'installMode': 'archive'},
+    {'software': 'php', 'version': '8.5.1', 'platform': 'linux', 'archive': 'php/8.5.1-linux.tar.xz', 'sourceUrl': 'https://www.php.net/distributions/php-8.5.1.tar.xz', 'installMode': 'archive'},
+    {'software': 'python', 'version': '3.14.3', 'platform': 'windows', 'archive': 'python/3.14.3-windows.zip', 'sourceUrl': 'https://www.python.org/ftp/python/3.14.3/python-3.14.3-embed-amd64.zip', 'installMode': 'archive'},
+    {'software': 'python', 'version': '3.14.3', 'platform': 'linux', 'archive': 'python/3.14.3-linux.tgz', 'sourceUrl': 'https://www.python.org/ftp/python/3.14.3/Python-3.14.3.tgz', 'installMode': 'archive'},
+    {'software': 'nodejs', 'version': '25.x', 'platform': 'windows', 'archive': 'nodejs/25.x-windows.zip', 'sourceUrl': 'https://nodejs.org/dist/v25.6.1/node-v25.6.1-win-x64.zip', 'installMode': 'archive'},
+    {'software': 'nodejs', 'version': '25.x', 'platform': 'linux', 'archive': 'nodejs/25.x-linux.tar.xz', 'sourceUrl': 'https://nodejs.org/dist/v25.6.1/node-v25.6.1-linux-x64.tar.xz', 'installMode': 'archive'},
+    {'software': 'mysql', 'version': '8.4.8', 'platform': 'windows', 'archive': 'mysql/8.4.8-windows.zip', 'sourceUrl': 'https://cdn.mysql.com/Downloads/MySQL-8.4/mysql-8.4.8-winx64.zip', 'installMode': 'archive'},
+    {'software': 'mysql', 'version': '8.4.8', 'platform': 'linux', 'archive': 'mysql/8.4.8-linux.tar.xz', 'sourceUrl': 'https://cdn.mysql.com/Downloads/MySQL-8.4/mysql-8.4.8-linux-glibc2.28-x86_64.tar.xz', 'installMode': 'archive'},
+    {'software': 'apache', 'version': '2.4.66', 'platform': 'windows', 'archive': 'apache/2.4.66-windows.zip', 'sourceUrl': 'https://www.apachelounge.com/download/VS18/binaries/httpd-2.4.66-260223-Win64-VS18.zip', 'installMode': 'archive'},
+    {'software': 'apache', 'version': '2.4.66', 'platform': 'linux', 'archive': 'apache/2.4.66-linux.tar.gz', 'sourceUrl': 'https://downloads.apache.org/httpd/httpd-2.4.66.tar.gz', 'installMode': 'archive'},
+    {'software': 'mailhog', 'version': '1.0.1', 'platform': 'windows', 'archive': 'mailhog/1.0.1-windows.zip', 'sourceUrl': 'https://github.com/mailhog/MailHog/releases/download/v1.0.1/MailHog_windows_amd64.exe', 'installMode': 'archive'},
+    {'software': 'mailhog', 'version': '1.0.1', 'platform': 'linux', 'archive': 'mailhog/1.0.1-linux.zip', 'sourceUrl': 'https://github.com/mailhog/MailHog/releases/download/v1.0.1/MailHog_linux_amd64', 'installMode': 'archive'},
+    {'software': 'smtp', 'version': '1.28.2', 'platform': 'windows', 'archive': 'smtp/1.28.2-windows.zip', 'sourceUrl': 'https://github.com/axllent/mailpit/releases/download/v1.28.2/mailpit-windows-amd64.zip', 'installMode': 'archive'},
+    {'software': 'smtp', 'version': '1.28.2', 'platform': 'linux', 'archive': 'smtp/1.28.2-linux.tar.gz', 'sourceUrl': 'https://github.com/axllent/mailpit/releases/download/v1.28.2/mailpit-linux-amd64.tar.gz', 'installMode': 'archive'},
+    {'software': 'websocket', 'version': '1.13.0', 'platform': 'windows', 'archive': 'websocket/1.13.0-windows.zip', 'sourceUrl': 'https://github.com/vi/websocat/releases/download/v1.13.0/websocat.x86_64-pc-windows-gnu.exe', 'installMode': 'archive'},
+    {'software': 'websocket', 'version': '1.13.0', 'platform': 'linux', 'archive': 'websocket/1.13.0-linux.zip', 'sourceUrl': 'https://github.com/vi/websocat/releases/download/v1.13.0/websocat.x86_64-unknown-linux-musl', 'installMode': 'archive'},
+]
+ENTRY_KEYS = ('software', 'version', 'platform', 'archive', 'sha256', 'sourceUrl', 'installMode')
+# Set by repack_bundles.py when an entry ships a re-encoded copy of the
+# archive named in BUNDLES. sha256 then describes the shipped archive and
+# sourceSha256 the original, which is what VersionManager checks sourceUrl
+# downloads against.
+REPACK_KEYS = ('format', 'repackedFrom', 'sourceSha256')
+# Set by bundle_delta.py: patches from older versions to this entry.
+DELTA_KEY = 'deltas'
+
+
+def bundle_path(archive, bundle_dir=BUNDLE_DIR):
+    return os.path.join(bundle_dir, *archive.split('/'))
+
+
+def sha256_file(path, chunk_size=CHUNK_SIZE):
+    # Reuses one fixed buffer, so memory stays flat regardless of archive size.
+    h = hashlib.sha256()
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        return json.load(f)
+
+
+def entry_key(entry):
+    return entry['software'], entry['version'], entry['platform']
+
+
+def manifest_entries(path=MANIFEST_PATH):
+    try:
+        manifest = load_manifest(path)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return {entry_key(e): e for e in manifest.get('entries', [])}
+
+
+def repacked_entry(bundle, entries, bundle_dir=BUNDLE_DIR):
+    # The manifest entry replacing bundle's archive, if it is still on disk.
+    entry = entries.get(entry_key(bundle))
+    if entry and entry.get('repackedFrom') == bundle['archive'] and os.path.isfile(bundle_path(entry['archive'], bundle_dir)):
+        return entry
+    return None
+
+
+def generated_at():
+    # Matches PowerShell's round-trip ("o") format used by the original script.
+    now = datetime.now(timezone.utc)
+    return now.strftime('%Y-%m-%dT%H:%M:%S.') + f'{now.microsecond:06d}0Z'
+
+
+def write_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, path)
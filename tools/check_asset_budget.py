@@ -0,0 +1,292 @@
+import argparse
+import json
+import os
+import platform
+import struct
+import sys
+import time
+import xml.etree.ElementTree as ET
+import zlib
+
+from bundles import CHUNK_SIZE
+from repack_bundles import RepackError, iter_members
+
+
+BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PUBSPEC_PATH = os.path.join(BASE, 'pubspec.yaml')
+BUDGET_PATH = os.path.join(BASE, 'tools', 'asset_budget.json')
+LFS_HEADER = b'version https://git-lfs.github.com/spec/'
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.xz')
+# Room given to assets that enter the budget file for the first time.
+DEFAULT_HEADROOM = 0.1
+DEFAULT_SIZE_THRESHOLD = 0.05
+DEFAULT_TIME_THRESHOLD = 0.5
+DEFAULT_MIN_DELTA_MS = 2.0
+
+
+def pubspec_assets(path=PUBSPEC_PATH):
+    # (assets entries, font files) from the top-level flutter: section. The
+    # layout is flutter create's, so indentation is enough to read it.
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    entries, fonts = [], []
+    section = None
+    in_flutter = False
+    for line in lines:
+        stripped = line.split('#', 1)[0].rstrip()
+        if not stripped:
+            continue
+        indent = len(stripped) - len(stripped.lstrip())
+        if indent == 0:
+            in_flutter = stripped == 'flutter:'
+            section = None
+            continue
+        if not in_flutter:
+            continue
+        text = stripped.strip()
+        if indent == 2:
+            section = text.rstrip(':') if text.endswith(':') else None
+        elif section == 'assets' and text.startswith('- '):
+            entries.append(text[2:].strip().strip('\'"'))
+        elif section == 'fonts' and text.lstrip('- ').startswith('asset:'):
+            fonts.append(text.lstrip('- ')[len('asset:'):].strip().strip('\'"'))
+    return entries, fonts
+
+
+def inventory(entries, fonts, base=BASE):
+    # Flutter ships only the files directly inside a listed directory.
+    # Files in its subdirectories are returned separately: the app may load
+    # them (bundles/<software>/...), but the build leaves them out.
+    shipped, nested = set(), set()
+    for entry in entries + fonts:
+        path = os.path.join(base, *entry.rstrip('/').split('/'))
+        if not entry.endswith('/'):
+            if os.path.isfile(path):
+                shipped.add(entry)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            rel_root = os.path.relpath(root, base).replace(os.sep, '/')
+            for name in files:
+                (shipped if root == path else nested).add(f'{rel_root}/{name}')
+    return sorted(shipped), sorted(nested - shipped)
+
+
+def lfs_size(path):
+    # Size of the real object behind a Git LFS pointer, or None.
+    with open(path, 'rb') as f:
+        head = f.read(512)
+    if not head.startswith(LFS_HEADER):
+        return None
+    for line in head.decode('ascii', 'replace').splitlines():
+        if line.startswith('size '):
+            return int(line[5:])
+    return None
+
+
+def _decode_archive(path):
+    for _, f in iter_members(path):
+        if f is not None:
+            while f.read(CHUNK_SIZE):
+                pass
+
+
+def _inflate_png(data):
+    # IDAT inflation is the bulk of PNG decoding; filtering is left out.
+    pos = 8
+    inflate = zlib.decompressobj()
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        if kind == b'IDAT':
+            inflate.decompress(data[pos + 8:pos + 8 + length])
+        pos += 12 + length
+
+
+def _decode_ico(data):
+    _, _, count = struct.unpack('<HHH', data[:6])
+    for i in range(count):
+        size, offset = struct.unpack('<II', data[6 + 16 * i + 8:6 + 16 * i + 16])
+        image = data[offset:offset + size]
+        if image.startswith(b'\x89PNG'):
+            _inflate_png(image)
+
+
+def _walk_sfnt(data):
+    # Reads the table directory and checksums every table, touching all of
+    # the font the way a first load does, without fontTools.
+    _, num_tables = struct.unpack('>IH', data[:6])
+    total = 0
+    for i in range(num_tables):
+        _, _, offset, length = struct.unpack('>4sIII', data[12 + 16 * i:28 + 16 * i])
+        table = data[offset:offset + length]
+        table += b'\0' * (-len(table) % 4)
+        total += sum(struct.unpack(f'>{len(table) // 4}I', table))
+    return total
+
+
+def decoder_for(name):
+    if name.endswith(ARCHIVE_SUFFIXES):
+        return 'extract', _decode_archive
+    ext = os.path.splitext(name)[1].lower()
+    if ext == '.svg':
+        return 'parse', lambda path: ET.parse(path)
+    if ext in ('.ttf', '.otf'):
+        return 'load', lambda path: _walk_sfnt(_read(path))
+    if ext == '.json':
+        return 'parse', lambda path: json.loads(_read(path))
+    if ext == '.png':
+        return 'inflate', lambda path: _inflate_png(_read(path))
+    if ext == '.ico':
+        return 'inflate', lambda path: _decode_ico(_read(path))
+    return 'read', _read
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def measure(name, base=BASE, repeat=3, decode=True):
+    path = os.path.join(base, *name.split('/'))
+    pointer_size = lfs_size(path)
+    kind, fn = decoder_for(name)
+    result = {'bytes': pointer_size if pointer_size is not None else os.path.getsize(path), 'decode': kind}
+    if pointer_size is not None:
+        # Only the pointer is checked out; the size comes from the pointer
+        # and there is nothing to decode.
+        result['lfsPointer'] = True
+        result['decodeMs'] = None
+        return result
+    if not decode:
+        result['decodeMs'] = None
+        return result
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(path)
+        timings.append(time.perf_counter() - start)
+    result['decodeMs'] = round(min(timings) * 1000, 3)
+    return result
+
+
+def compare(measured, budget, size_threshold, time_threshold, min_delta_ms):
+    # One diff row per asset; status is ok, new, removed, overBudget or
+    # regressed. Sizes are checked against the hard maxBytes and against the
+    # recorded size; decode time only against the recorded time.
+    recorded = budget.get('assets', {})
+    rows = {}
+    for name, now in measured.items():
+        then = recorded.get(name)
+        row = dict(now)
+        if then is None:
+            row['status'] = 'new'
+            rows[name] = row
+            continue
+        row.update(maxBytes=then.get('maxBytes'), recordedBytes=then.get('bytes'), recordedDecodeMs=then.get('decodeMs'))
+        problems = []
+        if then.get('maxBytes') is not None and now['bytes'] > then['maxBytes']:
+            row['status'] = 'overBudget'
+            problems.append(f"{now['bytes']} bytes > budget {then['maxBytes']}")
+        if then.get('bytes') and now['bytes'] > then['bytes'] * (1 + size_threshold):
+            problems.append(f"size {then['bytes']} -> {now['bytes']} bytes")
+        if now.get('decodeMs') is not None and then.get('decodeMs') is not None:
+            delta = now['decodeMs'] - then['decodeMs']
+            if delta > min_delta_ms and delta > then['decodeMs'] * time_threshold:
+                problems.append(f"{now['decode']} {then['decodeMs']} -> {now['decodeMs']} ms")
+        row.setdefault('status', 'regressed' if problems else 'ok')
+        if problems:
+            row['problems'] = problems
+        rows[name] = row
+    for name in sorted(set(recorded) - set(measured)):
+        rows[name] = {'status': 'removed', 'recordedBytes': recorded[name].get('bytes')}
+    return rows
+
+
+def updated_budget(measured, budget, headroom=DEFAULT_HEADROOM):
+    # Records current sizes and times. Existing maxBytes are kept: raising a
+    # budget is a deliberate edit to the file, not a side effect of --update.
+    recorded = budget.get('assets', {})
+    assets = {}
+    for name, now in sorted(measured.items()):
+        max_bytes = recorded.get(name, {}).get('maxBytes')
+        if max_bytes is None:
+            max_bytes = -(-int(now['bytes'] * (1 + headroom)) // 1024) * 1024
+        assets[name] = {'maxBytes': max_bytes, 'bytes': now['bytes'], 'decodeMs': now.get('decodeMs')}
+    total = sum(a['bytes'] for a in assets.values())
+    total_max = budget.get('total', {}).get('maxBytes') or -(-int(total * (1 + headroom)) // 1024) * 1024
+    return {'schemaVersion': 1, 'total': {'maxBytes': total_max, 'bytes': total}, 'assets': assets}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check shipped assets against their size and decode-time budgets.')
+    parser.add_argument('--pubspec', default=PUBSPEC_PATH, help='pubspec.yaml declaring the assets')
+    parser.add_argument('--budget', default=BUDGET_PATH, help='committed budget file')
+    parser.add_argument('--update', action='store_true', help='record current measurements in the budget file')
+    parser.add_argument('--sizes-only', action='store_true', help='skip decode timing')
+    parser.add_argument('--size-threshold', type=float, default=DEFAULT_SIZE_THRESHOLD,
+                        help='allowed growth over the recorded size as a fraction')
+    parser.add_argument('--time-threshold', type=float, default=DEFAULT_TIME_THRESHOLD,
+                        help='allowed decode-time growth over the recorded time as a fraction')
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS, help='ignore decode slowdowns smaller than this')
+    parser.add_argument('-n', '--repeat', type=int, default=3, help='decodes per asset (fastest is kept)')
+    parser.add_argument('-o', '--out', help='write the JSON diff report here')
+    args = parser.parse_args(argv)
+
+    base = os.path.dirname(os.path.abspath(args.pubspec))
+    entries, fonts = pubspec_assets(args.pubspec)
+    shipped, nested = inventory(entries, fonts, base)
+    try:
+        measured = {name: measure(name, base, max(args.repeat, 1), not args.sizes_only) for name in shipped + nested}
+    except (OSError, ValueError, RepackError, ET.ParseError, struct.error, zlib.error) as e:
+        print(e, file=sys.stderr)
+        return 1
+    for name in nested:
+        measured[name]['undeclared'] = True
+    try:
+        with open(args.budget, 'r', encoding='utf-8') as f:
+            budget = json.load(f)
+    except FileNotFoundError:
+        budget = {}
+
+    if args.update:
+        tmp_path = args.budget + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+            json.dump(updated_budget(measured, budget), f, indent=2)
+            f.write('\n')
+        os.replace(tmp_path, args.budget)
+        print(f'budget updated ({len(measured)} assets)')
+        return 0
+
+    rows = compare(measured, budget, args.size_threshold, args.time_threshold, args.min_delta_ms)
+    total = sum(m['bytes'] for m in measured.values())
+    total_max = budget.get('total', {}).get('maxBytes')
+    failed = [n for n, r in rows.items() if r['status'] in ('new', 'overBudget', 'regressed')]
+    for folder in sorted({n.rsplit('/', 1)[0] + '/' for n in nested}):
+        print(f'warning: {folder} is not listed in pubspec.yaml; Flutter does not ship subdirectories of a listed one', file=sys.stderr)
+    for name, row in rows.items():
+        if row['status'] == 'new':
+            print(f'{name}: no budget ({row["bytes"]} bytes); run with --update', file=sys.stderr)
+        elif row['status'] == 'removed':
+            print(f'{name}: removed', file=sys.stderr)
+        for problem in row.get('problems', ()):
+            print(f'{name}: {problem}', file=sys.stderr)
+    if total_max is not None and total > total_max:
+        print(f'total: {total} bytes > budget {total_max}', file=sys.stderr)
+        failed.append('total')
+
+    if args.out:
+        report = {
+            'schemaVersion': 1,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total': {'bytes': total, 'maxBytes': total_max},
+            'assets': rows,
+        }
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(report, indent=2) + '\n')
+    print(f"assets {'FAILED' if failed else 'ok'} ({len(measured)} assets, {total} bytes)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
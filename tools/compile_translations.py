@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from translations import BASE, TRANSLATIONS_PATH, load_translations
+
+
+OUT_DIR = os.path.join(BASE, 'assets', 'translations')
+KEYS_NAME = 'keys.json'
+REFERENCE_LOCALE = 'en'
+
+
+class CatalogError(ValueError):
+    pass
+
+
+def parity(catalog, reference=REFERENCE_LOCALE):
+    # Keys each locale lacks (or adds) relative to the reference locale.
+    if reference not in catalog:
+        raise CatalogError(f'Reference locale {reference!r} is missing')
+    expected = set(catalog[reference])
+    report = {}
+    for locale, strings in sorted(catalog.items()):
+        missing = sorted(expected - set(strings))
+        extra = sorted(set(strings) - expected)
+        if missing or extra:
+            report[locale] = {'missing': missing, 'extra': extra}
+    return report
+
+
+def compile_catalog(catalog):
+    # One shared, sorted key table; each locale is a dense list of values in
+    # key order, with null where a key is untranslated.
+    keys = sorted({k for strings in catalog.values() for k in strings})
+    keys_doc = {'schemaVersion': 1, 'keys': keys}
+    keys_data = _encode(keys_doc)
+    keys_sha256 = hashlib.sha256(keys_data).hexdigest()
+    artifacts = {KEYS_NAME: keys_data}
+    for locale, strings in sorted(catalog.items()):
+        artifacts[f'{locale}.json'] = _encode({
+            'schemaVersion': 1,
+            'locale': locale,
+            'keysSha256': keys_sha256,
+            'values': [strings.get(k) for k in keys],
+        })
+    return artifacts
+
+
+def _encode(doc):
+    return (json.dumps(doc, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def write_if_changed(path, data):
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def write_catalog(artifacts, out_dir=OUT_DIR):
+    written = sum(write_if_changed(os.path.join(out_dir, name), data) for name, data in artifacts.items())
+    # Drop catalogs for locales that no longer exist.
+    for name in os.listdir(out_dir):
+        if name.endswith('.json') and name not in artifacts:
+            os.remove(os.path.join(out_dir, name))
+    return written
+
+
+def _measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        result = fn()
+        resident, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {'parseMedianMs': round(statistics.median(timings) * 1000, 4), 'residentBytes': resident}
+
+
+def bench(catalog, artifacts, locale, repeat=200):
+    # The monolithic map is modelled as one nested JSON document holding
+    # every locale, which is what the const map kept alive in the app
+    # before the catalogs were split out.
+    monolithic = _encode(catalog)
+    keys_data = artifacts[KEYS_NAME]
+    locale_data = artifacts[f'{locale}.json']
+
+    def load_monolithic():
+        return json.loads(monolithic)
+
+    def load_active():
+        keys = json.loads(keys_data)['keys']
+        values = json.loads(locale_data)['values']
+        return {k: v for k, v in zip(keys, values) if v is not None}
+
+    return {
+        'locale': locale,
+        'monolithic': dict(_measure(load_monolithic, repeat), bytes=len(monolithic)),
+        'activeLocale': dict(_measure(load_active, repeat), bytes=len(keys_data) + len(locale_data)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile AppTranslations into per-locale catalogs under assets/translations.')
+    parser.add_argument('--translations', default=TRANSLATIONS_PATH, help='translation_service.dart to read')
+    parser.add_argument('-o', '--out', default=OUT_DIR, help='catalog output directory')
+    parser.add_argument('--allow-missing', action='store_true', help='report key parity problems without failing')
+    parser.add_argument('--check', action='store_true', help='fail if the committed catalogs are out of date')
+    parser.add_argument('--bench', metavar='LOCALE', help='benchmark loading LOCALE against the monolithic map')
+    parser.add_argument('-n', '--repeat', type=int, default=200, help='runs per --bench measurement')
+    args = parser.parse_args(argv)
+
+    try:
+        catalog = load_translations(args.translations)
+        problems = parity(catalog)
+    except (FileNotFoundError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    for locale, diff in problems.items():
+        for key in diff['missing']:
+            print(f'{locale}: missing {key}', file=sys.stderr)
+        for key in diff['extra']:
+            print(f'{locale}: not in {REFERENCE_LOCALE}: {key}', file=sys.stderr)
+    if problems and not args.allow_missing:
+        return 1
+
+    artifacts = compile_catalog(catalog)
+    if args.bench:
+        if f'{args.bench}.json' not in artifacts:
+            parser.error(f'Unknown locale: {args.bench}')
+        print(json.dumps(bench(catalog, artifacts, args.bench, max(args.repeat, 1)), indent=2))
+        return 0
+    if args.check:
+        stale = []
+        for name, data in artifacts.items():
+            try:
+                with open(os.path.join(args.out, name), 'rb') as f:
+                    if f.read() == data:
+                        continue
+            except FileNotFoundError:
+                pass
+            stale.append(name)
+        for name in stale:
+            print(f'stale: {name}', file=sys.stderr)
+        return 1 if stale else 0
+
+    os.makedirs(args.out, exist_ok=True)
+    written = write_catalog(artifacts, args.out)
+    print(f"translations ok ({len(catalog)} locales, {len(json.loads(artifacts[KEYS_NAME])['keys'])} keys, {written} written)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,260 @@
+import argparse
+import hashlib
+import http.client
+import os
+import posixpath
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+from build_bundle_manifest import build_manifest
+from bundles import (
+    BASE, BUNDLE_DIR, BUNDLES, CHUNK_SIZE, MANIFEST_PATH,
+    bundle_path, entry_key, manifest_entries, repacked_entry, sha256_file,
+)
+
+
+STAGING_DIR = os.path.join(BASE, 'tools', '.cache', 'bundle_downloads')
+DEFAULT_JOBS = 4
+ATTEMPTS = 3
+RETRY_DELAY = 2
+USER_AGENT = 'LocalX-bundle-fetcher/1'
+WRAP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class FetchError(Exception):
+    pass
+
+
+class ConnectionPool:
+    # One keep-alive connection per (thread, origin); redirects to a second
+    # host (e.g. GitHub release CDNs) get their own pooled connection.
+    def __init__(self, timeout=60):
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connections(self):
+        if not hasattr(self._local, 'conns'):
+            self._local.conns = {}
+        return self._local.conns
+
+    def _get(self, scheme, netloc):
+        conns = self._connections()
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            conn = conns[(scheme, netloc)] = cls(netloc, timeout=self.timeout)
+        return conn
+
+    def drop(self, origin):
+        conn = self._connections().pop(origin, None)
+        if conn is not None:
+            conn.close()
+
+    def open(self, url, headers=None, max_redirects=10):
+        for _ in range(max_redirects + 1):
+            parts = urlsplit(url)
+            origin = (parts.scheme, parts.netloc)
+            path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+            conn = self._get(*origin)
+            try:
+                conn.request('GET', path, headers={'User-Agent': USER_AGENT, **(headers or {})})
+                resp = conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                self.drop(origin)
+                raise
+            if resp.status in (301, 302, 303, 307, 308):
+                resp.read()
+                url = urljoin(url, resp.getheader('Location'))
+                continue
+            return resp, origin
+        raise FetchError(f'Too many redirects for {url}')
+
+
+def _hash_existing(path, h):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+
+
+def download(url, dest, expected_sha256=None, pool=None):
+    # Streams into <dest>.part, resuming it with a Range request when present,
+    # and only renames it into place once the SHA-256 checks out.
+    pool = pool or ConnectionPool()
+    part = dest + '.part'
+    h = hashlib.sha256()
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    if offset:
+        _hash_existing(part, h)
+
+    resp, origin = pool.open(url, {'Range': f'bytes={offset}-'} if offset else None)
+    try:
+        if resp.status == 416 and offset:
+            resp.read()
+        else:
+            if resp.status == 206 and offset:
+                if not (resp.getheader('Content-Range') or '').startswith(f'bytes {offset}-'):
+                    raise FetchError(f'Unexpected Content-Range from {url}')
+                mode = 'ab'
+            elif resp.status == 200:
+                offset = 0
+                h = hashlib.sha256()
+                mode = 'wb'
+            else:
+                raise FetchError(f'HTTP {resp.status} for {url}')
+
+            expected_len = resp.getheader('Content-Length')
+            written = 0
+            os.makedirs(os.path.dirname(part) or '.', exist_ok=True)
+            with open(part, mode) as f:
+                while True:
+                    chunk = resp.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    h.update(chunk)
+                    written += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            if expected_len is not None and written != int(expected_len):
+                raise FetchError(f'Connection closed after {offset + written} bytes of {url}')
+    except BaseException:
+        pool.drop(origin)
+        raise
+
+    digest = h.hexdigest()
+    if expected_sha256 and digest != expected_sha256:
+        os.remove(part)
+        raise FetchError(f'Checksum mismatch for {url}: expected {expected_sha256}, got {digest}')
+    os.replace(part, dest)
+    return digest
+
+
+def needs_wrap(entry):
+    # Single-binary releases (MailHog, websocat) are shipped zipped.
+    return entry['archive'].endswith('.zip') and not urlsplit(entry['sourceUrl']).path.endswith('.zip')
+
+
+def wrap_zip(src, dest, name):
+    tmp_path = dest + '.tmp'
+    info = zipfile.ZipInfo(name, date_time=WRAP_DATE_TIME)
+    info.create_system = 3
+    info.external_attr = 0o100755 << 16
+    info.compress_type = zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(tmp_path, 'w') as z, open(src, 'rb') as f, z.open(info, 'w') as out:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            out.write(chunk)
+    os.replace(tmp_path, dest)
+
+
+def fetch_entry(entry, bundle_dir=BUNDLE_DIR, expected_sha256=None, pool=None,
+                staging_dir=STAGING_DIR, attempts=ATTEMPTS, verify_existing=False):
+    dest = bundle_path(entry['archive'], bundle_dir)
+    if os.path.exists(dest):
+        if not verify_existing or not expected_sha256 or sha256_file(dest) == expected_sha256:
+            return 'present'
+        os.remove(dest)
+
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    wrap = needs_wrap(entry)
+    name = posixpath.basename(urlsplit(entry['sourceUrl']).path)
+    target = os.path.join(staging_dir, entry['software'], name) if wrap else dest
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    for attempt in range(1, attempts + 1):
+        try:
+            # The manifest hash covers the shipped archive, so it can only be
+            # checked while streaming when nothing is repacked afterwards.
+            download(entry['sourceUrl'], target, None if wrap else expected_sha256, pool)
+            break
+        except (FetchError, http.client.HTTPException, OSError) as e:
+            if attempt == attempts:
+                raise FetchError(f"Failed to download {entry['sourceUrl']} after {attempts} attempts: {e}")
+            time.sleep(RETRY_DELAY * attempt)
+
+    if wrap:
+        wrap_zip(target, dest, name)
+        os.remove(target)
+        if expected_sha256 and sha256_file(dest) != expected_sha256:
+            os.remove(dest)
+            raise FetchError(f'Checksum mismatch for {dest} after wrapping {name}')
+    return 'downloaded'
+
+
+def expected_hashes(entries=BUNDLES, manifest_path=MANIFEST_PATH):
+    # Hash of the upstream archive for each bundle; a repacked entry keeps the
+    # original's hash in sourceSha256.
+    manifest = manifest_entries(manifest_path)
+    hashes = {}
+    for bundle in entries:
+        entry = manifest.get(entry_key(bundle))
+        if not entry:
+            continue
+        if entry['archive'] == bundle['archive'] and 'repackedFrom' not in entry:
+            hashes[bundle['archive']] = entry.get('sha256')
+        elif entry.get('repackedFrom') == bundle['archive']:
+            hashes[bundle['archive']] = entry.get('sourceSha256')
+    return hashes
+
+
+def fetch_all(entries=BUNDLES, bundle_dir=BUNDLE_DIR, jobs=DEFAULT_JOBS, hashes=None,
+              staging_dir=STAGING_DIR, attempts=ATTEMPTS, verify_existing=False,
+              manifest_path=MANIFEST_PATH):
+    hashes = hashes or {}
+    manifest = manifest_entries(manifest_path)
+    pool = ConnectionPool()
+
+    def run(entry):
+        if not verify_existing and repacked_entry(entry, manifest, bundle_dir):
+            return entry['archive'], 'present', None
+        try:
+            status = fetch_entry(entry, bundle_dir, hashes.get(entry['archive']), pool,
+                                 staging_dir, attempts, verify_existing)
+            return entry['archive'], status, None
+        except FetchError as e:
+            return entry['archive'], 'failed', str(e)
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        return list(executor.map(run, entries))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Download LocalX runtime bundles into assets/bundles.')
+    parser.add_argument('archives', nargs='*', metavar='archive', help='manifest archive paths to fetch (default: all)')
+    parser.add_argument('--bundles', default=BUNDLE_DIR, help='bundle directory')
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help='manifest used for expected hashes')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS, help='concurrent downloads')
+    parser.add_argument('--verify-existing', action='store_true', help='re-download bundles whose hash no longer matches')
+    parser.add_argument('--no-manifest', action='store_true', help='do not rebuild the manifest afterwards')
+    args = parser.parse_args(argv)
+
+    entries = [b for b in BUNDLES if not args.archives or b['archive'] in args.archives]
+    unknown = set(args.archives) - {b['archive'] for b in entries}
+    if unknown:
+        parser.error(f"Unknown bundle(s): {', '.join(sorted(unknown))}")
+
+    results = fetch_all(entries, args.bundles, args.jobs, expected_hashes(entries, args.manifest),
+                        verify_existing=args.verify_existing, manifest_path=args.manifest)
+    for archive, status, error in results:
+        if status != 'present':
+            print(f'{status}: {archive}' + (f' ({error})' if error else ''))
+    failed = [r for r in results if r[1] == 'failed']
+    downloaded = [r for r in results if r[1] == 'downloaded']
+
+    if downloaded and not failed and not args.no_manifest:
+        try:
+            # Bundles outside a selective fetch keep their current entries.
+            build_manifest(args.bundles, args.manifest, keep_missing=True)
+        except (OSError, ValueError) as e:
+            print(f'Cannot update manifest: {e}', file=sys.stderr)
+            return 1
+        print(f'Manifest updated at {args.manifest}')
+    print(f'{len(downloaded)} downloaded, {len(results) - len(downloaded) - len(failed)} up to date, {len(failed)} failed')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
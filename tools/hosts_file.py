@@ -0,0 +1,282 @@
+import argparse
+import errno
+import ipaddress
+import os
+import re
+import string
+import sys
+
+
+if os.name == 'nt':
+    HOSTS_PATH = os.path.join(os.environ.get('SystemRoot', r'C:\Windows'), 'System32', 'drivers', 'etc', 'hosts')
+else:
+    HOSTS_PATH = '/etc/hosts'
+BLOCK_BEGIN = '# BEGIN LocalX (managed by LocalX, edits inside this block are overwritten)'
+BLOCK_END = '# END LocalX'
+# DomainService.addDomain's per-line tag; such lines are taken into the
+# block on the next write.
+LEGACY_TAG = '# LocalX'
+DEFAULT_ADDRESS = '127.0.0.1'
+_LABEL = re.compile(r'^(?!-)[a-z0-9-]{1,63}(?<!-)$')
+# Lowers A-Z only. str.lower() can change the length of other text ('İ'
+# becomes two code points), which would shift every offset after it.
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class HostsError(ValueError):
+    pass
+
+
+def clean_domain(domain):
+    # DomainService.addDomain's clean-up, then a hostname check.
+    name = domain.replace('http://', '').replace('https://', '').replace('/', '').strip().lower().rstrip('.')
+    if len(name) > 253 or not all(_LABEL.match(label) for label in name.split('.')):
+        raise HostsError(f'Invalid domain: {domain!r}')
+    return name
+
+
+def _fields(line):
+    # (address, hostnames) for a mapping line, None for blanks and comments.
+    body = line.split('#', 1)[0].split()
+    if len(body) < 2:
+        return None
+    return body[0], [h.lower() for h in body[1:]]
+
+
+def _line_span(text, pos):
+    # Start and end (past the newline) of the line holding pos.
+    end = text.find('\n', pos)
+    return text.rfind('\n', 0, pos) + 1, len(text) if end < 0 else end + 1
+
+
+class HostsFile:
+    # The hosts file parsed once into offsets: the LocalX block, any legacy
+    # tagged lines, and the mapping they hold. Everything else is kept as
+    # the original text and never split into lines, so an ad-blocking list
+    # of 100k entries costs a few substring searches, and edits write it
+    # back byte for byte. Hostnames are indexed on demand, only for the
+    # domains a batch adds.
+    def __init__(self, text):
+        self.text = text
+        first = text.find('\n')
+        self.newline = '\r\n' if first > 0 and text[first - 1] == '\r' else '\n'
+        self.block = self._find_block()
+        self.legacy = []
+        self.managed = {}
+        self._lower = None
+        self._index = {}
+        if self.block:
+            for line in text[self.block[0]:self.block[1]].splitlines()[1:]:
+                fields = _fields(line)
+                if line.strip() != BLOCK_END and fields:
+                    for host in fields[1]:
+                        self.managed.setdefault(host, fields[0])
+        pos = text.find(LEGACY_TAG)
+        while pos >= 0:
+            start, end = _line_span(text, pos)
+            line = text[start:end]
+            fields = _fields(line)
+            if line.rstrip().endswith(LEGACY_TAG) and fields and not self._in_block(start):
+                self.legacy.append((start, end))
+                for host in fields[1]:
+                    self.managed.setdefault(host, fields[0])
+            pos = text.find(LEGACY_TAG, end)
+
+    def _find_block(self):
+        # (start, end) of the first BEGIN line through its END line. A BEGIN
+        # without an END is refused rather than guessed at: taking the rest
+        # of the file would pull every later user mapping into the block.
+        text = self.text
+        pos = text.find(BLOCK_BEGIN)
+        while pos >= 0:
+            start, end = _line_span(text, pos)
+            if text[start:end].strip() == BLOCK_BEGIN:
+                close = text.find(BLOCK_END, end)
+                while close >= 0:
+                    close_start, close_end = _line_span(text, close)
+                    if text[close_start:close_end].strip() == BLOCK_END:
+                        return start, close_end
+                    close = text.find(BLOCK_END, close_end)
+                line = text.count('\n', 0, start) + 1
+                raise HostsError(f'Line {line} opens the LocalX block but no {BLOCK_END!r} line closes it; '
+                                 'add it after the LocalX entries or remove the BEGIN line')
+            pos = text.find(BLOCK_BEGIN, end)
+        return None
+
+    def _in_block(self, pos):
+        return self.block is not None and self.block[0] <= pos < self.block[1]
+
+    def user_addresses(self, domain):
+        # Addresses that lines outside the block (and the legacy lines) map
+        # a hostname to, in file order.
+        if domain not in self._index:
+            if self._lower is None:
+                self._lower = self.text.translate(_ASCII_LOWER)
+            text, found = self._lower, []
+            pos = text.find(domain)
+            while pos >= 0:
+                start, end = _line_span(text, pos)
+                after = pos + len(domain)
+                before = text[start:pos]
+                # A hostname field: after the address, before any comment.
+                if (before[-1:] in (' ', '\t') and before.split() and '#' not in before
+                        and (after == len(text) or text[after] in ' \t\r\n#')
+                        and not self._in_block(start) and (start, end) not in self.legacy):
+                    found.append(self.text[start:end].split()[0])
+                pos = text.find(domain, after)
+            self._index[domain] = found
+        return self._index[domain]
+
+    def apply(self, adds=(), removes=()):
+        # The managed mapping after a batch: removes first, then adds (domain
+        # or (domain, address)). Returns (mapping, conflicts), where conflicts
+        # are domains a user line outside the block maps elsewhere.
+        managed = dict(self.managed)
+        for domain in removes:
+            managed.pop(clean_domain(domain), None)
+        conflicts = []
+        for item in adds:
+            domain, address = (item, DEFAULT_ADDRESS) if isinstance(item, str) else item
+            domain = clean_domain(domain)
+            try:
+                ipaddress.ip_address(address)
+            except ValueError:
+                raise HostsError(f'Invalid address for {domain}: {address!r}')
+            managed[domain] = address
+            if any(a != address for a in self.user_addresses(domain)):
+                conflicts.append(domain)
+        return managed, conflicts
+
+    def render(self, managed):
+        # The whole file with the block rewritten in place (or appended), the
+        # legacy tagged lines dropped, and no block at all when nothing is
+        # managed.
+        nl = self.newline
+        block = ''
+        if managed:
+            width = max(len(a) for a in managed.values())
+            block = ''.join([BLOCK_BEGIN + nl] + [f'{managed[d]:<{width}}  {d}{nl}' for d in sorted(managed)] + [BLOCK_END + nl])
+        text = self.text
+        out = []
+        pos = 0
+        for start, end in sorted(self.legacy + ([self.block] if self.block else [])):
+            out.append(text[pos:start])
+            if (start, end) == self.block:
+                out.append(block)
+            pos = end
+        out.append(text[pos:])
+        if self.block is None and block:
+            if text and not text.endswith('\n'):
+                out.append(nl)
+            out.append(block)
+        return ''.join(out)
+
+
+def read_hosts(path=HOSTS_PATH):
+    # surrogateescape round-trips bytes that are not UTF-8 (legacy code-page
+    # comments on Windows) unchanged.
+    try:
+        with open(path, 'rb') as f:
+            return f.read().decode('utf-8', 'surrogateescape')
+    except FileNotFoundError:
+        return ''
+
+
+def plan(path=HOSTS_PATH, adds=(), removes=()):
+    # (new text or None when the file would not change, conflicts). A None
+    # means no write and so no elevation prompt is needed.
+    text = read_hosts(path)
+    hosts = HostsFile(text)
+    managed, conflicts = hosts.apply(adds, removes)
+    rendered = hosts.render(managed)
+    return (None if rendered == text else rendered), conflicts
+
+
+def write_atomic(path, text):
+    # Temp file in the same directory, flushed, then renamed over the hosts
+    # file with its mode kept. Bind-mounted hosts files (containers) cannot
+    # be renamed over (EBUSY, EXDEV), so those are rewritten in place
+    # instead. A permission error is raised: writing in place would only
+    # turn an atomic failure into a possibly partial one.
+    data = text.encode('utf-8', 'surrogateescape')
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        st = None
+    tmp_path = f'{path}.localx.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if st is not None:
+            os.chmod(tmp_path, st.st_mode & 0o7777)
+            if hasattr(os, 'chown'):
+                try:
+                    os.chown(tmp_path, st.st_uid, st.st_gid)
+                except PermissionError:
+                    pass
+        os.replace(tmp_path, path)
+    except OSError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if e.errno not in (errno.EBUSY, errno.EXDEV) or st is None:
+            raise
+        with open(path, 'r+b') as f:
+            f.write(data)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+    return len(data)
+
+
+def update(path=HOSTS_PATH, adds=(), removes=()):
+    # One read, one parse and at most one write for the whole batch.
+    # Returns (written, conflicts).
+    rendered, conflicts = plan(path, adds, removes)
+    if rendered is None:
+        return False, conflicts
+    write_atomic(path, rendered)
+    return True, conflicts
+
+
+def _parse_add(text):
+    domain, _, address = text.partition('=')
+    return (domain, address) if address else domain
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Add and remove LocalX domain mappings in the hosts file in one atomic write.')
+    parser.add_argument('--hosts', default=HOSTS_PATH, help='hosts file to edit')
+    parser.add_argument('--add', action='append', default=[], metavar='DOMAIN[=ADDRESS]',
+                        help=f'map a domain (default address {DEFAULT_ADDRESS}; repeatable)')
+    parser.add_argument('--remove', action='append', default=[], metavar='DOMAIN', help='unmap a domain (repeatable)')
+    parser.add_argument('--check', action='store_true', help='exit 1 if the batch would change the file, without writing')
+    parser.add_argument('--list', action='store_true', help='print the managed mappings')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.list:
+            for domain, address in sorted(HostsFile(read_hosts(args.hosts)).managed.items()):
+                print(f'{address} {domain}')
+            return 0
+        adds = [_parse_add(a) for a in args.add]
+        if args.check:
+            rendered, conflicts = plan(args.hosts, adds, args.remove)
+            written = False
+        else:
+            written, conflicts = update(args.hosts, adds, args.remove)
+    except (OSError, HostsError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    for domain in conflicts:
+        print(f'warning: {domain} is also mapped outside the LocalX block in {args.hosts}', file=sys.stderr)
+    if args.check:
+        print(f"hosts {'needs update' if rendered is not None else 'up to date'}")
+        return 1 if rendered is not None else 0
+    print(f"hosts ok ({len(args.add)} added, {len(args.remove)} removed, {'written' if written else 'unchanged'})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -21,10 +21,16 @@ fi
 mkdir -p "${PACKAGE_ROOT}/DEBIAN"
 mkdir -p "${PACKAGE_ROOT}/opt/localx"
 mkdir -p "${PACKAGE_ROOT}/usr/share/applications"
-mkdir -p "${PACKAGE_ROOT}/usr/share/icons/hicolor/256x256/apps"
 
 cp -a "${BUNDLE_DIR}/." "${PACKAGE_ROOT}/opt/localx/"
-install -m 0644 "assets/icons/localx.png" "${PACKAGE_ROOT}/usr/share/icons/hicolor/256x256/apps/localx.png"
+# Sized icons come from tools/make_icon.py; localx.png itself is 512x512.
+if compgen -G "assets/icons/hicolor/*/apps/localx.png" >/dev/null; then
+  for icon in assets/icons/hicolor/*/apps/localx.png; do
+    install -D -m 0644 "${icon}" "${PACKAGE_ROOT}/usr/share/icons/${icon#assets/icons/}"
+  done
+else
+  install -D -m 0644 "assets/icons/localx.png" "${PACKAGE_ROOT}/usr/share/icons/hicolor/512x512/apps/localx.png"
+fi
 
 cat > "${PACKAGE_ROOT}/usr/share/applications/localx.desktop" <<'EOF'
 [Desktop Entry]
@@ -0,0 +1,203 @@
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import statistics
+import sys
+import time
+
+from PIL import Image
+
+BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CATALOG_PATH = os.path.join(BASE, "lib", "core", "branding", "brand_catalog.dart")
+# Build output only (gitignored): not listed in pubspec.yaml, and BrandIcon
+# still draws the SVGs, until the app side reads atlas.json.
+OUT_DIR = os.path.join(BASE, "assets", "brands", "atlas")
+INDEX_NAME = "atlas.json"
+ATLAS_NAME = "atlas.png"
+# BrandIcon is drawn at 18-24 logical px; Flutter scales the 24px cell down.
+LOGICAL_SIZE = 24
+PADDING = 2
+COLUMNS = 8
+# Laid out the way Flutter resolves variants: atlas.png is 1.0x and the
+# others live in "<ratio>x/" next to it.
+RATIOS = (1.0, 1.5, 2.0, 3.0)
+
+SECTION_RE = re.compile(r"static const Map<[^>]+> (frameworks|services) = \{(.*?)\n  \};", re.S)
+SPEC_RE = re.compile(r"BrandSpec\(\s*key: '([^']+)',\s*svgAsset: (?:'([^']+)'|null)")
+
+
+def catalog_specs(path=CATALOG_PATH):
+    # Reads the same keys BrandCatalog exposes, so the index never drifts
+    # from the Dart side.
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    specs = {}
+    for section, body in SECTION_RE.findall(source):
+        specs[section] = {key: asset for key, asset in SPEC_RE.findall(body) if asset}
+    if set(specs) != {"frameworks", "services"}:
+        raise ValueError(f"Could not find frameworks and services maps in {path}")
+    return specs
+
+
+def ratio_dir(ratio, out_dir=OUT_DIR):
+    return out_dir if ratio == 1.0 else os.path.join(out_dir, f"{ratio:g}x")
+
+
+def render_svg(data, px):
+    # Imported here so catalog parsing works without libcairo installed.
+    import cairosvg
+
+    png = cairosvg.svg2png(bytestring=data, output_width=px, output_height=px)
+    return Image.open(io.BytesIO(png)).convert("RGBA")
+
+
+def layout(specs):
+    # One cell per distinct SVG: the framework and service copies of a logo
+    # share a rect when their files are identical.
+    cells = {}
+    rects = {section: {} for section in specs}
+    for section in sorted(specs):
+        for key, asset in sorted(specs[section].items()):
+            with open(os.path.join(BASE, *asset.split("/")), "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            if digest not in cells:
+                slot = len(cells)
+                cells[digest] = (slot, data)
+            slot = cells[digest][0]
+            step = LOGICAL_SIZE + 2 * PADDING
+            x = (slot % COLUMNS) * step + PADDING
+            y = (slot // COLUMNS) * step + PADDING
+            rects[section][key] = [x, y, LOGICAL_SIZE, LOGICAL_SIZE]
+    return list(cells.values()), rects
+
+
+def build_atlas(cells, ratio):
+    step = LOGICAL_SIZE + 2 * PADDING
+    rows = max(1, math.ceil(len(cells) / COLUMNS))
+    width = round(min(len(cells), COLUMNS) * step * ratio)
+    height = round(rows * step * ratio)
+    atlas = Image.new("RGBA", (max(width, 1), height), (0, 0, 0, 0))
+    px = round(LOGICAL_SIZE * ratio)
+    for slot, data in cells:
+        x = round(((slot % COLUMNS) * step + PADDING) * ratio)
+        y = round(((slot // COLUMNS) * step + PADDING) * ratio)
+        atlas.paste(render_svg(data, px), (x, y))
+    buf = io.BytesIO()
+    atlas.save(buf, "PNG", optimize=True)
+    return buf.getvalue(), atlas.size
+
+
+def write_if_changed(path, data):
+    try:
+        with open(path, "rb") as f:
+            if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def build(out_dir=OUT_DIR, ratios=RATIOS, catalog_path=CATALOG_PATH):
+    specs = catalog_specs(catalog_path)
+    cells, rects = layout(specs)
+    atlases = {}
+    written = 0
+    for ratio in ratios:
+        data, (width, height) = build_atlas(cells, ratio)
+        path = os.path.join(ratio_dir(ratio, out_dir), ATLAS_NAME)
+        written += write_if_changed(path, data)
+        atlases[f"{ratio:g}"] = {
+            "width": width,
+            "height": height,
+            "sha256": hashlib.sha256(data).hexdigest(),
+        }
+    index = {
+        "schemaVersion": 1,
+        "asset": os.path.relpath(os.path.join(out_dir, ATLAS_NAME), BASE).replace(os.sep, "/"),
+        "logicalSize": LOGICAL_SIZE,
+        "atlases": atlases,
+        # Rects are in logical pixels; multiply by the loaded image's scale.
+        "frameworks": rects["frameworks"],
+        "services": rects["services"],
+    }
+    data = (json.dumps(index, indent=2, sort_keys=True) + "\n").encode("utf-8")
+    written += write_if_changed(os.path.join(out_dir, INDEX_NAME), data)
+    return index, written
+
+
+def bench(out_dir=OUT_DIR, ratio=2.0, repeat=20, catalog_path=CATALOG_PATH):
+    # Startup cost of every brand on screen: one atlas decode plus crops
+    # versus one SVG parse-and-rasterize per logo.
+    specs = catalog_specs(catalog_path)
+    index_path = os.path.join(out_dir, INDEX_NAME)
+    atlas_path = os.path.join(ratio_dir(ratio, out_dir), ATLAS_NAME)
+    for path in (index_path, atlas_path):
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"{path} not found; run make_brand_atlas.py without --bench first")
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    px = round(LOGICAL_SIZE * ratio)
+
+    def atlas_run():
+        atlas = Image.open(atlas_path)
+        atlas.load()
+        for section in ("frameworks", "services"):
+            for x, y, w, h in index[section].values():
+                atlas.crop((round(x * ratio), round(y * ratio), round((x + w) * ratio), round((y + h) * ratio))).load()
+
+    def svg_run():
+        for section in ("frameworks", "services"):
+            for asset in specs[section].values():
+                with open(os.path.join(BASE, *asset.split("/")), "rb") as f:
+                    render_svg(f.read(), px).load()
+
+    results = {}
+    for name, fn in (("atlas", atlas_run), ("svg", svg_run)):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        results[name] = {
+            "medianMs": round(statistics.median(timings) * 1000, 4),
+            "minMs": round(min(timings) * 1000, 4),
+        }
+    results["icons"] = sum(len(v) for v in specs.values())
+    results["ratio"] = ratio
+    results["speedup"] = round(results["svg"]["medianMs"] / max(results["atlas"]["medianMs"], 1e-9), 1)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rasterize brand SVGs into per-ratio sprite atlases with a JSON index.")
+    parser.add_argument("-o", "--out", default=OUT_DIR, help="atlas output directory")
+    parser.add_argument("--bench", action="store_true", help="compare atlas load plus lookup with per-SVG decoding")
+    parser.add_argument("--ratio", type=float, default=2.0, choices=RATIOS, help="device-pixel ratio used by --bench")
+    parser.add_argument("-n", "--repeat", type=int, default=20, help="runs per --bench measurement")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.bench:
+            print(json.dumps(bench(args.out, args.ratio, max(args.repeat, 1)), indent=2))
+            return 0
+        index, written = build(args.out)
+    except (FileNotFoundError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    icons = len(index["frameworks"]) + len(index["services"])
+    print(f"atlas ok ({icons} icons, {len(index['atlases'])} ratios, {written} files written)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
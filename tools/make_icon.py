@@ -1,41 +1,217 @@
-from PIL import Image, ImageDraw, ImageFont
+import argparse
+import hashlib
+import io
+import json
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFont
+
+import build_trace
 
 BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+FONT_PATH = os.path.join(BASE, "assets", "fonts", "Vazir", "Vazir-Bold.ttf")
+CACHE_PATH = os.path.join(BASE, "tools", ".cache", "icons.json")
 BG = "#141414"
 FG = "#FFFFFF"
+TEXT = "LX"
+MASTER_SIZE = 1024
+# Bump when rendering or encoding changes so cached hashes are discarded.
+ICON_FORMAT = "v2"
+
+PNG_SIZE = 512
+ICO_SIZES = [16, 24, 32, 48, 64, 128, 256]
+HICOLOR_SIZES = [16, 24, 32, 48, 64, 128, 256, 512]
+
+PNG_PATH = os.path.join(BASE, "assets", "icons", "localx.png")
+ICO_PATHS = [
+    os.path.join(BASE, "assets", "icons", "localx.ico"),
+    os.path.join(BASE, "windows", "runner", "resources", "app_icon.ico"),
+]
+# Installed into /usr/share/icons/hicolor by tools/installer/linux/build_deb_installer.sh.
+HICOLOR_DIR = os.path.join(BASE, "assets", "icons", "hicolor")
 
-def rounded_rect(draw, xy, radius, fill):
-    x0, y0, x1, y1 = xy
-    draw.rounded_rectangle([x0, y0, x1, y1], radius=radius, fill=fill)
 
-def make_icon(size, text="LX"):
+def hicolor_path(size, out_dir=HICOLOR_DIR):
+    return os.path.join(out_dir, f"{size}x{size}", "apps", "localx.png")
+
+
+def load_font(size, font_path=FONT_PATH):
+    # No silent fallback: a missing font would ship a bitmap-font icon.
+    if not os.path.isfile(font_path):
+        raise FileNotFoundError(f"Icon font not found: {font_path}")
+    return ImageFont.truetype(font_path, size)
+
+
+def render_master(size=MASTER_SIZE, text=TEXT, font_path=FONT_PATH):
     img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
     draw = ImageDraw.Draw(img)
-    radius = int(size * 0.18)
-    rounded_rect(draw, (0, 0, size, size), radius, BG)
+    draw.rounded_rectangle([0, 0, size - 1, size - 1], radius=int(size * 0.18), fill=BG)
+    font = load_font(int(size * 0.54), font_path)
+    draw.text((size / 2, size / 2), text, font=font, fill=FG, anchor="mm")
+    return img
+
+
+def downsample(master, size):
+    # Resampling premultiplied alpha keeps the transparent corners from
+    # bleeding dark fringes into the rounded edge.
+    if size == master.width:
+        return master.copy()
+    small = master.convert("RGBa").resize((size, size), Image.LANCZOS, reducing_gap=3.0)
+    return small.convert("RGBA")
+
+
+def _traced_downsample(master, size):
+    with build_trace.span("resample", size=size) as s:
+        s.bytes_out = size * size * 4
+        return downsample(master, size)
+
+
+def render_sizes(master, sizes, jobs=None):
+    # Pillow releases the GIL while resampling, so threads scale here.
+    sizes = sorted(set(sizes))
+    with ThreadPoolExecutor(max_workers=jobs or min(len(sizes), os.cpu_count() or 1)) as pool:
+        return dict(zip(sizes, pool.map(lambda s: _traced_downsample(master, s), sizes)))
+
+
+def encode_png(img):
+    buf = io.BytesIO()
+    img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def encode_ico(images, sizes=ICO_SIZES):
+    # append_images hands Pillow the pre-scaled frames instead of letting it
+    # resize the first image, which only ever produced the 16px entry.
+    frames = [images[s] for s in sorted(sizes, reverse=True)]
+    buf = io.BytesIO()
+    frames[0].save(buf, format="ICO", sizes=[(s, s) for s in sorted(sizes)], append_images=frames[1:])
+    return buf.getvalue()
 
-    font_size = int(size * 0.54)
-    font_path = r"C:\Windows\Fonts\arialbd.ttf"
+
+def _traced_encode_png(img):
+    with build_trace.span("encode", format="png", size=img.width) as s:
+        data = encode_png(img)
+        s.bytes_out = len(data)
+    return data
+
+
+def build_outputs(images):
+    # Every output comes from the same in-memory set of sizes.
+    outputs = {PNG_PATH: _traced_encode_png(images[PNG_SIZE])}
+    with build_trace.span("encode", format="ico", size=max(ICO_SIZES)) as s:
+        ico = encode_ico(images)
+        s.bytes_out, s.files = len(ico), len(ICO_SIZES)
+    for path in ICO_PATHS:
+        outputs[path] = ico
+    for size in HICOLOR_SIZES:
+        outputs[hicolor_path(size)] = _traced_encode_png(images[size])
+    return outputs
+
+
+def input_key(font_path=FONT_PATH):
+    h = hashlib.sha256(ICON_FORMAT.encode("ascii"))
+    h.update(json.dumps([BG, FG, TEXT, MASTER_SIZE, PNG_SIZE, ICO_SIZES, HICOLOR_SIZES]).encode("utf-8"))
+    with open(font_path, "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def file_sha256(path):
     try:
-        font = ImageFont.truetype(font_path, font_size)
-    except Exception:
-        font = ImageFont.load_default()
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
 
-    draw.text((size / 2, size / 2), text, font=font, fill=FG, anchor="mm")
-    return img
 
+def write_if_changed(path, data):
+    if file_sha256(path) == hashlib.sha256(data).hexdigest():
+        return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
 
-sizes = [16, 32, 48, 64, 128, 256, 512]
-icons = [make_icon(s) for s in sizes]
 
-out_png = os.path.join(BASE, "assets", "icons", "localx.png")
-icons[-1].save(out_png, "PNG")
+def load_cache(path=CACHE_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
 
-out_ico = os.path.join(BASE, "assets", "icons", "localx.ico")
-icons[0].save(out_ico, format="ICO", sizes=[(s, s) for s in sizes[:-1]])
+def save_cache(cache, path=CACHE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def cached_outputs_current(cache, key):
+    # Skips rendering when the inputs are unchanged and every output on disk
+    # still has the hash recorded for it.
+    if cache.get("inputKey") != key:
+        return False
+    hashes = cache.get("outputs", {})
+    return bool(hashes) and all(file_sha256(os.path.join(BASE, rel)) == digest for rel, digest in hashes.items())
+
+
+def build(jobs=None, use_cache=True, cache_path=CACHE_PATH):
+    with build_trace.span("hash") as s:
+        key = input_key()
+        cache = load_cache(cache_path) if use_cache else {}
+        current = use_cache and cached_outputs_current(cache, key)
+        s.files = len(cache.get("outputs", {})) if use_cache else 0
+    if current:
+        return 0, len(cache["outputs"])
+
+    with build_trace.span("render", size=MASTER_SIZE) as s:
+        master = render_master()
+        s.bytes_out = MASTER_SIZE * MASTER_SIZE * 4
+    images = render_sizes(master, [PNG_SIZE] + ICO_SIZES + HICOLOR_SIZES, jobs)
+    outputs = build_outputs(images)
+
+    written = 0
+    for path, data in outputs.items():
+        with build_trace.span("write", path=os.path.relpath(path, BASE).replace(os.sep, "/")) as s:
+            changed = write_if_changed(path, data)
+            s.bytes_in, s.bytes_out, s.files = len(data), len(data) if changed else 0, int(changed)
+        written += changed
+    save_cache({
+        "inputKey": key,
+        "outputs": {
+            os.path.relpath(path, BASE).replace(os.sep, "/"): hashlib.sha256(data).hexdigest()
+            for path, data in sorted(outputs.items())
+        },
+    }, cache_path)
+    return written, len(outputs) - written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the LocalX app icon into every PNG and ICO target.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="resampling threads (default: one per size, up to the CPU count)")
+    parser.add_argument("--force", action="store_true", help="ignore the icon cache and re-render")
+    build_trace.add_argument(parser)
+    args = parser.parse_args(argv)
+    if args.trace:
+        build_trace.enable()
+
+    try:
+        written, unchanged = build(args.jobs, use_cache=not args.force)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"icons ok ({written} written, {unchanged} unchanged)")
+    if args.trace:
+        build_trace.finish(args.trace, "make_icon")
+    return 0
 
-out_ico2 = os.path.join(BASE, "windows", "runner", "resources", "app_icon.ico")
-icons[0].save(out_ico2, format="ICO", sizes=[(s, s) for s in sizes[:-1]])
 
-print("icons ok")
+if __name__ == "__main__":
+    sys.exit(main())
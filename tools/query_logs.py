@@ -0,0 +1,389 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+
+# LogService writes "[<iso>] [LEVEL] [category] message"; messages from
+# LogService.error can span several lines, which stay with their record.
+RECORD_RE = re.compile(rb'^\[(\d{4}-\d\d-\d\dT[^\]\n]*)\] \[([A-Z]+)\] \[([^\]\n]*)\] ', re.M)
+LEVELS = ('DEBUG', 'INFO', 'WARN', 'ERROR')
+LEVEL_IDS = {name.encode('ascii'): i for i, name in enumerate(LEVELS)}
+# Rare levels get per-record postings so "errors for mysql" reads only the
+# matching records instead of whole blocks.
+POSTED_LEVELS = frozenset((LEVELS.index('WARN'), LEVELS.index('ERROR')))
+ACTIVE_NAME = 'localx.log'
+ROTATED_RE = re.compile(r'^localx-.+\.log$')
+INDEX_NAME = '.localx-logs.idx.json'
+INDEX_FORMAT = 3
+BLOCK_SIZE = 256 * 1024
+HEAD_BYTES = 4096
+DURATION_RE = re.compile(r'^(\d+)([smhd])$')
+DURATION_UNITS = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+def default_logs_dir():
+    # LogService keeps its files under path_provider's application support
+    # directory, which is derived from the app id / Windows version resource.
+    if sys.platform == 'win32':
+        root = os.path.join(os.environ.get('APPDATA', ''), 'com.example', 'localx')
+    else:
+        data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+        root = os.path.join(data_home, 'com.example.localx')
+    return os.path.join(root, 'LocalX', 'logs')
+
+
+def log_files(logs_dir):
+    # Rotated names embed the rotation time, so a name sort is chronological;
+    # the active file is always the newest.
+    names = sorted(n for n in os.listdir(logs_dir) if ROTATED_RE.match(n))
+    if os.path.isfile(os.path.join(logs_dir, ACTIVE_NAME)):
+        names.append(ACTIVE_NAME)
+    return names
+
+
+def _head(path):
+    # The first HEAD_BYTES of a file, or all of it while it is shorter.
+    with open(path, 'rb') as f:
+        return f.read(HEAD_BYTES)
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _same_file(head, old_head):
+    # A file that was shorter than HEAD_BYTES is still the same file while
+    # what it held then is still its prefix; appends only extend the head.
+    return head[:len(old_head)] == old_head
+
+
+def _open_map(path, size):
+    f = open(path, 'rb')
+    try:
+        return f, mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+    except BaseException:
+        f.close()
+        raise
+
+
+def scan_blocks(path, start, end, vocab, block_size=BLOCK_SIZE):
+    # Zone map over [start, end): each block records its time range and the
+    # (category, level) pairs it contains, so queries skip blocks outright,
+    # plus block-relative offsets of every WARN/ERROR record.
+    if end <= start:
+        return []
+    f, m = _open_map(path, end)
+    blocks = []
+    try:
+        block = None
+        for match in RECORD_RE.finditer(m, start, end):
+            pos = match.start()
+            if block is None or pos - block['offset'] >= block_size:
+                if block is not None:
+                    block['length'] = pos - block['offset']
+                    blocks.append(_finish(block))
+                block = {'offset': pos, 'minTs': None, 'maxTs': None, 'pairs': set(), 'records': 0, 'postings': {}}
+            ts = match.group(1).decode('ascii', 'replace')
+            level = LEVEL_IDS.get(match.group(2), len(LEVELS))
+            category = match.group(3).decode('utf-8', 'replace')
+            cat_id = vocab.setdefault(category, len(vocab))
+            pair = cat_id * 8 + level
+            block['pairs'].add(pair)
+            if level in POSTED_LEVELS:
+                block['postings'].setdefault(str(pair), []).append(pos - block['offset'])
+            block['records'] += 1
+            if block['minTs'] is None or ts < block['minTs']:
+                block['minTs'] = ts
+            if block['maxTs'] is None or ts > block['maxTs']:
+                block['maxTs'] = ts
+        if block is not None:
+            block['length'] = end - block['offset']
+            blocks.append(_finish(block))
+    finally:
+        m.close()
+        f.close()
+    return blocks
+
+
+def _finish(block):
+    block['pairs'] = sorted(block['pairs'])
+    return block
+
+
+def _complete_end(path, size):
+    # Only index up to the last newline; LogService may be mid-append.
+    if size == 0:
+        return 0
+    f, m = _open_map(path, size)
+    try:
+        return m.rfind(b'\n') + 1
+    finally:
+        m.close()
+        f.close()
+
+
+def load_index(logs_dir):
+    try:
+        with open(os.path.join(logs_dir, INDEX_NAME), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('format') == INDEX_FORMAT:
+            return index
+    except (FileNotFoundError, ValueError):
+        pass
+    return {'format': INDEX_FORMAT, 'categories': [], 'files': {}}
+
+
+def save_index(logs_dir, index):
+    path = os.path.join(logs_dir, INDEX_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def update_index(logs_dir, index=None, block_size=BLOCK_SIZE):
+    # Files are matched by a hash of their first bytes rather than by name, so
+    # a rotation (localx.log -> localx-<ts>.log) keeps its indexed blocks and
+    # only the unseen tail of each file is scanned. Each entry records how
+    # many bytes its hash covers, so a file still shorter than HEAD_BYTES
+    # matches its entry after an append.
+    index = index or load_index(logs_dir)
+    vocab = {name: i for i, name in enumerate(index['categories'])}
+    by_head = {(entry['headLength'], entry['head']): entry for entry in index['files'].values()}
+    lengths = sorted({length for length, _ in by_head}, reverse=True)
+    files = {}
+    scanned = 0
+    for name in log_files(logs_dir):
+        path = os.path.join(logs_dir, name)
+        size = os.path.getsize(path)
+        if size == 0:
+            continue
+        head = _head(path)
+        entry = None
+        for length in lengths:
+            if length <= len(head):
+                entry = by_head.pop((length, _digest(head[:length])), None)
+                if entry is not None:
+                    break
+        if entry is None or entry['indexedTo'] > size:
+            entry = {'indexedTo': 0, 'blocks': []}
+        entry['head'], entry['headLength'] = _digest(head), len(head)
+        end = _complete_end(path, size)
+        if end > entry['indexedTo']:
+            # Re-scan the last block: it may have been cut short last time.
+            blocks = entry['blocks']
+            start = blocks.pop()['offset'] if blocks else 0
+            blocks.extend(scan_blocks(path, start, end, vocab, block_size))
+            scanned += end - start
+            entry['indexedTo'] = end
+        entry['size'] = size
+        files[name] = entry
+    index['files'] = files
+    index['categories'] = sorted(vocab, key=vocab.get)
+    return index, scanned
+
+
+def parse_time(value, now=None):
+    # "1h", "30m", "2d" are relative to now; anything else is an ISO prefix.
+    now = now or datetime.now()
+    m = DURATION_RE.match(value)
+    if m:
+        return (now - timedelta(**{DURATION_UNITS[m.group(2)]: int(m.group(1))})).isoformat()
+    datetime.fromisoformat(value)
+    return value
+
+
+class Query:
+    def __init__(self, since=None, until=None, levels=None, categories=None, text=None):
+        self.since = since
+        self.until = until
+        self.levels = {LEVELS.index(level) for level in levels} if levels else None
+        self.categories = set(categories) if categories else None
+        self.text = text.encode('utf-8') if text else None
+
+    def posted_only(self):
+        return self.levels is not None and self.levels <= POSTED_LEVELS
+
+    def wants_pair(self, pair, category_names):
+        if self.levels is not None and pair % 8 not in self.levels:
+            return False
+        return self.categories is None or category_names[pair // 8] in self.categories
+
+    def wants_block(self, block, category_names):
+        if self.since and block['maxTs'] < self.since:
+            return False
+        if self.until and block['minTs'] > self.until:
+            return False
+        if self.levels is None and self.categories is None:
+            return True
+        return any(self.wants_pair(pair, category_names) for pair in block['pairs'])
+
+    def matches(self, ts, level, category, record):
+        if self.since and ts < self.since:
+            return False
+        if self.until and ts > self.until:
+            return False
+        if self.levels is not None and (level not in LEVELS or LEVELS.index(level) not in self.levels):
+            return False
+        if self.categories is not None and category not in self.categories:
+            return False
+        return self.text is None or self.text in record
+
+
+def iter_records(m, start, end):
+    # Yields (ts, level, category, record bytes) for records starting in
+    # [start, end); a record runs until the next record header.
+    matches = RECORD_RE.finditer(m, start, end)
+    current = next(matches, None)
+    while current is not None:
+        following = next(matches, None)
+        stop = following.start() if following else end
+        yield (
+            current.group(1).decode('ascii', 'replace'),
+            current.group(2).decode('ascii', 'replace'),
+            current.group(3).decode('utf-8', 'replace'),
+            m[current.start():stop],
+        )
+        current = following
+
+
+def _record_at(m, pos, end):
+    match = RECORD_RE.match(m, pos, end)
+    if match is None:
+        return None
+    following = RECORD_RE.search(m, match.end(), end)
+    stop = following.start() if following else end
+    return (
+        match.group(1).decode('ascii', 'replace'),
+        match.group(2).decode('ascii', 'replace'),
+        match.group(3).decode('utf-8', 'replace'),
+        m[pos:stop],
+    )
+
+
+def _posted_records(m, block, query, category_names):
+    offsets = []
+    for pair, rel in block['postings'].items():
+        if query.wants_pair(int(pair), category_names):
+            offsets.extend(rel)
+    end = block['offset'] + block['length']
+    for rel in sorted(offsets):
+        record = _record_at(m, block['offset'] + rel, end)
+        if record is not None:
+            yield record
+
+
+def search(logs_dir, query, index=None):
+    # With an index only the candidate blocks are mapped and parsed;
+    # without one every file is streamed in full.
+    for name in log_files(logs_dir):
+        path = os.path.join(logs_dir, name)
+        if index is not None:
+            entry = index['files'].get(name)
+            if entry is None:
+                continue
+            blocks = [b for b in entry['blocks'] if query.wants_block(b, index['categories'])]
+            end = entry['indexedTo']
+        else:
+            end = _complete_end(path, os.path.getsize(path))
+            blocks = [{'offset': 0, 'length': end}]
+        if not blocks or end == 0:
+            continue
+        f, m = _open_map(path, end)
+        try:
+            for block in blocks:
+                if index is not None and query.posted_only():
+                    records = _posted_records(m, block, query, index['categories'])
+                else:
+                    records = iter_records(m, block['offset'], block['offset'] + block['length'])
+                for ts, level, category, record in records:
+                    if query.matches(ts, level, category, record):
+                        yield name, record
+        finally:
+            m.close()
+            f.close()
+
+
+def follow(logs_dir, query, out, interval=0.5):
+    # Tails localx.log and starts over on the fresh file after a rotation.
+    path = os.path.join(logs_dir, ACTIVE_NAME)
+    head = _head(path) if os.path.exists(path) else b''
+    offset = _complete_end(path, os.path.getsize(path)) if head else 0
+    while True:
+        time.sleep(interval)
+        if not os.path.exists(path):
+            continue
+        size = os.path.getsize(path)
+        current = _head(path)
+        if not _same_file(current, head) or size < offset:
+            offset = 0
+        head = current
+        end = _complete_end(path, size)
+        if end <= offset:
+            continue
+        f, m = _open_map(path, end)
+        try:
+            for ts, level, category, record in iter_records(m, offset, end):
+                if query.matches(ts, level, category, record):
+                    out.write(record.decode('utf-8', 'replace'))
+            out.flush()
+        finally:
+            m.close()
+            f.close()
+        offset = end
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query LocalX logs (localx.log and its rotations) through a sidecar index.')
+    parser.add_argument('--dir', default=os.environ.get('LOCALX_LOG_DIR') or default_logs_dir(), help='logs directory')
+    parser.add_argument('--since', help='start time: ISO timestamp or a duration such as 1h, 30m, 7d')
+    parser.add_argument('--until', help='end time: ISO timestamp or a duration ago')
+    parser.add_argument('-l', '--level', action='append', choices=LEVELS, help='level to include, repeatable')
+    parser.add_argument('-c', '--category', action='append', help='category to include, repeatable')
+    parser.add_argument('-g', '--grep', help='only records containing this text')
+    parser.add_argument('-f', '--follow', action='store_true', help='keep printing new matching records')
+    parser.add_argument('--no-index', action='store_true', help='scan every file instead of using the index')
+    parser.add_argument('--count', action='store_true', help='print the number of matches only')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.dir):
+        print(f'Logs directory not found: {args.dir}', file=sys.stderr)
+        return 1
+    try:
+        query = Query(
+            parse_time(args.since) if args.since else None,
+            parse_time(args.until) if args.until else None,
+            args.level, args.category, args.grep,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    index = None
+    if not args.no_index:
+        index, _ = update_index(args.dir)
+        save_index(args.dir, index)
+
+    out = sys.stdout
+    count = 0
+    try:
+        for _, record in search(args.dir, query, index):
+            count += 1
+            if not args.count:
+                out.write(record.decode('utf-8', 'replace'))
+        if args.count:
+            print(count)
+        if args.follow:
+            follow(args.dir, query, out)
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
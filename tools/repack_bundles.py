@@ -0,0 +1,283 @@
+import argparse
+import calendar
+import json
+import os
+import platform
+import stat
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from bundles import (
+    BUNDLE_DIR, BUNDLES, CHUNK_SIZE, ENTRY_KEYS, MANIFEST_PATH,
+    bundle_path, generated_at, load_manifest, manifest_entries, repacked_entry,
+    sha256_file, write_manifest,
+)
+
+
+# Only layouts VersionManager._extractArchive already handles by extension.
+# Windows extracts .zip through Expand-Archive, so the tar layouts also win
+# there: bsdtar ships with Windows 10 and later.
+FORMATS = {
+    'tar': ('.tar', 'w', {}),
+    'tar.gz-1': ('.tar.gz', 'w:gz', {'compresslevel': 1}),
+    'zip-stored': ('.zip', zipfile.ZIP_STORED, {}),
+    'zip-deflate1': ('.zip', zipfile.ZIP_DEFLATED, {'compresslevel': 1}),
+}
+SOURCE_EXTENSIONS = ('.tar.gz', '.tar.xz', '.tgz', '.tar', '.zip')
+DEFAULT_MAX_GROWTH = 3.0
+DEFAULT_MIN_SPEEDUP = 1.5
+
+
+class RepackError(Exception):
+    pass
+
+
+def source_format(archive):
+    for ext in SOURCE_EXTENSIONS:
+        if archive.endswith(ext):
+            return ext[1:]
+    raise RepackError(f'Unsupported bundle archive: {archive}')
+
+
+def repacked_name(archive, fmt):
+    stem = archive[:-len(source_format(archive)) - 1]
+    return stem + FORMATS[fmt][0]
+
+
+def iter_members(path):
+    # Yields (TarInfo, fileobj or None) for zip and tar bundles alike, reading
+    # strictly forward so solid .tar.xz streams are decompressed once.
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as z:
+            for info in z.infolist():
+                member = tarfile.TarInfo(info.filename.rstrip('/'))
+                member.mtime = calendar.timegm(info.date_time)
+                mode = info.external_attr >> 16
+                if info.is_dir():
+                    member.type = tarfile.DIRTYPE
+                    member.mode = stat.S_IMODE(mode) or 0o755
+                    yield member, None
+                elif stat.S_ISLNK(mode):
+                    member.type = tarfile.SYMTYPE
+                    member.linkname = z.read(info).decode('utf-8')
+                    member.mode = 0o777
+                    yield member, None
+                else:
+                    member.mode = stat.S_IMODE(mode) or 0o644
+                    member.size = info.file_size
+                    with z.open(info) as f:
+                        yield member, f
+        return
+    try:
+        tar = tarfile.open(path, 'r:*')
+    except tarfile.TarError as e:
+        raise RepackError(f'{path} is not a readable archive ({e})')
+    with tar:
+        for member in tar:
+            if member.isfile():
+                with tar.extractfile(member) as f:
+                    yield member, f
+            else:
+                yield member, None
+
+
+def _zip_info(member):
+    info = zipfile.ZipInfo(member.name + ('/' if member.isdir() else ''),
+                           date_time=time.gmtime(max(member.mtime, 315532800))[:6])
+    info.create_system = 3
+    kind = stat.S_IFDIR if member.isdir() else stat.S_IFREG
+    info.external_attr = (kind | member.mode) << 16
+    return info
+
+
+def write_format(src, dest, fmt):
+    _, mode, options = FORMATS[fmt]
+    tmp_path = dest + '.tmp'
+    if isinstance(mode, str):
+        with tarfile.open(tmp_path, mode, format=tarfile.PAX_FORMAT, **options) as tar:
+            for member, f in iter_members(src):
+                tar.addfile(member, f)
+    else:
+        with zipfile.ZipFile(tmp_path, 'w', mode, allowZip64=True, **options) as z:
+            for member, f in iter_members(src):
+                if not (member.isfile() or member.isdir()):
+                    # Links do not survive Expand-Archive or unzip portably.
+                    raise RepackError(f'{member.name}: {fmt} cannot hold links')
+                info = _zip_info(member)
+                info.compress_type = mode
+                if f is None:
+                    z.writestr(info, b'')
+                    continue
+                with z.open(info, 'w', force_zip64=member.size > 0x7FFFFFFF) as out:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        out.write(chunk)
+    os.replace(tmp_path, dest)
+
+
+def decode_seconds(path, repeat=1):
+    # Decompression cost only: every member is read and discarded, so the
+    # figure isolates the CPU work the installer's tar/unzip call repeats.
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, f in iter_members(path):
+            if f is not None:
+                while f.read(CHUNK_SIZE):
+                    pass
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _measure(path, repeat):
+    seconds = decode_seconds(path, repeat)
+    size = os.path.getsize(path)
+    return {
+        'archiveBytes': size,
+        'decodeSeconds': round(seconds, 4),
+    }
+
+
+def choose(original, candidates, max_growth=DEFAULT_MAX_GROWTH, min_speedup=DEFAULT_MIN_SPEEDUP):
+    allowed = [
+        (fmt, m) for fmt, m in candidates.items()
+        if 'error' not in m
+        and m['archiveBytes'] <= original['archiveBytes'] * max_growth
+        and m['decodeSeconds'] * min_speedup <= original['decodeSeconds']
+    ]
+    if not allowed:
+        return None
+    return min(allowed, key=lambda item: (item[1]['decodeSeconds'], item[1]['archiveBytes']))[0]
+
+
+def repack_bundle(bundle, bundle_dir=BUNDLE_DIR, formats=None, repeat=1,
+                  max_growth=DEFAULT_MAX_GROWTH, min_speedup=DEFAULT_MIN_SPEEDUP, work_dir=None):
+    src = bundle_path(bundle['archive'], bundle_dir)
+    original = dict(_measure(src, repeat), format=source_format(bundle['archive']))
+
+    candidates = {}
+    outputs = {}
+    for fmt in formats or FORMATS:
+        out = os.path.join(work_dir, fmt.replace('.', '-') + FORMATS[fmt][0])
+        try:
+            write_format(src, out, fmt)
+        except RepackError as e:
+            candidates[fmt] = {'error': str(e)}
+            continue
+        candidates[fmt] = _measure(out, repeat)
+        candidates[fmt]['speedup'] = round(original['decodeSeconds'] / max(candidates[fmt]['decodeSeconds'], 1e-9), 2)
+        outputs[fmt] = out
+
+    chosen = choose(original, candidates, max_growth, min_speedup)
+    return {'original': original, 'candidates': candidates, 'chosen': chosen}, outputs.get(chosen)
+
+
+def apply_choice(bundle, chosen, output, bundle_dir=BUNDLE_DIR):
+    # Installs the repacked archive next to the original and removes the
+    # original, so only one copy of each runtime ships in assets/bundles.
+    src = bundle_path(bundle['archive'], bundle_dir)
+    archive = repacked_name(bundle['archive'], chosen)
+    source_sha256 = sha256_file(src)
+    sha256 = sha256_file(output)
+    os.replace(output, bundle_path(archive, bundle_dir))
+    if archive != bundle['archive']:
+        os.remove(src)
+    return {
+        'archive': archive,
+        'sha256': sha256,
+        'format': chosen,
+        'repackedFrom': bundle['archive'],
+        'sourceSha256': source_sha256,
+    }
+
+
+def record(manifest_path, repacked):
+    # build_manifest carries these fields over on later rebuilds, as long as
+    # the repacked archive stays on disk.
+    try:
+        manifest = load_manifest(manifest_path)
+    except (FileNotFoundError, ValueError):
+        manifest = {'schemaVersion': 1, 'entries': []}
+    entries = manifest.setdefault('entries', [])
+    by_source = {e.get('repackedFrom', e['archive']): e for e in entries}
+    for bundle, fields in repacked:
+        entry = by_source.get(bundle['archive'])
+        if entry is None:
+            entry = {k: bundle.get(k) for k in ENTRY_KEYS}
+            entries.append(entry)
+        entry.update(fields)
+    manifest['generatedAt'] = generated_at()
+    write_manifest(manifest, manifest_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark faster-to-extract layouts for LocalX runtime bundles and optionally switch to them.')
+    parser.add_argument('archives', nargs='*', metavar='archive', help='BUNDLES archive paths to consider (default: all)')
+    parser.add_argument('--bundles', default=BUNDLE_DIR, help='bundle directory')
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help='manifest to update')
+    parser.add_argument('--format', action='append', dest='formats', choices=list(FORMATS), metavar='NAME',
+                        help=f"candidate layout, repeatable (default: all of {', '.join(FORMATS)})")
+    parser.add_argument('-n', '--repeat', type=int, default=1, help='decode runs per measurement (fastest is kept)')
+    parser.add_argument('--max-growth', type=float, default=DEFAULT_MAX_GROWTH,
+                        help='largest accepted size relative to the original archive')
+    parser.add_argument('--min-speedup', type=float, default=DEFAULT_MIN_SPEEDUP,
+                        help='required decode speedup over the original archive')
+    parser.add_argument('--apply', action='store_true', help='replace bundles with the chosen layout and update the manifest')
+    parser.add_argument('-o', '--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    bundles = [b for b in BUNDLES if not args.archives or b['archive'] in args.archives]
+    unknown = set(args.archives) - {b['archive'] for b in bundles}
+    if unknown:
+        parser.error(f"Unknown bundle(s): {', '.join(sorted(unknown))}")
+
+    previous = manifest_entries(args.manifest)
+    results = {}
+    repacked = []
+    failed = False
+    for bundle in bundles:
+        existing = repacked_entry(bundle, previous, args.bundles)
+        if existing:
+            results[bundle['archive']] = {'skipped': f"already repacked as {existing['archive']} ({existing.get('format')})"}
+            continue
+        if not os.path.isfile(bundle_path(bundle['archive'], args.bundles)):
+            results[bundle['archive']] = {'skipped': 'not downloaded'}
+            continue
+        with tempfile.TemporaryDirectory(dir=args.bundles) as work_dir:
+            try:
+                result, output = repack_bundle(bundle, args.bundles, args.formats, max(args.repeat, 1),
+                                               args.max_growth, args.min_speedup, work_dir)
+            except (RepackError, OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as e:
+                results[bundle['archive']] = {'error': str(e)}
+                failed = True
+                continue
+            if args.apply and result['chosen']:
+                fields = apply_choice(bundle, result['chosen'], output, args.bundles)
+                result['archive'] = fields['archive']
+                repacked.append((bundle, fields))
+        results[bundle['archive']] = result
+
+    if repacked:
+        record(args.manifest, repacked)
+
+    report = {
+        'schemaVersion': 1,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'maxGrowth': args.max_growth,
+        'minSpeedup': args.min_speedup,
+        'bundles': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
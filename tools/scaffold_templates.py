@@ -0,0 +1,183 @@
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from template_specs import INDEX_PATH
+
+
+# Files per task handed to the writer pool: large enough that pool overhead
+# is amortised, small enough that a big scaffold spreads over every worker.
+BATCH_SIZE = 32
+DEFAULT_JOBS = 8
+OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+
+class ScaffoldError(Exception):
+    pass
+
+
+def load_templates(path=INDEX_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['templates']
+
+
+def safe_path(name):
+    # Template members must stay inside the project directory: no absolute
+    # paths, drive letters, backslashes or '..' components.
+    if (not name or name.startswith('/') or '\\' in name or ':' in name.split('/')[0]
+            or posixpath.normpath(name) != name or name == '..' or name.startswith('../')):
+        raise ScaffoldError(f'Unsafe template member: {name!r}')
+    return name
+
+
+def read_plan(zip_path, entry):
+    # (files, dirs) for one template: every member checked for traversal and
+    # every file against the index's size and SHA-256 before anything is
+    # written, so a bad archive leaves the destination untouched.
+    expected = {f['path']: f for f in entry['files']}
+    files = []
+    dirs = set(entry.get('dirs', ()))
+    with zipfile.ZipFile(zip_path) as z:
+        for info in z.infolist():
+            name = info.filename
+            if name.endswith('/'):
+                dirs.add(safe_path(name.rstrip('/')))
+                continue
+            safe_path(name)
+            want = expected.get(name)
+            if want is None:
+                raise ScaffoldError(f'{zip_path}: {name} is not in the template index')
+            data = z.read(info)
+            if len(data) != want['size'] or hashlib.sha256(data).hexdigest() != want['sha256']:
+                raise ScaffoldError(f'{zip_path}: {name} does not match the template index')
+            files.append((name, data))
+    missing = set(expected) - {name for name, _ in files}
+    if missing:
+        raise ScaffoldError(f"{zip_path}: missing {', '.join(sorted(missing))}")
+    return files, sorted(dirs)
+
+
+def directory_set(files, dirs):
+    # Every directory the scaffold needs, parents before children.
+    needed = set(dirs)
+    for name, _ in files:
+        parent = posixpath.dirname(name)
+        while parent and parent not in needed:
+            needed.add(parent)
+            parent = posixpath.dirname(parent)
+    return sorted(needed, key=lambda d: (d.count('/'), d))
+
+
+def _write_batch(dest, batch, durable):
+    # The fsync goes on the descriptor that wrote the file, so a durable
+    # write costs no second open; the pool overlaps the flushes.
+    for name, data in batch:
+        fd = os.open(os.path.join(dest, *name.split('/')), OPEN_FLAGS, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            if durable:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _fsync_dir(path):
+    # A new file or directory is only durable once the directory holding
+    # its entry is. Windows cannot open directories, and NTFS journals the
+    # entries itself.
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def scaffold(files, dirs, dest, jobs=DEFAULT_JOBS, durable=True):
+    # Directories are created once up front and files are written in
+    # parallel batches. When durable, each worker fsyncs the files it wrote,
+    # then every directory that gained an entry is fsynced; nothing outside
+    # dest is flushed.
+    created = not os.path.isdir(dest)
+    os.makedirs(dest, exist_ok=True)
+    needed = directory_set(files, dirs)
+    for d in needed:
+        try:
+            os.mkdir(os.path.join(dest, *d.split('/')))
+        except FileExistsError:
+            pass
+    batches = [files[i:i + BATCH_SIZE] for i in range(0, len(files), BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(batches) or 1))) as pool:
+        list(pool.map(lambda b: _write_batch(dest, b, durable), batches))
+        if durable:
+            synced = [dest] + [os.path.join(dest, *d.split('/')) for d in needed]
+            if created:
+                synced.append(os.path.dirname(os.path.abspath(dest)))
+            list(pool.map(_fsync_dir, synced))
+    return len(files)
+
+
+def scaffold_per_file_flush(files, dirs, dest):
+    # TemplateManager.extractTemplate today: for each member, a recursive
+    # create on its parent, then writeAsBytes(flush: true).
+    for d in dirs:
+        os.makedirs(os.path.join(dest, *d.split('/')), exist_ok=True)
+    for name, data in files:
+        path = os.path.join(dest, *name.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+    return len(files)
+
+
+def verify_tree(expected, dest):
+    # Reads every written file back and checks it against the index entry's
+    # files (path, size, sha256), so a short or corrupted write is caught.
+    for want in expected:
+        path = os.path.join(dest, *want['path'].split('/'))
+        h = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+                size += len(chunk)
+        if size != want['size'] or h.hexdigest() != want['sha256']:
+            raise ScaffoldError(f'{path}: does not match the template index after write')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scaffold a project from a LocalX template archive.')
+    parser.add_argument('template', help='template name from assets/templates/index.json')
+    parser.add_argument('dest', help='project directory to create or fill')
+    parser.add_argument('--index', default=INDEX_PATH, help='template index with the expected file hashes')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS, help='writer threads')
+    parser.add_argument('--no-sync', action='store_true', help='skip fsyncing the written files and directories')
+    args = parser.parse_args(argv)
+
+    templates = load_templates(args.index)
+    entry = templates.get(args.template)
+    if entry is None:
+        parser.error(f'Unknown template: {args.template}')
+    try:
+        files, dirs = read_plan(os.path.join(os.path.dirname(args.index), entry['archive']), entry)
+        count = scaffold(files, dirs, args.dest, max(args.jobs, 1), durable=not args.no_sync)
+        verify_tree(entry['files'], args.dest)
+    except (OSError, zipfile.BadZipFile, ScaffoldError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f'scaffold ok ({count} files)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
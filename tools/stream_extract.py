@@ -0,0 +1,476 @@
+import argparse
+import bz2
+import hashlib
+import json
+import lzma
+import os
+import posixpath
+import queue
+import shutil
+import stat
+import struct
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import zlib
+
+try:
+    import resource
+except ImportError:
+    # Windows: peak RSS is not reported.
+    resource = None
+
+from bundle_index import BundleIndexError, safe_member_name
+from bundles import CHUNK_SIZE
+from repack_bundles import iter_members
+
+
+# Chunks read ahead of the decompressor. Memory is bounded by
+# (QUEUE_DEPTH + 2) * CHUNK_SIZE plus the codec's window, whatever the
+# archive size.
+QUEUE_DEPTH = 4
+MODES = ('stream', 'two-pass')
+
+ZIP_LOCAL = b'PK\x03\x04'
+ZIP_CENTRAL = b'PK\x01\x02'
+ZIP_DESCRIPTOR = b'PK\x07\x08'
+ZIP_END = (b'PK\x05\x06', b'PK\x06\x06', b'PK\x06\x07')
+ZIP_LOCAL_HEADER = struct.Struct('<HHHHHIIIHH')
+ZIP_CENTRAL_HEADER = struct.Struct('<HHHHHHIIIHHHHHII')
+
+
+class ExtractError(Exception):
+    pass
+
+
+class _HashingReader:
+    # Reads the archive on a background thread, hashing each chunk before
+    # queueing it; the consumer decompresses while the next chunk is hashed.
+    # hashlib, zlib and lzma all release the GIL on large buffers.
+    def __init__(self, path):
+        self.hash = hashlib.sha256()
+        self.bytes_read = 0
+        self._queue = queue.Queue(QUEUE_DEPTH)
+        self._stop = threading.Event()
+        self._chunk = b''
+        self._pos = 0
+        self._eof = False
+        self._thread = threading.Thread(target=self._produce, args=(path,), daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce(self, path):
+        try:
+            with open(path, 'rb', buffering=0) as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    self.hash.update(chunk)
+                    self.bytes_read += len(chunk)
+                    if not self._put(chunk):
+                        return
+        except OSError as e:
+            self._put(e)
+            return
+        self._put(None)
+
+    def read(self, n=-1):
+        if self._pos >= len(self._chunk):
+            if self._eof:
+                return b''
+            item = self._queue.get()
+            if isinstance(item, OSError):
+                raise item
+            if item is None:
+                self._eof = True
+                return b''
+            self._chunk, self._pos = item, 0
+        end = len(self._chunk) if n is None or n < 0 else self._pos + n
+        data = self._chunk[self._pos:end]
+        self._pos += len(data)
+        return data
+
+    def read_exact(self, n):
+        parts = []
+        while n:
+            data = self.read(n)
+            if not data:
+                raise ExtractError('Archive is truncated')
+            parts.append(data)
+            n -= len(data)
+        return b''.join(parts)
+
+    def unread(self, data):
+        # Puts back bytes a decoder read past the end of its stream.
+        if data:
+            self._chunk = data + self._chunk[self._pos:]
+            self._pos = 0
+
+    def peek(self, n):
+        data = self.read_exact(n)
+        self.unread(data)
+        return data
+
+    def drain(self):
+        # The whole file must pass through the hash, trailers included.
+        while self.read(CHUNK_SIZE):
+            pass
+        self._thread.join()
+        return self.hash.hexdigest()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class _ZipMember:
+    # One zip member decoded straight from its local header onwards.
+    def __init__(self, src, name, method, flags, crc, size, zip64):
+        if flags & 0x1:
+            raise ExtractError(f'{name}: encrypted zip members are not supported')
+        if method not in (0, 8):
+            raise ExtractError(f'{name}: unsupported zip compression method {method}')
+        if method == 0 and flags & 0x8:
+            raise ExtractError(f'{name}: stored zip members need their size in the local header')
+        self.name = name
+        self._src = src
+        self._inflate = zlib.decompressobj(-15) if method == 8 else None
+        self._remaining = size
+        self._crc = crc
+        self._actual_crc = 0
+        self._descriptor = bool(flags & 0x8)
+        self._zip64 = zip64
+        self._done = False
+
+    def read(self, n=CHUNK_SIZE):
+        while not self._done:
+            if self._inflate is None:
+                data = self._src.read(min(n, self._remaining)) if self._remaining else b''
+                if self._remaining and not data:
+                    raise ExtractError(f'{self.name}: archive is truncated')
+                self._remaining -= len(data)
+                if not self._remaining:
+                    self._finish()
+            else:
+                data = self._inflate.decompress(self._inflate.unconsumed_tail or self._feed(), n)
+                if self._inflate.eof:
+                    self._src.unread(self._inflate.unused_data)
+                    self._finish()
+            if data:
+                self._actual_crc = zlib.crc32(data, self._actual_crc)
+                return data
+        return b''
+
+    def _feed(self):
+        # With a data descriptor the compressed size is unknown; the deflate
+        # stream's own end marker stops the read.
+        n = CHUNK_SIZE if self._descriptor else min(CHUNK_SIZE, self._remaining)
+        data = self._src.read(n)
+        if not data:
+            raise ExtractError(f'{self.name}: archive is truncated')
+        if not self._descriptor:
+            self._remaining -= len(data)
+        return data
+
+    def _finish(self):
+        self._done = True
+        if self._descriptor:
+            if self._src.peek(4) == ZIP_DESCRIPTOR:
+                self._src.read_exact(4)
+            self._crc = struct.unpack('<I', self._src.read_exact(4))[0]
+            self._src.read_exact(16 if self._zip64 else 8)
+
+    def drain(self):
+        while self.read():
+            pass
+        if self._actual_crc != self._crc:
+            raise ExtractError(f'{self.name}: CRC mismatch')
+
+
+def _zip64_sizes(extra, size, compressed):
+    # (size, compressed size, zip64) from a local header's extra field.
+    while len(extra) >= 4:
+        tag, length = struct.unpack('<HH', extra[:4])
+        if tag == 0x0001:
+            fields = extra[4:4 + length]
+            if size == 0xFFFFFFFF:
+                size, fields = struct.unpack('<Q', fields[:8])[0], fields[8:]
+            if compressed == 0xFFFFFFFF:
+                compressed = struct.unpack('<Q', fields[:8])[0]
+            return size, compressed, True
+        extra = extra[4 + length:]
+    return size, compressed, False
+
+
+def _iter_zip_stream(src, attributes):
+    # Walks local headers in file order. Modes and symlinks live in the
+    # central directory at the end, so they are collected into attributes
+    # and applied once the members are on disk.
+    while True:
+        signature = src.read_exact(4)
+        if signature == ZIP_LOCAL:
+            _, flags, method, _, _, crc, compressed, size, name_len, extra_len = ZIP_LOCAL_HEADER.unpack(
+                src.read_exact(ZIP_LOCAL_HEADER.size))
+            name = src.read_exact(name_len).decode('utf-8' if flags & 0x800 else 'cp437')
+            size, compressed, zip64 = _zip64_sizes(src.read_exact(extra_len), size, compressed)
+            member = tarfile.TarInfo(name.rstrip('/'))
+            f = _ZipMember(src, name, method, flags, crc, compressed, zip64)
+            if name.endswith('/'):
+                member.type = tarfile.DIRTYPE
+                member.mode = 0o755
+                yield member, None
+            else:
+                member.mode = 0o644
+                member.size = size
+                yield member, f
+            f.drain()
+        elif signature == ZIP_CENTRAL:
+            fields = ZIP_CENTRAL_HEADER.unpack(src.read_exact(ZIP_CENTRAL_HEADER.size))
+            made_by, name_len, extra_len, comment_len, external = fields[0], fields[9], fields[10], fields[11], fields[14]
+            name = src.read_exact(name_len).decode('utf-8' if fields[2] & 0x800 else 'cp437')
+            src.read_exact(extra_len + comment_len)
+            if made_by >> 8 == 3 and external >> 16:
+                attributes[name.rstrip('/')] = external >> 16
+        elif signature in ZIP_END:
+            return
+        else:
+            raise ExtractError(f'Unexpected zip record {signature!r}')
+
+
+class _Decoder:
+    # Decompresses a tar stream with bounded output per read; tarfile's own
+    # stream mode inflates a whole input chunk at once, which balloons on
+    # highly compressible members.
+    def __init__(self, src):
+        magic = src.peek(6)
+        if magic[:2] == b'\x1f\x8b':
+            self._codec = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif magic == b'\xfd7zXZ\x00':
+            self._codec = lzma.LZMADecompressor()
+        elif magic[:3] == b'BZh':
+            self._codec = bz2.BZ2Decompressor()
+        else:
+            self._codec = None
+        self._src = src
+        self._eof = False
+
+    def read(self, n=CHUNK_SIZE):
+        codec = self._codec
+        if codec is None:
+            return self._src.read(n)
+        while not self._eof:
+            if not hasattr(codec, 'needs_input'):
+                data = codec.decompress(codec.unconsumed_tail or self._input(), n)
+            else:
+                data = codec.decompress(self._input() if codec.needs_input else b'', n)
+            if codec.eof:
+                self._src.unread(codec.unused_data)
+                self._eof = True
+            if data:
+                return data
+        return b''
+
+    def _input(self):
+        data = self._src.read(CHUNK_SIZE)
+        if not data:
+            raise ExtractError('Archive is truncated')
+        return data
+
+
+def _iter_tar_stream(src):
+    with tarfile.open(fileobj=_Decoder(src), mode='r|', bufsize=CHUNK_SIZE) as tar:
+        for member in tar:
+            if member.isfile():
+                yield member, tar.extractfile(member)
+            else:
+                yield member, None
+
+
+def _check_link(name, target):
+    resolved = posixpath.normpath(posixpath.join(posixpath.dirname(name), target))
+    if target.startswith('/') or resolved == '..' or resolved.startswith('../'):
+        raise ExtractError(f'{name}: link escapes the install tree ({target})')
+
+
+def _path(dest, name):
+    return os.path.join(dest, *name.split('/'))
+
+
+def _within(root, path):
+    return os.path.commonpath([root, path]) == root
+
+
+def _member_path(dest, name):
+    # Where a member may be written: its parent must resolve inside dest and
+    # the path must not already be a symlink, which open() would follow.
+    path = _path(dest, name)
+    if not _within(os.path.realpath(dest), os.path.realpath(os.path.dirname(path))) or os.path.islink(path):
+        raise ExtractError(f'{name}: path escapes the install tree')
+    return path
+
+
+def extract_members(members, dest, links):
+    # Shared by both modes, so the comparison only differs in how the
+    # archive is read and checked. Symlinks are only collected into links;
+    # extract() creates them once the archive is verified.
+    files = 0
+    for member, f in members:
+        try:
+            name = safe_member_name(member.name)
+        except BundleIndexError as e:
+            raise ExtractError(str(e))
+        path = _member_path(dest, name)
+        if member.isdir():
+            os.makedirs(path, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if member.issym():
+            _check_link(name, member.linkname)
+            links.append((name, member.linkname))
+        elif member.islnk():
+            shutil.copy2(_member_path(dest, safe_member_name(member.linkname)), path)
+        elif f is not None:
+            with open(path, 'wb') as out:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    out.write(chunk)
+            os.chmod(path, member.mode & 0o777 or 0o644)
+            files += 1
+    return files
+
+
+def _apply_zip_attributes(dest, attributes, links):
+    # Zip symlinks arrive as small files holding the target; they are
+    # removed here and queued with the other links.
+    count = 0
+    for name, mode in attributes.items():
+        name = safe_member_name(name)
+        path = _member_path(dest, name)
+        if stat.S_ISLNK(mode):
+            count += 1
+            with open(path, 'r', encoding='utf-8') as f:
+                target = f.read()
+            _check_link(name, target)
+            os.remove(path)
+            links.append((name, target))
+        elif stat.S_IMODE(mode) and os.path.isfile(path):
+            os.chmod(path, stat.S_IMODE(mode))
+    return count
+
+
+def _create_links(dest, links):
+    # Runs after every regular file is written, so nothing is written
+    # through a link. Each link passed _check_link alone, but a chain
+    # (d/l -> .., then x -> d/l/..) can still leave the tree, so every link
+    # is resolved for real once all of them exist.
+    for name, target in links:
+        os.symlink(target, _member_path(dest, name))
+    root = os.path.realpath(dest)
+    for name, target in links:
+        if not _within(root, os.path.realpath(_path(dest, name))):
+            raise ExtractError(f'{name}: link escapes the install tree ({target})')
+
+
+def _extract_stream(path, staging, links):
+    src = _HashingReader(path)
+    try:
+        if src.peek(4) in (ZIP_LOCAL,) + ZIP_END:
+            attributes = {}
+            files = extract_members(_iter_zip_stream(src, attributes), staging, links)
+            files -= _apply_zip_attributes(staging, attributes, links)
+        else:
+            files = extract_members(_iter_tar_stream(src), staging, links)
+        return src.drain(), files
+    except tarfile.TarError as e:
+        raise ExtractError(f'{path} is not a readable archive ({e})')
+    finally:
+        src.close()
+
+
+def _extract_two_pass(path, staging, expected, links):
+    # What VersionManager does today: readAsBytes + sha256, then a second
+    # read by the extractor.
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    if expected and digest != expected:
+        return digest, 0
+    return digest, extract_members(iter_members(path), staging, links)
+
+
+def extract(path, dest, expected=None, mode='stream'):
+    # Members land in a staging directory beside dest, which replaces dest
+    # only once the archive's SHA-256 has matched. Symlinks are created
+    # after that check too.
+    parent = os.path.dirname(os.path.abspath(dest))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.extract-', dir=parent)
+    links = []
+    try:
+        if mode == 'stream':
+            digest, files = _extract_stream(path, staging, links)
+        else:
+            digest, files = _extract_two_pass(path, staging, expected, links)
+        if expected and digest != expected:
+            raise ExtractError(f'{path}: SHA-256 mismatch (expected {expected}, got {digest})')
+        _create_links(staging, links)
+        if os.path.exists(dest):
+            shutil.rmtree(dest)
+        os.replace(staging, dest)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return {'sha256': digest, 'files': files}
+
+
+def peak_rss_bytes():
+    # VmHWM starts afresh at exec; ru_maxrss on Linux carries over the
+    # parent's peak from before the fork.
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Verify and extract a bundle archive in one streaming pass.')
+    parser.add_argument('archive', help='zip or tar bundle to extract')
+    parser.add_argument('dest', help='install directory (replaced on success)')
+    parser.add_argument('--sha256', help='expected archive SHA-256, as listed in manifest.json')
+    parser.add_argument('--mode', choices=MODES, default='stream', help='two-pass reproduces the current installer for comparison')
+    parser.add_argument('--json', action='store_true', help='print timing and peak RSS as JSON')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        result = extract(args.archive, args.dest, args.sha256, args.mode)
+    except (OSError, ExtractError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    seconds = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(dict(result, mode=args.mode, seconds=round(seconds, 4), peakRssBytes=peak_rss_bytes())))
+    else:
+        print(f"extract ok ({result['files']} files, {result['sha256'][:16]}, {seconds:.2f}s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
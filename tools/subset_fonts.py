@@ -0,0 +1,171 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+from translations import TRANSLATIONS_PATH, load_translations
+
+
+BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+FONT_DIR = os.path.join(BASE, 'assets', 'fonts', 'Vazir')
+OUT_DIR = os.path.join(FONT_DIR, 'subset')
+FONTS = ('Vazir-Regular.ttf', 'Vazir-Bold.ttf')
+# Printable ASCII covers paths, URLs, ports and other runtime text that the
+# Vazir theme renders outside the catalog.
+ASCII = frozenset(range(0x20, 0x7F))
+# Persian and Arabic-Indic digits, the Arabic comma, semicolon and question
+# mark, and ZWNJ: runtime text (counts, ports, user input) can hold them even
+# when no catalog string does.
+PERSIAN = frozenset(range(0x06F0, 0x06FA)) | frozenset(range(0x0660, 0x066A)) | {0x060C, 0x061B, 0x061F, 0x200C}
+
+
+class SubsetError(Exception):
+    pass
+
+
+def required_codepoints(catalog, extra=''):
+    codepoints = set(ASCII | PERSIAN)
+    for strings in catalog.values():
+        for value in strings.values():
+            codepoints.update(ord(c) for c in value if c not in '\n\r\t')
+    codepoints.update(ord(c) for c in extra)
+    return codepoints
+
+
+def missing_codepoints(font, codepoints):
+    cmap = font.getBestCmap() or {}
+    return sorted(cp for cp in codepoints if cp not in cmap)
+
+
+def _describe(codepoints):
+    return ', '.join(f'U+{cp:04X} {chr(cp)!r}' for cp in codepoints)
+
+
+def subset_font(path, codepoints):
+    # Full layout closure keeps the GSUB positional forms and ligatures the
+    # Persian strings shape into, not just the base code points.
+    options = subset.Options()
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+    options.name_languages = ['*']
+    options.notdef_outline = True
+    options.glyph_names = False
+    options.drop_tables += ['DSIG']
+    font = TTFont(path, recalcTimestamp=False)
+    missing = missing_codepoints(font, codepoints)
+    if missing:
+        raise SubsetError(f'{os.path.basename(path)} has no glyph for {_describe(missing)}')
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=sorted(codepoints))
+    subsetter.subset(font)
+
+    buf = io.BytesIO()
+    font.save(buf)
+    data = buf.getvalue()
+    # Re-open the result so a dropped mapping fails the build rather than
+    # rendering as tofu.
+    missing = missing_codepoints(TTFont(io.BytesIO(data)), codepoints)
+    if missing:
+        raise SubsetError(f'subset of {os.path.basename(path)} lost {_describe(missing)}')
+    return data
+
+
+def load_seconds(data, repeat):
+    # Parsing every table approximates the engine's first-use cost.
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        font = TTFont(io.BytesIO(data), lazy=False)
+        font.ensureDecompiled()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def write_if_changed(path, data):
+    try:
+        with open(path, 'rb') as f:
+            if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def check(codepoints, out_dir=OUT_DIR, fonts=FONTS):
+    problems = []
+    for name in fonts:
+        path = os.path.join(out_dir, name)
+        if not os.path.isfile(path):
+            problems.append(f'{name}: subset not built')
+            continue
+        missing = missing_codepoints(TTFont(path), codepoints)
+        if missing:
+            problems.append(f'{name}: missing {_describe(missing)}')
+    return problems
+
+
+def run(codepoints, font_dir=FONT_DIR, out_dir=OUT_DIR, fonts=FONTS, repeat=10):
+    report = {}
+    for name in fonts:
+        with open(os.path.join(font_dir, name), 'rb') as f:
+            original = f.read()
+        data = subset_font(os.path.join(font_dir, name), codepoints)
+        written = write_if_changed(os.path.join(out_dir, name), data)
+        original_ms = load_seconds(original, repeat) * 1000
+        subset_ms = load_seconds(data, repeat) * 1000
+        report[name] = {
+            'originalBytes': len(original),
+            'subsetBytes': len(data),
+            'savedBytes': len(original) - len(data),
+            'originalLoadMs': round(original_ms, 3),
+            'subsetLoadMs': round(subset_ms, 3),
+            'written': written,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Subset the bundled Vazir fonts to the glyphs AppTranslations needs.')
+    parser.add_argument('--translations', default=TRANSLATIONS_PATH, help='translation_service.dart to read strings from')
+    parser.add_argument('-o', '--out', default=OUT_DIR, help='directory for the subsetted fonts')
+    parser.add_argument('--extra', default='', help='additional characters to keep')
+    parser.add_argument('--check', action='store_true', help='only verify the existing subsets cover the catalog')
+    parser.add_argument('-n', '--repeat', type=int, default=10, help='font parses per load-time measurement')
+    args = parser.parse_args(argv)
+
+    try:
+        codepoints = required_codepoints(load_translations(args.translations), args.extra)
+    except (FileNotFoundError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    if args.check:
+        problems = check(codepoints, args.out)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        print(f"fonts {'FAILED' if problems else 'ok'} ({len(codepoints)} code points)")
+        return 1 if problems else 0
+
+    try:
+        report = run(codepoints, out_dir=args.out, repeat=max(args.repeat, 1))
+    except SubsetError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(json.dumps({'codepoints': len(codepoints), 'fonts': report}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
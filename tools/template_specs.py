@@ -0,0 +1,202 @@
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import sys
+
+
+BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SPEC_DIR = os.path.join(BASE, 'tools', 'templates')
+INDEX_PATH = os.path.join(BASE, 'assets', 'templates', 'index.json')
+CACHE_PATH = os.path.join(BASE, 'tools', '.cache', 'template_index.json')
+
+# Mirrors the TemplateType enum in lib/core/services/template_manager.dart.
+TEMPLATE_TYPES = (
+    'laravel', 'react', 'vue', 'nextjs', 'svelte', 'angular',
+    'nuxt', 'nodejs', 'php', 'fastapi', 'django', 'wordpress',
+)
+SPEC_KEYS = {'name', 'title', 'templateType', 'dirs'}
+# Bump when the compiled index layout changes so cached indexes are rebuilt.
+INDEX_FORMAT = 'v1'
+
+
+class SpecError(ValueError):
+    pass
+
+
+def spec_names(spec_dir=SPEC_DIR):
+    return sorted(
+        n for n in os.listdir(spec_dir)
+        if os.path.isfile(os.path.join(spec_dir, n, 'spec.json'))
+    )
+
+
+def _walk(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            full_path = os.path.join(dirpath, filename)
+            yield full_path, os.path.relpath(full_path, root).replace(os.sep, '/')
+
+
+def fingerprint(spec_dir=SPEC_DIR):
+    # Cheap stat-only key: any added, removed, resized or touched spec file
+    # invalidates the compiled index.
+    h = hashlib.sha256(INDEX_FORMAT.encode('ascii'))
+    for full_path, rel in _walk(spec_dir):
+        st = os.stat(full_path)
+        h.update(f'{rel}\0{st.st_size}\0{st.st_mtime_ns}\n'.encode('utf-8'))
+    return h.hexdigest()
+
+
+def _is_safe_path(path):
+    return (
+        bool(path)
+        and not path.startswith('/')
+        and '\\' not in path
+        and posixpath.normpath(path) == path
+        and not path.startswith('..')
+    )
+
+
+def compile_spec(name, spec_dir=SPEC_DIR):
+    root = os.path.join(spec_dir, name)
+    try:
+        with open(os.path.join(root, 'spec.json'), 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+    except ValueError as e:
+        raise SpecError(f'{name}: spec.json is not valid JSON ({e})')
+
+    errors = []
+    unknown = sorted(set(spec) - SPEC_KEYS)
+    if unknown:
+        errors.append(f"unknown key(s) {', '.join(unknown)}")
+    if spec.get('name') != name:
+        errors.append(f"name {spec.get('name')!r} does not match directory")
+    if not isinstance(spec.get('title'), str) or not spec['title'].strip():
+        errors.append('title must be a non-empty string')
+    if spec.get('templateType') not in TEMPLATE_TYPES:
+        errors.append(f"templateType {spec.get('templateType')!r} is not a TemplateType")
+    dirs = spec.get('dirs', [])
+    if not isinstance(dirs, list) or not all(isinstance(d, str) and _is_safe_path(d) for d in dirs):
+        errors.append('dirs must be a list of relative paths')
+        dirs = []
+
+    files = []
+    files_root = os.path.join(root, 'files')
+    for full_path, rel in _walk(files_root):
+        with open(full_path, 'rb') as f:
+            data = f.read()
+        if rel.endswith('.json'):
+            try:
+                json.loads(data.decode('utf-8'))
+            except ValueError as e:
+                errors.append(f'{rel} is not valid JSON ({e})')
+        files.append({'path': rel, 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()})
+    files.sort(key=lambda f: f['path'])
+    if not files and not dirs:
+        errors.append('template has no files')
+
+    if errors:
+        raise SpecError('\n'.join(f'{name}: {e}' for e in errors))
+    return {
+        'name': name,
+        'title': spec['title'],
+        'templateType': spec['templateType'],
+        'archive': f'{name}.zip',
+        'files': files,
+        'dirs': sorted(d + '/' for d in dirs),
+        'totalBytes': sum(f['size'] for f in files),
+    }
+
+
+def compile_specs(spec_dir=SPEC_DIR):
+    templates = {}
+    errors = []
+    for name in spec_names(spec_dir):
+        try:
+            templates[name] = compile_spec(name, spec_dir)
+        except SpecError as e:
+            errors.append(str(e))
+
+    seen = {}
+    for name, entry in templates.items():
+        other = seen.setdefault(entry['templateType'], name)
+        if other != name:
+            errors.append(f"{name}: templateType {entry['templateType']!r} already used by {other}")
+    if errors:
+        raise SpecError('\n'.join(errors))
+    return {'schemaVersion': 1, 'templates': templates}
+
+
+def load_index(spec_dir=SPEC_DIR, cache_path=CACHE_PATH):
+    key = os.path.abspath(spec_dir)
+    stamp = fingerprint(spec_dir)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        cache = {}
+    cached = cache.get(key)
+    if cached and cached.get('fingerprint') == stamp:
+        return cached['index']
+
+    index = compile_specs(spec_dir)
+    cache[key] = {'fingerprint': stamp, 'index': index}
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+    return index
+
+
+def read_files(entry, spec_dir=SPEC_DIR):
+    root = os.path.join(spec_dir, entry['name'], 'files')
+    files = {}
+    for item in entry['files']:
+        with open(os.path.join(root, *item['path'].split('/')), 'rb') as f:
+            files[item['path']] = f.read()
+    for path in entry['dirs']:
+        files[path] = None
+    return files
+
+
+def write_index(index, path=INDEX_PATH):
+    data = (json.dumps(index, indent=2, sort_keys=True) + '\n').encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate LocalX template specs and compile the template index.')
+    parser.add_argument('--specs', default=SPEC_DIR, help='template spec directory')
+    parser.add_argument('-o', '--out', default=INDEX_PATH, help='where to write the compiled index')
+    parser.add_argument('--check', action='store_true', help='validate only, do not write the index')
+    args = parser.parse_args(argv)
+
+    try:
+        index = compile_specs(args.specs) if args.check else load_index(args.specs)
+    except SpecError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.check:
+        print(f"specs ok ({len(index['templates'])} templates)")
+        return 0
+    changed = write_index(index, args.out)
+    print(f"index ok ({len(index['templates'])} templates, {'written' if changed else 'unchanged'})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+console.log('LocalX Node app running');
@@ -0,0 +1,3 @@
+<?php
+
+echo 'Hello LocalX WordPress (placeholder)';
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import lzma
+import os
+import zipfile
+
+import pytest
+
+import bundle_delta
+from bundle_delta import DeltaError, apply_delta, make_delta
+
+
+def make_zip(path, files):
+    with zipfile.ZipFile(path, 'w') as z:
+        for name, data in files.items():
+            z.writestr(name, data)
+    return str(path)
+
+
+@pytest.fixture
+def versions(tmp_path):
+    common = b''.join(bytes([i % 251]) * 64 for i in range(2000))
+    old = make_zip(tmp_path / 'old.zip', {'bin/php': common + b'8.5.0', 'README': b'readme', 'ext/a.so': b'a' * 500})
+    new = make_zip(tmp_path / 'new.zip', {'bin/php': common + b'8.5.1', 'README': b'readme', 'ext/b.so': b'a' * 500})
+    return old, new
+
+
+def test_round_trip_patches_changed_files(versions, tmp_path):
+    pytest.importorskip('bsdiff4')
+    old, new = versions
+    delta = make_delta(old, new, str(tmp_path / 'd.delta.zip'))
+    ops = {e['path']: e.get('op') for e in delta['entries']}
+    assert ops == {'README': 'same', 'bin/php': 'patch', 'ext/b.so': 'copy'}
+
+    out = tmp_path / 'install'
+    apply_delta(old, str(tmp_path / 'd.delta.zip'), str(out))
+    assert (out / 'bin' / 'php').read_bytes().endswith(b'8.5.1')
+    assert sorted(os.listdir(out)) == ['README', 'bin', 'ext']
+
+
+def test_make_refuses_to_drop_patches_silently(versions, tmp_path, monkeypatch):
+    old, new = versions
+    monkeypatch.setattr(bundle_delta, 'bsdiff4', None)
+    with pytest.raises(DeltaError, match='bsdiff4'):
+        make_delta(old, new, str(tmp_path / 'd.delta.zip'))
+    delta = make_delta(old, new, str(tmp_path / 'd.delta.zip'), patch=False)
+    assert {e.get('op') for e in delta['entries']} == {'same', 'add', 'copy'}
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='POSIX modes')
+def test_install_dir_is_not_left_private(versions, tmp_path):
+    old, new = versions
+    make_delta(old, new, str(tmp_path / 'd.delta.zip'), patch=False)
+    out = tmp_path / 'install'
+    umask = os.umask(0o022)
+    try:
+        apply_delta(old, str(tmp_path / 'd.delta.zip'), str(out))
+        assert os.stat(out).st_mode & 0o777 == 0o755
+        os.chmod(out, 0o750)
+        apply_delta(old, str(tmp_path / 'd.delta.zip'), str(out))
+        assert os.stat(out).st_mode & 0o777 == 0o750
+    finally:
+        os.umask(umask)
+
+
+def crafted_delta(path, entries, blobs=()):
+    # A hand-built delta whose tree hash matches its entries, so only the
+    # path checks stand between it and the filesystem.
+    with zipfile.ZipFile(path, 'w') as z:
+        for name, data in blobs:
+            z.writestr(name, lzma.compress(data))
+        z.writestr('delta.json', json.dumps({
+            'format': bundle_delta.DELTA_FORMAT,
+            'to': {'treeSha256': bundle_delta.tree_sha256({e['path']: e for e in entries})},
+            'entries': entries,
+        }))
+    return str(path)
+
+
+def add(path, data, blob):
+    return {'path': path, 'type': 'file', 'mode': 0o644, 'mtime': 0, 'op': 'add', 'blob': blob,
+            'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+
+
+def link(path, target, kind='symlink'):
+    return {'path': path, 'type': kind, 'mode': 0o777, 'mtime': 0, 'target': target}
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='symlinks need privileges on Windows')
+@pytest.mark.parametrize('links', [
+    [link('pkg/a', 'ABS')],
+    [link('pkg/a', '../../outside')],
+    [link('pkg/d/l1', '../..'), link('pkg/l2', 'd/l1/..')],
+    [link('pkg/a', '../../outside', 'hardlink')],
+])
+def test_links_cannot_carry_writes_out_of_the_tree(versions, tmp_path, links):
+    old, _ = versions
+    outside = tmp_path / 'outside'
+    outside.mkdir()
+    links = [dict(e, target=e['target'].replace('ABS', str(outside))) for e in links]
+    delta = crafted_delta(tmp_path / 'evil.delta.zip', links + [add('pkg/a/pwn.txt', b'pwned', 'data/0')],
+                          [('data/0', b'pwned')])
+
+    with pytest.raises(DeltaError, match='escapes'):
+        apply_delta(old, delta, str(tmp_path / 'install'))
+    assert os.listdir(outside) == []
+    assert not (tmp_path / 'install').exists()
+    assert [n for n in os.listdir(tmp_path) if n.startswith('.delta-')] == []
+
+
+def test_copy_source_must_stay_in_the_old_tree(versions, tmp_path):
+    old, _ = versions
+    entry = dict(add('x', b'secret', 'unused'), op='copy', source='../../etc/passwd')
+    with pytest.raises(DeltaError, match='Unsafe member path'):
+        apply_delta(old, crafted_delta(tmp_path / 'evil.delta.zip', [entry]), str(tmp_path / 'install'))
+
+
+def test_apply_refuses_a_delta_that_does_not_match_the_manifest(versions, tmp_path, monkeypatch, capsys):
+    old, new = versions
+    (tmp_path / 'php').mkdir()
+    delta_path = tmp_path / 'php' / '1-to-2-linux.delta.zip'
+    make_delta(old, new, str(delta_path), patch=False)
+    manifest = tmp_path / 'manifest.json'
+    deltas = [{'fromVersion': '1', 'archive': 'php/1-to-2-linux.delta.zip', 'sha256': '0' * 64}]
+    manifest.write_text(json.dumps({'schemaVersion': 1, 'entries': [{'archive': 'php/2-linux.zip', 'deltas': deltas}]}))
+
+    args = ['apply', old, str(delta_path), '--out-dir', str(tmp_path / 'install'), '--manifest', str(manifest)]
+    assert bundle_delta.main(args) == 1
+    assert 'does not match the manifest' in capsys.readouterr().err
+    assert not (tmp_path / 'install').exists()
+
+    deltas[0]['sha256'] = hashlib.sha256(delta_path.read_bytes()).hexdigest()
+    manifest.write_text(json.dumps({'schemaVersion': 1, 'entries': [{'archive': 'php/2-linux.zip', 'deltas': deltas}]}))
+    assert bundle_delta.main(args) == 0
+    assert (tmp_path / 'install' / 'README').read_bytes() == b'readme'
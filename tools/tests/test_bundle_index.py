@@ -0,0 +1,82 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+import bundle_index
+from bundle_index import SeekableBundle, build_seekable
+
+
+FILES = {'bin/php': b'#!php' * 4000, 'README': b'readme', 'ext/a.so': bytes(range(256)) * 40}
+
+
+def make_zip(path):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        for name, data in FILES.items():
+            z.writestr(name, data)
+    return str(path)
+
+
+def make_tar(path):
+    with tarfile.open(path, 'w:gz') as tar:
+        for name, data in FILES.items():
+            info = tarfile.TarInfo(name)
+            info.size, info.mode = len(data), 0o755
+            tar.addfile(info, io.BytesIO(data))
+        info = tarfile.TarInfo('bin/php8.5')
+        info.type, info.linkname, info.mode = tarfile.LNKTYPE, 'bin/php', 0o755
+        tar.addfile(info)
+    return str(path)
+
+
+@pytest.mark.parametrize('make', [make_zip, make_tar])
+def test_member_is_read_back_from_its_offset(tmp_path, make):
+    src = make(tmp_path / ('src.zip' if make is make_zip else 'src.tar.gz'))
+    pak = str(tmp_path / 'out' / 'src.pak')
+    index = build_seekable(src, pak)
+    assert set(FILES) <= set(index['members'])
+
+    with SeekableBundle(pak) as bundle:
+        for name in reversed(list(FILES)):
+            assert bundle.read(name) == FILES[name]
+        out = bundle.extract('ext/a.so', str(tmp_path / 'x'))
+    with open(out, 'rb') as f:
+        assert f.read() == FILES['ext/a.so']
+
+
+def test_hardlink_resolves_to_its_target_data(tmp_path):
+    pak = str(tmp_path / 'src.pak')
+    index = build_seekable(make_tar(tmp_path / 'src.tar.gz'), pak)
+    assert 'bin/php8.5' not in index['links']
+    assert index['members']['bin/php8.5']['offset'] == index['members']['bin/php']['offset']
+    with SeekableBundle(pak) as bundle:
+        assert bundle.read('bin/php8.5') == FILES['bin/php']
+
+
+def truncate(path):
+    with open(path, 'r+b') as f:
+        f.truncate(len(f.read()) // 2)
+
+
+def corrupt(path):
+    # Flips a byte inside the first member's data, past its local header.
+    with open(path, 'r+b') as f:
+        f.seek(60)
+        byte = f.read(1)
+        f.seek(60)
+        f.write(bytes([byte[0] ^ 0xff]))
+
+
+@pytest.mark.parametrize('make, damage', [(make_zip, truncate), (make_tar, truncate), (make_zip, corrupt)])
+def test_damaged_archive_fails_cleanly(tmp_path, monkeypatch, capsys, make, damage):
+    archive = 'php/1-linux.zip' if make is make_zip else 'php/1-linux.tar.gz'
+    (tmp_path / 'php').mkdir()
+    damage(make(tmp_path / archive))
+    monkeypatch.setattr(bundle_index, 'BUNDLES', [{'software': 'php', 'version': '1', 'platform': 'linux',
+                                                   'archive': archive}])
+
+    assert bundle_index.main(['--bundles', str(tmp_path), '--manifest', str(tmp_path / 'm.json'),
+                              '-o', str(tmp_path / 'out')]) == 1
+    err = capsys.readouterr().err
+    assert err.startswith(f'failed: {archive} (') and err.count('\n') == 1
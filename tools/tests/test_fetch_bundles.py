@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import build_bundle_manifest
+import fetch_bundles
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    files = {}
+    truncate_once = set()
+    ranges = []
+
+    def do_GET(self):
+        data = self.files.get(self.path)
+        if data is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        start = 0
+        header = self.headers.get('Range')
+        self.ranges.append((self.path, header))
+        if header:
+            start = int(header.split('=')[1].rstrip('-'))
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(data) - 1}/{len(data)}')
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.path in self.truncate_once:
+            self.truncate_once.discard(self.path)
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(fetch_bundles, 'RETRY_DELAY', 0)
+    StandIn.files, StandIn.truncate_once, StandIn.ranges = {}, set(), []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def entry(base, archive, path, software='php'):
+    return {'software': software, 'version': '1', 'platform': 'linux', 'archive': archive,
+            'sourceUrl': base + path, 'installMode': 'archive'}
+
+
+def test_fetches_concurrently_and_skips_when_up_to_date(server, tmp_path):
+    payloads = {f'/b{i}.tar.gz': os.urandom(200_000 + i) for i in range(4)}
+    StandIn.files.update(payloads)
+    entries = [entry(server, f'x/{i}.tar.gz', f'/b{i}.tar.gz') for i in range(4)]
+    hashes = {e['archive']: hashlib.sha256(payloads[f'/b{i}.tar.gz']).hexdigest() for i, e in enumerate(entries)}
+
+    results = fetch_bundles.fetch_all(entries, str(tmp_path), jobs=4, hashes=hashes, staging_dir=str(tmp_path / 's'))
+    assert [r[1] for r in results] == ['downloaded'] * 4
+    for i in range(4):
+        assert (tmp_path / 'x' / f'{i}.tar.gz').read_bytes() == payloads[f'/b{i}.tar.gz']
+
+    requests = len(StandIn.ranges)
+    results = fetch_bundles.fetch_all(entries, str(tmp_path), jobs=4, hashes=hashes)
+    assert [r[1] for r in results] == ['present'] * 4
+    assert len(StandIn.ranges) == requests
+
+
+def test_resumes_interrupted_transfer_with_range(server, tmp_path):
+    data = os.urandom(300_000)
+    StandIn.files['/php.tar.xz'] = data
+    StandIn.truncate_once.add('/php.tar.xz')
+    e = entry(server, 'php/1-linux.tar.xz', '/php.tar.xz')
+
+    status = fetch_bundles.fetch_entry(e, str(tmp_path), hashlib.sha256(data).hexdigest(), attempts=2)
+    assert status == 'downloaded'
+    assert (tmp_path / 'php' / '1-linux.tar.xz').read_bytes() == data
+    assert StandIn.ranges[-1] == ('/php.tar.xz', f'bytes={len(data) // 2}-')
+    assert not (tmp_path / 'php' / '1-linux.tar.xz.part').exists()
+
+
+def test_checksum_mismatch_never_lands(server, tmp_path):
+    StandIn.files['/bad.zip'] = b'tampered'
+    e = entry(server, 'php/bad.zip', '/bad.zip')
+
+    results = fetch_bundles.fetch_all([e], str(tmp_path), hashes={'php/bad.zip': '0' * 64}, attempts=1)
+    assert results[0][1] == 'failed'
+    assert 'Checksum mismatch' in results[0][2]
+    assert not (tmp_path / 'php' / 'bad.zip').exists()
+
+
+def test_single_binary_is_wrapped_in_zip(server, tmp_path):
+    StandIn.files['/MailHog_linux_amd64'] = b'\x7fELF binary'
+    e = entry(server, 'mailhog/1-linux.zip', '/MailHog_linux_amd64', software='mailhog')
+
+    assert fetch_bundles.fetch_entry(e, str(tmp_path), staging_dir=str(tmp_path / 's')) == 'downloaded'
+    with zipfile.ZipFile(tmp_path / 'mailhog' / '1-linux.zip') as z:
+        assert z.read('MailHog_linux_amd64') == b'\x7fELF binary'
+
+
+def test_wrapped_binary_is_checked_against_the_manifest(server, tmp_path):
+    StandIn.files['/MailHog_linux_amd64'] = b'\x7fELF tampered'
+    e = entry(server, 'mailhog/1-linux.zip', '/MailHog_linux_amd64', software='mailhog')
+
+    with pytest.raises(fetch_bundles.FetchError, match='Checksum mismatch'):
+        fetch_bundles.fetch_entry(e, str(tmp_path), '0' * 64, staging_dir=str(tmp_path / 's'))
+    assert not (tmp_path / 'mailhog' / '1-linux.zip').exists()
+
+
+def test_selective_fetch_keeps_entries_for_bundles_not_on_disk(monkeypatch, tmp_path):
+    bundles = [entry('http://x', 'php/1-linux.tar.xz', '/php'), entry('http://x', 'node/1-linux.tar.xz', '/node', 'node')]
+    old = [dict(b, sha256='a' * 64) for b in bundles]
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({'schemaVersion': 1, 'entries': old}))
+    (tmp_path / 'php').mkdir()
+    (tmp_path / 'php' / '1-linux.tar.xz').write_bytes(b'php')
+    monkeypatch.setattr(fetch_bundles, 'BUNDLES', bundles)
+    monkeypatch.setattr(build_bundle_manifest, 'BUNDLES', bundles)
+    monkeypatch.setattr(build_bundle_manifest, 'load_hash_cache', dict)
+    monkeypatch.setattr(build_bundle_manifest, 'save_hash_cache', lambda cache: None)
+    monkeypatch.setattr(fetch_bundles, 'fetch_all', lambda *a, **k: [('php/1-linux.tar.xz', 'downloaded', None)])
+
+    assert fetch_bundles.main(['php/1-linux.tar.xz', '--bundles', str(tmp_path), '--manifest', str(manifest)]) == 0
+    entries = json.loads(manifest.read_text())['entries']
+    assert [e['sha256'] for e in entries] == [hashlib.sha256(b'php').hexdigest(), 'a' * 64]
+
+
+def test_manifest_failure_is_reported_not_raised(monkeypatch, tmp_path, capsys):
+    def missing(*args, **kwargs):
+        raise FileNotFoundError('Bundle file not found: php/1-linux.tar.xz')
+    monkeypatch.setattr(fetch_bundles, 'fetch_all', lambda *a, **k: [('php/1-linux.tar.xz', 'downloaded', None)])
+    monkeypatch.setattr(fetch_bundles, 'build_manifest', missing)
+
+    assert fetch_bundles.main(['--bundles', str(tmp_path), '--manifest', str(tmp_path / 'manifest.json')]) == 1
+    assert 'Cannot update manifest: Bundle file not found' in capsys.readouterr().err
@@ -0,0 +1,161 @@
+import errno
+import os
+
+import pytest
+
+import hosts_file
+from hosts_file import BLOCK_BEGIN, BLOCK_END, HostsError, HostsFile, update
+
+
+ORIGINAL = (
+    b'# hosts\r\n'
+    b'127.0.0.1 localhost\r\n'
+    b'# caf\xe9 list\r\n'
+    b'0.0.0.0 ads.example tracker.example\r\n'
+)
+
+
+@pytest.fixture
+def hosts(tmp_path):
+    path = tmp_path / 'hosts'
+    path.write_bytes(ORIGINAL)
+    return path
+
+
+def managed_lines(path):
+    lines = path.read_bytes().decode('utf-8', 'surrogateescape').splitlines()
+    return lines[lines.index(BLOCK_BEGIN) + 1:lines.index(BLOCK_END)]
+
+
+def test_batch_is_one_write_inside_the_block(hosts, monkeypatch):
+    writes = []
+    real = hosts_file.write_atomic
+    monkeypatch.setattr(hosts_file, 'write_atomic', lambda p, t: writes.append(p) or real(p, t))
+
+    written, conflicts = update(str(hosts), ['b.local', 'http://A.local/', ('api.local', '::1')])
+    assert (written, conflicts, len(writes)) == (True, [], 1)
+    data = hosts.read_bytes()
+    # Everything outside the block is untouched, line endings and the
+    # non-UTF-8 byte included.
+    assert data.startswith(ORIGINAL)
+    assert data[len(ORIGINAL):].count(b'\r\n') == 5
+    assert managed_lines(hosts) == ['127.0.0.1  a.local', '::1        api.local', '127.0.0.1  b.local']
+
+    update(str(hosts), ['c.local'], ['a.local', 'missing.local'])
+    assert [line.split()[1] for line in managed_lines(hosts)] == ['api.local', 'b.local', 'c.local']
+    assert len(writes) == 2
+
+
+def test_identical_batch_is_a_no_op(hosts):
+    update(str(hosts), ['a.local', 'b.local'])
+    before = os.stat(hosts)
+    assert update(str(hosts), ['b.local', 'a.local']) == (False, [])
+    assert update(str(hosts), removes=['other.local']) == (False, [])
+    after = os.stat(hosts)
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    assert hosts_file.plan(str(hosts), ['a.local'])[0] is None
+
+
+def test_removing_every_domain_restores_the_file(hosts):
+    update(str(hosts), ['a.local', 'b.local'])
+    update(str(hosts), removes=['a.local', 'b.local'])
+    assert hosts.read_bytes() == ORIGINAL
+    assert not os.path.exists(str(hosts) + '.localx.tmp')
+
+
+def test_legacy_tagged_lines_move_into_the_block(tmp_path):
+    path = tmp_path / 'hosts'
+    path.write_text('127.0.0.1 localhost\n\n127.0.0.1    old.local    # LocalX\n::1 localhost\n')
+    model = HostsFile(path.read_text())
+    assert model.managed == {'old.local': '127.0.0.1'}
+
+    update(str(path), ['new.local'])
+    text = path.read_text()
+    assert '# LocalX\n' not in text.replace(BLOCK_END, '')
+    assert text.startswith('127.0.0.1 localhost\n\n::1 localhost\n' + BLOCK_BEGIN)
+    assert [line.split()[1] for line in managed_lines(path)] == ['new.local', 'old.local']
+
+
+def test_block_is_rewritten_in_place(tmp_path):
+    path = tmp_path / 'hosts'
+    path.write_text(f'# top\n{BLOCK_BEGIN}\n127.0.0.1 a.local\n{BLOCK_END}\n# user entries\n10.0.0.5 nas\n')
+    update(str(path), ['b.local'])
+    assert path.read_text() == (f'# top\n{BLOCK_BEGIN}\n127.0.0.1  a.local\n127.0.0.1  b.local\n{BLOCK_END}\n'
+                                '# user entries\n10.0.0.5 nas\n')
+
+
+def test_reports_user_mappings_that_shadow_the_block(tmp_path):
+    path = tmp_path / 'hosts'
+    path.write_text('# 10.0.0.9 same.local\n10.0.0.5 shop.local\n10.0.0.6 same.local.example\n127.0.0.1\tSame.Local # ok\n')
+    written, conflicts = update(str(path), ['shop.local', 'same.local'])
+    assert written and conflicts == ['shop.local']
+
+
+def test_unterminated_block_is_refused(tmp_path):
+    path = tmp_path / 'hosts'
+    original = f'# top\n{BLOCK_BEGIN}\n127.0.0.1 a.local\n10.0.0.5 nas\n'
+    path.write_text(original)
+    with pytest.raises(HostsError, match='Line 2'):
+        update(str(path), ['b.local'])
+    assert path.read_text() == original
+    assert hosts_file.main(['--hosts', str(path), '--list']) == 1
+
+
+def test_conflicts_use_offsets_of_the_original_text(tmp_path):
+    # 'İ'.lower() is two code points; offsets must still line up.
+    path = tmp_path / 'hosts'
+    path.write_text('# İİİİ istanbul office\n127.0.0.1 shop.local\n10.0.0.6 SHOP2.local\n', encoding='utf-8')
+    written, conflicts = update(str(path), ['shop.local', 'shop2.local'])
+    assert written and conflicts == ['shop2.local']
+
+
+@pytest.mark.parametrize('domain', ['', 'bad_name.local', '-x.local', 'a..local', 'x' * 64 + '.local'])
+def test_rejects_invalid_domains_before_writing(hosts, domain):
+    with pytest.raises(HostsError):
+        update(str(hosts), ['ok.local', domain])
+    assert hosts.read_bytes() == ORIGINAL
+
+
+def test_rejects_invalid_address(hosts):
+    with pytest.raises(HostsError):
+        update(str(hosts), [('a.local', '127.0.0.256')])
+
+
+def test_rewrites_in_place_when_rename_is_refused(hosts, monkeypatch):
+    # /etc/hosts is a bind mount inside containers.
+    def refuse(src, dst):
+        raise OSError(errno.EBUSY, 'Device or resource busy')
+    monkeypatch.setattr(hosts_file.os, 'replace', refuse)
+    inode = os.stat(hosts).st_ino
+    assert update(str(hosts), ['a.local']) == (True, [])
+    assert os.stat(hosts).st_ino == inode
+    assert managed_lines(hosts) == ['127.0.0.1  a.local']
+    assert not os.path.exists(str(hosts) + '.localx.tmp')
+
+
+@pytest.mark.parametrize('code', [errno.EACCES, errno.EPERM])
+def test_permission_errors_are_raised_not_written_in_place(hosts, monkeypatch, code):
+    def refuse(src, dst):
+        raise OSError(code, os.strerror(code))
+    monkeypatch.setattr(hosts_file.os, 'replace', refuse)
+    with pytest.raises(OSError):
+        update(str(hosts), ['a.local'])
+    assert hosts.read_bytes() == ORIGINAL
+    assert not os.path.exists(str(hosts) + '.localx.tmp')
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='POSIX modes')
+def test_keeps_file_mode(hosts):
+    os.chmod(hosts, 0o640)
+    update(str(hosts), ['a.local'])
+    assert os.stat(hosts).st_mode & 0o777 == 0o640
+
+
+def test_cli_check_and_list(hosts, capsys):
+    assert hosts_file.main(['--hosts', str(hosts), '--add', 'a.local', '--check']) == 1
+    assert hosts.read_bytes() == ORIGINAL
+    assert hosts_file.main(['--hosts', str(hosts), '--add', 'a.local', '--add', 'b.local=::1']) == 0
+    assert hosts_file.main(['--hosts', str(hosts), '--add', 'a.local', '--check']) == 0
+    capsys.readouterr()
+    assert hosts_file.main(['--hosts', str(hosts), '--list']) == 0
+    assert capsys.readouterr().out == '127.0.0.1 a.local\n::1 b.local\n'
@@ -0,0 +1,79 @@
+import io
+import os
+
+import pytest
+
+import query_logs
+from query_logs import ACTIVE_NAME, HEAD_BYTES, Query, search, update_index
+
+
+def record(i, level='INFO', category='app'):
+    return f'[2026-01-01T00:00:{i:02d}.000] [{level}] [{category}] message {i}\n'.encode('utf-8')
+
+
+def append(path, data):
+    with open(path, 'ab') as f:
+        f.write(data)
+
+
+def test_small_file_keeps_its_entry_after_an_append(tmp_path):
+    path = tmp_path / ACTIVE_NAME
+    path.write_bytes(record(1) + record(2))
+    index, scanned = update_index(str(tmp_path), block_size=1)
+    assert scanned == len(record(1) + record(2))
+
+    append(path, record(3))
+    index, scanned = update_index(str(tmp_path), index, block_size=1)
+    # Only the last block is re-read, not the whole file.
+    assert scanned == len(record(2) + record(3))
+    index, scanned = update_index(str(tmp_path), index, block_size=1)
+    assert scanned == 0
+    assert len(list(search(str(tmp_path), Query(), index))) == 3
+
+
+def test_rotation_keeps_blocks_once_the_head_is_full(tmp_path):
+    path = tmp_path / ACTIVE_NAME
+    data = b''.join(record(i % 60) for i in range(HEAD_BYTES // 40 + 10))
+    path.write_bytes(data)
+    index, _ = update_index(str(tmp_path))
+    os.rename(path, tmp_path / 'localx-2026-01-01T00-01-00.log')
+    path.write_bytes(record(5, 'ERROR'))
+    index, scanned = update_index(str(tmp_path), index)
+    assert scanned == len(record(5, 'ERROR'))
+    assert [n for n, _ in search(str(tmp_path), Query(levels=['ERROR']), index)] == [ACTIVE_NAME]
+
+
+def test_follow_prints_each_record_once(tmp_path, monkeypatch):
+    path = tmp_path / ACTIVE_NAME
+    path.write_bytes(record(1))
+    steps = [lambda: append(path, record(2)), lambda: append(path, record(3)), lambda: None]
+
+    def sleep(_):
+        if not steps:
+            raise KeyboardInterrupt
+        steps.pop(0)()
+    monkeypatch.setattr(query_logs.time, 'sleep', sleep)
+    out = io.StringIO()
+    with pytest.raises(KeyboardInterrupt):
+        query_logs.follow(str(tmp_path), Query(), out)
+    assert out.getvalue() == (record(2) + record(3)).decode('utf-8')
+
+
+def test_follow_starts_over_after_a_rotation(tmp_path, monkeypatch):
+    path = tmp_path / ACTIVE_NAME
+    path.write_bytes(record(1) + record(2))
+
+    def rotate():
+        os.rename(path, tmp_path / 'localx-2026-01-01T00-01-00.log')
+        path.write_bytes(record(9))
+    steps = [rotate]
+
+    def sleep(_):
+        if not steps:
+            raise KeyboardInterrupt
+        steps.pop(0)()
+    monkeypatch.setattr(query_logs.time, 'sleep', sleep)
+    out = io.StringIO()
+    with pytest.raises(KeyboardInterrupt):
+        query_logs.follow(str(tmp_path), Query(), out)
+    assert out.getvalue() == record(9).decode('utf-8')
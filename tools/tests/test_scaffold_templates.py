@@ -0,0 +1,35 @@
+import hashlib
+import os
+
+import pytest
+
+import scaffold_templates
+from scaffold_templates import ScaffoldError, scaffold, verify_tree
+
+
+FILES = [('package.json', b'{}\n'), ('src/main.js', b'console.log(1)\n'), ('src/lib/a.js', b'')]
+EXPECTED = [{'path': name, 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()} for name, data in FILES]
+
+
+def test_durable_scaffold_fsyncs_only_what_it_wrote(tmp_path, monkeypatch):
+    synced = []
+    real = os.fsync
+    monkeypatch.setattr(scaffold_templates.os, 'fsync', lambda fd: synced.append(fd) or real(fd))
+    monkeypatch.setattr(scaffold_templates.os, 'sync', lambda: pytest.fail('os.sync flushes every filesystem'),
+                        raising=False)
+    dest = tmp_path / 'project'
+    assert scaffold(FILES, ['public'], str(dest)) == 3
+    verify_tree(EXPECTED, str(dest))
+    # Three files, plus dest, its parent and src, src/lib and public.
+    assert len(synced) == 3 + (0 if os.name == 'nt' else 5)
+
+    synced.clear()
+    scaffold(FILES, [], str(tmp_path / 'fast'), durable=False)
+    assert synced == []
+
+
+def test_verify_tree_checks_contents_not_just_sizes(tmp_path):
+    scaffold(FILES, [], str(tmp_path), durable=False)
+    (tmp_path / 'src' / 'main.js').write_bytes(b'console.log(2)\n')
+    with pytest.raises(ScaffoldError, match='main.js'):
+        verify_tree(EXPECTED, str(tmp_path))
@@ -0,0 +1,70 @@
+import io
+import os
+import tarfile
+
+import pytest
+
+from stream_extract import MODES, ExtractError, extract
+
+
+def make_tar(path, members):
+    # members: (name, bytes) for files, (name, None) for directories and
+    # (name, '->target') for symlinks.
+    with tarfile.open(path, 'w:gz') as tar:
+        for name, value in members:
+            info = tarfile.TarInfo(name)
+            if value is None:
+                info.type, info.mode = tarfile.DIRTYPE, 0o755
+                tar.addfile(info)
+            elif isinstance(value, str):
+                info.type, info.linkname = tarfile.SYMTYPE, value[2:]
+                tar.addfile(info)
+            else:
+                info.size, info.mode = len(value), 0o644
+                tar.addfile(info, io.BytesIO(value))
+    return str(path)
+
+
+@pytest.fixture
+def work(tmp_path):
+    # dest sits two levels down, so an escape lands in a directory the test
+    # can inspect.
+    root = tmp_path / 'root'
+    (root / 'sub').mkdir(parents=True)
+    return root
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='symlinks need privileges on Windows')
+@pytest.mark.parametrize('mode', MODES)
+def test_link_chain_cannot_leave_the_tree(work, tmp_path, mode):
+    archive = make_tar(tmp_path / 'chain.tgz', [('d', None), ('d/l1', '->..'), ('l2', '->d/l1/..')])
+    dest = work / 'sub' / 'install'
+    with pytest.raises(ExtractError, match='escapes'):
+        extract(archive, str(dest), mode=mode)
+    assert sorted(os.listdir(work / 'sub')) == []
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='symlinks need privileges on Windows')
+@pytest.mark.parametrize('mode', MODES)
+def test_nothing_is_written_through_links_before_the_hash_check(work, tmp_path, mode):
+    archive = make_tar(tmp_path / 'chain.tgz', [
+        ('d', None), ('d/l1', '->..'), ('l2', '->d/l1/..'), ('l2/pwn.txt', b'pwned'),
+    ])
+    with pytest.raises(ExtractError, match='SHA-256 mismatch'):
+        extract(archive, str(work / 'sub' / 'install'), expected='0' * 64, mode=mode)
+    assert not (work / 'pwn.txt').exists()
+    assert not (work / 'sub' / 'pwn.txt').exists()
+    assert sorted(os.listdir(work / 'sub')) == []
+
+
+@pytest.mark.skipif(os.name == 'nt', reason='symlinks need privileges on Windows')
+@pytest.mark.parametrize('mode', MODES)
+def test_links_inside_the_tree_are_kept(work, tmp_path, mode):
+    archive = make_tar(tmp_path / 'ok.tgz', [
+        ('lib/php.real', b'#!php'), ('bin/php', '->../lib/php.real'), ('current', '->bin'),
+    ])
+    dest = work / 'sub' / 'install'
+    result = extract(archive, str(dest), mode=mode)
+    assert result['files'] == 1
+    assert (dest / 'current' / 'php').read_bytes() == b'#!php'
+    assert os.readlink(dest / 'bin' / 'php') == '../lib/php.real'
@@ -0,0 +1,290 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+import pytest
+
+import make_templates
+import warm_cache
+
+
+TARGET = {'os': 'linux', 'cpu': 'x64', 'machine': 'x86_64', 'libc': 'glibc', 'glibc': '2.31',
+          'python': '3.11', 'pythonFull': '3.11.7'}
+
+
+class StandIn(BaseHTTPRequestHandler):
+    # Serves npm packuments, PyPI JSON and the artifacts they point at.
+    protocol_version = 'HTTP/1.1'
+    files = {}
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        data = self.files.get(self.path)
+        self.send_response(200 if data is not None else 404)
+        self.send_header('Content-Length', str(len(data or b'')))
+        self.end_headers()
+        self.wfile.write(data or b'')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StandIn.files, StandIn.requests = {}, []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def npm_package(base, name, versions, latest=None):
+    # versions: {version: extra package.json fields}
+    doc = {'name': name, 'dist-tags': {'latest': latest or max(versions)}, 'versions': {}}
+    for version, fields in versions.items():
+        manifest = dict(fields, name=name, version=version)
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+            for path, content in (('package/package.json', json.dumps(manifest)),
+                                  ('package/index.js', f'module.exports = {json.dumps(version)};\n')):
+                data = content.encode('utf-8')
+                info = tarfile.TarInfo(path)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        tgz = buf.getvalue()
+        url = f'/-/{warm_cache.tarball_name(name, version)}'
+        StandIn.files[url] = tgz
+        manifest['dist'] = {'tarball': base + url,
+                            'integrity': 'sha512-' + base64.b64encode(hashlib.sha512(tgz).digest()).decode('ascii'),
+                            'shasum': hashlib.sha1(tgz).hexdigest()}
+        doc['versions'][version] = manifest
+    StandIn.files['/' + quote(name, safe='@')] = json.dumps(doc).encode('utf-8')
+
+
+def pypi_package(base, name, versions):
+    # versions: {version: requires_dist}
+    dist = name.replace('-', '_')
+    releases = {}
+    for version, requires in versions.items():
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w') as z:
+            info = f'{dist}-{version}.dist-info'
+            metadata = f'Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n'
+            metadata += ''.join(f'Requires-Dist: {r}\n' for r in requires)
+            z.writestr(f'{dist}/__init__.py', f'VERSION = {version!r}\n')
+            z.writestr(f'{info}/METADATA', metadata)
+            z.writestr(f'{info}/WHEEL', 'Wheel-Version: 1.0\nGenerator: test\nRoot-Is-Purelib: true\nTag: py3-none-any\n')
+            z.writestr(f'{info}/RECORD', f'{dist}/__init__.py,,\n{info}/METADATA,,\n{info}/WHEEL,,\n{info}/RECORD,,\n')
+        whl = buf.getvalue()
+        filename = f'{dist}-{version}-py3-none-any.whl'
+        StandIn.files[f'/files/{filename}'] = whl
+        files = [{'filename': filename, 'url': f'{base}/files/{filename}', 'digests': {'sha256': hashlib.sha256(whl).hexdigest()},
+                  'requires_python': '>=3.8', 'yanked': False, 'packagetype': 'bdist_wheel'}]
+        releases[version] = files
+        StandIn.files[f'/pypi/{name}/{version}/json'] = json.dumps(
+            {'info': {'name': name, 'version': version, 'requires_dist': requires}, 'urls': files}).encode('utf-8')
+    latest = max(versions, key=warm_cache.parse_pep440)
+    StandIn.files[f'/pypi/{name}/json'] = json.dumps(
+        {'info': {'name': name, 'version': latest, 'requires_dist': versions[latest]}, 'releases': releases}).encode('utf-8')
+
+
+def write_pack(tmp_path, name, resolved, registry):
+    members, blobs = warm_cache.pack_members(name, resolved, registry, TARGET)
+    path = tmp_path / warm_cache.pack_name(name)
+    path.write_bytes(make_templates.pack_zip(members, stored=blobs))
+    return path
+
+
+@pytest.mark.parametrize('version, spec, ok', [
+    ('1.4.2', '^1.2.0', True),
+    ('2.0.0', '^1.2.0', False),
+    ('0.2.5', '^0.2.1', True),
+    ('0.3.0', '^0.2.1', False),
+    ('1.2.9', '~1.2.3', True),
+    ('1.3.0', '~1.2.3', False),
+    ('1.9.0', '1.x', True),
+    ('3.1.0', '>=2.0.0 <3.0.0 || >=3.1.0', True),
+    ('2.4.9', '1.0.0 - 2.4', True),
+    ('2.5.0', '1.0.0 - 2.4', False),
+    ('2.0.0-beta.1', '^1.0.0', False),
+    ('2.0.0-beta.2', '>=2.0.0-beta.1', True),
+    ('2.1.0-beta.1', '>=2.0.0-beta.1', False),
+])
+def test_npm_ranges(version, spec, ok):
+    assert warm_cache.satisfies(warm_cache.parse_semver(version), warm_cache.parse_range(spec)) is ok
+
+
+@pytest.mark.parametrize('version, spec, ok', [
+    ('0.110.0', '>=0.100,<0.111', True),
+    ('2.1', '~=2.0', True),
+    ('3.0', '~=2.0', False),
+    ('1.4.2', '==1.4.*', True),
+    ('1.0rc1', '>=1.0rc1', True),
+    ('1.0.post1', '>1.0', False),
+])
+def test_pep440_specifiers(version, spec, ok):
+    assert warm_cache.specifier_allows(version, warm_cache.parse_specifiers(spec)) is ok
+
+
+def test_resolves_hoisted_tree_with_nested_conflicts(server, tmp_path):
+    npm_package(server, 'left', {'1.0.0': {}, '1.1.0': {'dependencies': {'shared': '^1.0.0'}}})
+    npm_package(server, 'shared', {'1.2.0': {}, '2.0.0': {}, '2.1.0-rc.1': {}}, latest='2.0.0')
+    npm_package(server, 'tool', {'3.0.0': {'dependencies': {'left': '^1.0.0'},
+                                           'optionalDependencies': {'@native/linux-x64': '3.0.0', '@native/win32-x64': '3.0.0'},
+                                           'bin': {'tool': 'index.js'}}})
+    npm_package(server, '@native/linux-x64', {'3.0.0': {'os': ['linux'], 'cpu': ['x64']}})
+    npm_package(server, '@native/win32-x64', {'3.0.0': {'os': ['win32'], 'cpu': ['x64']}})
+    manifest = {'name': 'app', 'version': '0.1.0',
+                'dependencies': {'left': '^1.0.0', 'shared': 'latest'}, 'devDependencies': {'tool': '*'}}
+
+    registry = warm_cache.Registry(server, str(tmp_path / 'cache'), accept=warm_cache.NPM_ACCEPT)
+    kind, lock_name, lock, artifacts = warm_cache.resolve_template(
+        {'package.json': json.dumps(manifest).encode('utf-8')}, {'npm': registry}, TARGET)
+    packages = json.loads(lock)['packages']
+
+    assert (kind, lock_name) == ('npm', 'package-lock.json')
+    assert packages['']['devDependencies'] == {'tool': '*'}
+    assert packages['node_modules/shared']['version'] == '2.0.0'
+    assert packages['node_modules/left']['version'] == '1.1.0'
+    assert packages['node_modules/left/node_modules/shared']['version'] == '1.2.0'
+    assert packages['node_modules/tool']['dev'] is True
+    assert packages['node_modules/tool']['bin'] == {'tool': 'index.js'}
+    assert packages['node_modules/@native/win32-x64'] == dict(packages['node_modules/@native/win32-x64'], dev=True, optional=True)
+    assert packages['node_modules/left']['resolved'] == 'file:.localx/deps/left-1.1.0.tgz'
+    assert packages['node_modules/left']['integrity'].startswith('sha512-')
+    # The Windows binary is locked for other machines but not packed.
+    assert sorted(a['path'] for a in artifacts) == [
+        '.localx/deps/left-1.1.0.tgz', '.localx/deps/native-linux-x64-3.0.0.tgz',
+        '.localx/deps/shared-1.2.0.tgz', '.localx/deps/shared-2.0.0.tgz', '.localx/deps/tool-3.0.0.tgz',
+    ]
+    # One metadata request per package, however many dependants it has.
+    assert StandIn.requests.count('/shared') == 1
+
+
+def test_pack_is_content_addressed_and_restores_verified(server, tmp_path):
+    npm_package(server, 'left', {'1.0.0': {}})
+    registry = warm_cache.Registry(server, str(tmp_path / 'cache'), accept=warm_cache.NPM_ACCEPT)
+    manifest = {'name': 'app', 'version': '0.1.0', 'dependencies': {'left': '1.0.0'}}
+    resolved = warm_cache.resolve_template({'package.json': json.dumps(manifest).encode('utf-8')}, {'npm': registry}, TARGET)
+    pack = write_pack(tmp_path, 'app', resolved, registry)
+
+    with zipfile.ZipFile(pack) as z:
+        index = json.loads(z.read('pack.json'))
+        digest = index['files']['.localx/deps/left-1.0.0.tgz']
+        assert hashlib.sha256(z.read(f'blobs/{digest}')).hexdigest() == digest
+        assert z.getinfo(f'blobs/{digest}').compress_type == zipfile.ZIP_STORED
+        members = {n: z.read(n) for n in z.namelist()}
+    # Rebuilding from the artifact cache gives the same bytes.
+    StandIn.files.pop(f"/-/{warm_cache.tarball_name('left', '1.0.0')}")
+    assert write_pack(tmp_path, 'app', resolved, registry).read_bytes() == pack.read_bytes()
+
+    project = tmp_path / 'project'
+    warm_cache.restore_pack(str(pack), str(project))
+    assert hashlib.sha256((project / '.localx' / 'deps' / 'left-1.0.0.tgz').read_bytes()).hexdigest() == digest
+    assert json.loads((project / 'package-lock.json').read_bytes())['lockfileVersion'] == 3
+
+    members[f'blobs/{digest}'] = b'\0' + members[f'blobs/{digest}'][1:]
+    bad = tmp_path / 'bad.deps.zip'
+    bad.write_bytes(make_templates.pack_zip(members))
+    with pytest.raises(warm_cache.WarmCacheError):
+        warm_cache.restore_pack(str(bad), str(tmp_path / 'other'))
+    assert not (tmp_path / 'other').exists()
+
+
+def test_rejects_tampered_download(server, tmp_path):
+    npm_package(server, 'left', {'1.0.0': {}})
+    StandIn.files[f"/-/{warm_cache.tarball_name('left', '1.0.0')}"] += b'\0'
+    registry = warm_cache.Registry(server, str(tmp_path / 'cache'), accept=warm_cache.NPM_ACCEPT)
+    resolved = warm_cache.resolve_template({'package.json': b'{"dependencies": {"left": "^1.0.0"}}'}, {'npm': registry}, TARGET)
+    with pytest.raises(warm_cache.WarmCacheError, match='Checksum mismatch'):
+        warm_cache.pack_members('app', resolved, registry, TARGET)
+    assert os.listdir(tmp_path / 'cache') == []
+
+
+@pytest.mark.skipif(shutil.which('npm') is None, reason='npm not installed')
+def test_npm_ci_installs_from_pack_offline(server, tmp_path):
+    npm_package(server, 'left', {'1.0.0': {}, '1.1.0': {'dependencies': {'shared': '^1.0.0'}}})
+    npm_package(server, 'shared', {'1.2.0': {}})
+    registry = warm_cache.Registry(server, str(tmp_path / 'cache'), accept=warm_cache.NPM_ACCEPT)
+    package_json = json.dumps({'name': 'app', 'version': '0.1.0', 'dependencies': {'left': '^1.0.0'}}).encode('utf-8')
+    resolved = warm_cache.resolve_template({'package.json': package_json}, {'npm': registry}, TARGET)
+    pack = write_pack(tmp_path, 'app', resolved, registry)
+    StandIn.files.clear()
+    requests = len(StandIn.requests)
+
+    project = tmp_path / 'project'
+    project.mkdir()
+    (project / 'package.json').write_bytes(package_json)
+    index = warm_cache.restore_pack(str(pack), str(project))
+    result = subprocess.run(index['install'].split() + ['--cache', str(tmp_path / 'npm-cache'), '--registry', 'http://127.0.0.1:9/'],
+                            cwd=project, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert json.loads((project / 'node_modules' / 'shared' / 'package.json').read_text())['version'] == '1.2.0'
+    assert len(StandIn.requests) == requests
+
+
+def test_pypi_pins_markers_and_extras(server, tmp_path):
+    pypi_package(server, 'web-app', {'1.0.0': ['core>=2.0', 'winshim; sys_platform == "win32"', 'fancy; extra == "full"'],
+                                     '1.1.0rc1': ['core>=3.0']})
+    pypi_package(server, 'core', {'1.9': [], '2.0': ['typing-helper>=1.0; python_version < "3.13"'], '2.1': ['typing-helper>=1.0; python_version < "3.13"']})
+    pypi_package(server, 'typing-helper', {'1.0.0': [], '0.9.0': []})
+    pypi_package(server, 'fancy', {'1.0': []})
+
+    registry = warm_cache.Registry(server, str(tmp_path / 'cache'))
+    kind, lock_name, lock, artifacts = warm_cache.resolve_template(
+        {'requirements.txt': b'# deps\nweb-app\ncore<2.1\n'}, {'pypi': registry}, TARGET)
+    lines = lock.decode('utf-8').splitlines()
+    pins = [line.split(' ')[0] for line in lines if '==' in line]
+
+    assert (kind, lock_name) == ('pypi', 'requirements.lock')
+    assert pins == ['core==2.0', 'typing-helper==1.0.0', 'web-app==1.0.0']
+    assert sum('--hash=sha256:' in line for line in lines) == 3
+    assert sorted(a['path'] for a in artifacts) == [
+        '.localx/deps/core-2.0-py3-none-any.whl', '.localx/deps/typing_helper-1.0.0-py3-none-any.whl',
+        '.localx/deps/web_app-1.0.0-py3-none-any.whl',
+    ]
+
+    pack = write_pack(tmp_path, 'api', (kind, lock_name, lock, artifacts), registry)
+    StandIn.files.clear()
+    project = tmp_path / 'project'
+    index = warm_cache.restore_pack(str(pack), str(project))
+    result = subprocess.run([sys.executable, '-m'] + index['install'].split() + ['--target', str(tmp_path / 'site'), '--no-cache-dir'],
+                            cwd=project, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / 'site' / 'typing_helper' / '__init__.py').exists()
+
+
+def test_marker_evaluation():
+    env = warm_cache.marker_environment(TARGET)
+    assert warm_cache.marker_allows('python_version >= "3.8" and (os_name == "posix" or os_name == "nt")', env)
+    assert not warm_cache.marker_allows('python_version < "3.9"', env)
+    assert warm_cache.marker_allows('extra == "Full"', env, {'full'})
+    assert not warm_cache.marker_allows('extra == "full"', env)
+    assert warm_cache.marker_allows('"linux" in sys_platform or sys_platform == "win32"', dict(env, sys_platform='linux'))
+
+
+@pytest.mark.parametrize('filename, fits', [
+    ('pkg-1.0-py3-none-any.whl', True),
+    ('pkg-1.0-cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64.whl', True),
+    ('pkg-1.0-cp38-abi3-manylinux_2_28_x86_64.whl', True),
+    ('pkg-1.0-cp311-cp311-manylinux_2_34_x86_64.whl', False),
+    ('pkg-1.0-cp311-cp311-musllinux_1_1_x86_64.whl', False),
+    ('pkg-1.0-cp312-cp312-manylinux2014_x86_64.whl', False),
+    ('pkg-1.0-cp311-cp311-win_amd64.whl', False),
+])
+def test_wheel_compatibility(filename, fits):
+    target = dict(TARGET, glibc='2.31')
+    assert (warm_cache.wheel_rank(filename, target) is not None) is fits
@@ -0,0 +1,56 @@
+import json
+import os
+import re
+
+
+BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TRANSLATIONS_PATH = os.path.join(BASE, 'lib', 'core', 'services', 'translation_service.dart')
+# Every locale but the built-in English one: <locale>.json, a flat
+# {key: string} map.
+LOCALES_DIR = os.path.join(BASE, 'tools', 'locales')
+
+BLOCK_RE = re.compile(r'static const Map<String, Map<String, String>> translations = \{(.*?)\n  \};', re.S)
+LOCALE_RE = re.compile(r"\n    '([A-Za-z_-]+)': \{(.*?)\n    \}", re.S)
+ENTRY_RE = re.compile(r"'((?:[^'\\\n]|\\.)*)':\s*'((?:[^'\\\n]|\\.)*)'")
+ESCAPE_RE = re.compile(r"\\(u\{[0-9A-Fa-f]+\}|u[0-9A-Fa-f]{4}|x[0-9A-Fa-f]{2}|.)")
+SIMPLE_ESCAPES = {'n': '\n', 'r': '\r', 't': '\t', 'b': '\b', 'f': '\f', 'v': '\v'}
+
+
+def _unescape(literal):
+    def replace(m):
+        esc = m.group(1)
+        if esc.startswith('u{'):
+            return chr(int(esc[2:-1], 16))
+        if esc[0] in 'ux' and len(esc) > 1:
+            return chr(int(esc[1:], 16))
+        return SIMPLE_ESCAPES.get(esc, esc)
+    return ESCAPE_RE.sub(replace, literal)
+
+
+def load_translations(path=TRANSLATIONS_PATH, locales_dir=LOCALES_DIR):
+    # Reads AppTranslations.translations without a Dart toolchain; the map is
+    # a plain const literal of single-quoted strings. Locales in locales_dir
+    # are added to it.
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    block = BLOCK_RE.search(source)
+    if not block:
+        raise ValueError(f'AppTranslations.translations not found in {path}')
+    catalog = {}
+    for locale, body in LOCALE_RE.findall(block.group(1)):
+        catalog[locale] = {_unescape(k): _unescape(v) for k, v in ENTRY_RE.findall(body)}
+    if not catalog:
+        raise ValueError(f'No locales found in {path}')
+    names = sorted(os.listdir(locales_dir)) if os.path.isdir(locales_dir) else []
+    for name in names:
+        locale, ext = os.path.splitext(name)
+        if ext != '.json':
+            continue
+        if locale in catalog:
+            raise ValueError(f'{locale} is defined both in {path} and in {locales_dir}')
+        with open(os.path.join(locales_dir, name), 'r', encoding='utf-8') as f:
+            strings = json.load(f)
+        if not isinstance(strings, dict) or not all(isinstance(v, str) for v in strings.values()):
+            raise ValueError(f'{name} must map keys to strings')
+        catalog[locale] = strings
+    return catalog
@@ -0,0 +1,915 @@
+import base64
+import hashlib
+import json
+import os
+import platform
+import re
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urljoin
+
+from bundles import BASE, CHUNK_SIZE
+from fetch_bundles import ConnectionPool
+from scaffold_templates import safe_path
+
+
+CACHE_DIR = os.path.join(BASE, 'tools', '.cache', 'warm_cache')
+# Where a restored pack puts its artifacts, relative to the project root.
+DEPS_DIR = '.localx/deps'
+PACK_INDEX = 'pack.json'
+PACK_FORMAT = 1
+DEFAULT_JOBS = 8
+MAX_PASSES = 1000
+NPM_ACCEPT = 'application/vnd.npm.install-v1+json; q=1.0, application/json; q=0.8'
+NPM_LOCKFILE = 'package-lock.json'
+PYPI_LOCKFILE = 'requirements.lock'
+NPM_INSTALL = 'npm ci --offline --no-audit --no-fund'
+PYPI_INSTALL = f'pip install --no-index --find-links {DEPS_DIR} -r {PYPI_LOCKFILE}'
+
+
+class WarmCacheError(Exception):
+    pass
+
+
+def ecosystem(files):
+    # Which package manager a rendered template installs with, if any.
+    if files.get('package.json') is not None:
+        return 'npm'
+    if files.get('requirements.txt') is not None:
+        return 'pypi'
+    return None
+
+
+def target_platform():
+    # The pack carries native artifacts (esbuild binaries, compiled wheels)
+    # for the machine that builds it.
+    machine = platform.machine().lower()
+    libc = None
+    if sys.platform.startswith('linux'):
+        name, version = platform.libc_ver()
+        libc = 'glibc' if name == 'glibc' else 'musl'
+    return {
+        'os': 'win32' if sys.platform == 'win32' else sys.platform.rstrip('0123456789'),
+        'cpu': {'x86_64': 'x64', 'amd64': 'x64', 'aarch64': 'arm64', 'i386': 'ia32', 'i686': 'ia32', 'x86': 'ia32'}.get(machine, machine),
+        'machine': machine,
+        'libc': libc,
+        'glibc': platform.libc_ver()[1] if libc == 'glibc' else None,
+        'python': '.'.join(platform.python_version_tuple()[:2]),
+        'pythonFull': platform.python_version(),
+    }
+
+
+class Registry:
+    # JSON metadata and artifact downloads against one npm registry or PyPI
+    # index. Metadata is memoised for the life of the object, so templates
+    # sharing packages (react and next, the vite plugins) fetch it once;
+    # artifacts land in a content-keyed cache that survives between builds.
+    def __init__(self, url, cache_dir=CACHE_DIR, jobs=DEFAULT_JOBS, accept='application/json'):
+        self.url = url.rstrip('/') + '/'
+        self.cache_dir = cache_dir
+        self.jobs = jobs
+        self.accept = accept
+        self.pool = ConnectionPool()
+        self._json = {}
+
+    def get_json(self, path):
+        if path not in self._json:
+            self._json[path] = self._get_json(urljoin(self.url, path))
+        return self._json[path]
+
+    def prefetch(self, paths):
+        missing = [p for p in dict.fromkeys(paths) if p not in self._json]
+        if len(missing) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.jobs, len(missing))) as pool:
+                for path, doc in zip(missing, pool.map(lambda p: self._get_json(urljoin(self.url, p)), missing)):
+                    self._json[path] = doc
+
+    def _get_json(self, url):
+        resp, origin = self.pool.open(url, {'Accept': self.accept})
+        try:
+            body = resp.read()
+        except BaseException:
+            self.pool.drop(origin)
+            raise
+        if resp.status == 404:
+            return None
+        if resp.status != 200:
+            raise WarmCacheError(f'HTTP {resp.status} for {url}')
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise WarmCacheError(f'{url}: invalid JSON ({e})')
+
+    def fetch(self, url, algo, digest):
+        # Path of the verified artifact in the cache, downloading it first if
+        # needed. The cache file is named by the digest it was checked against.
+        path = os.path.join(self.cache_dir, f'{algo}-{digest}')
+        if os.path.exists(path):
+            return path
+        os.makedirs(self.cache_dir, exist_ok=True)
+        resp, origin = self.pool.open(urljoin(self.url, url))
+        h = hashlib.new(algo)
+        part = f'{path}.{os.getpid()}.part'
+        try:
+            if resp.status != 200:
+                resp.read()
+                raise WarmCacheError(f'HTTP {resp.status} for {url}')
+            with open(part, 'wb') as f:
+                for chunk in iter(lambda: resp.read(CHUNK_SIZE), b''):
+                    f.write(chunk)
+                    h.update(chunk)
+        except BaseException:
+            self.pool.drop(origin)
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+        if h.hexdigest() != digest:
+            os.remove(part)
+            raise WarmCacheError(f'Checksum mismatch for {url}: expected {algo} {digest}, got {h.hexdigest()}')
+        os.replace(part, path)
+        return path
+
+    def fetch_all(self, artifacts):
+        with ThreadPoolExecutor(max_workers=max(1, min(self.jobs, len(artifacts) or 1))) as pool:
+            return list(pool.map(lambda a: self.fetch(a['url'], a['algo'], a['digest']), artifacts))
+
+
+def sha256_path(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# -- npm ------------------------------------------------------------------
+
+_SEMVER = re.compile(r'^v?(\d+)\.(\d+)\.(\d+)(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$')
+_PARTIAL = re.compile(r'^v?(\d+|[xX*])(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$')
+_COMPARATOR = re.compile(r'^(<=|>=|<|>|=|\^|~>?)?(.*)$')
+# Lowest possible pre-release, so '<2.0.0-0' excludes every 2.0.0 pre-release.
+_FLOOR = (0,)
+
+
+def parse_semver(text):
+    m = _SEMVER.match(text.strip())
+    if not m:
+        return None
+    pre = tuple(int(p) if p.isdigit() else p for p in m.group(4).split('.')) if m.group(4) else ()
+    return int(m.group(1)), int(m.group(2)), int(m.group(3)), pre
+
+
+def semver_key(v):
+    major, minor, patch, pre = v
+    return major, minor, patch, not pre, tuple((0, p, '') if isinstance(p, int) else (1, 0, p) for p in pre)
+
+
+def _desugar(token):
+    # One range token ('^1.2', '~3', '>=2.1.0', '1.x') as (op, version) pairs.
+    m = _COMPARATOR.match(token)
+    op, rest = m.group(1) or '', m.group(2)
+    p = _PARTIAL.match(rest)
+    if not p:
+        raise WarmCacheError(f'Unsupported version range token {token!r}')
+    parts = [None if x is None or x in 'xX*' else int(x) for x in p.group(1, 2, 3)]
+    pre = tuple(int(x) if x.isdigit() else x for x in p.group(4).split('.')) if p.group(4) else ()
+    known = next((i for i, x in enumerate(parts) if x is None), 3)
+    major, minor, patch = (x or 0 for x in parts)
+    if known == 0:
+        return [] if op not in ('<', '>') else [('<', (0, 0, 0, _FLOOR))]
+    bump = [(major + 1, 0, 0, _FLOOR), (major, minor + 1, 0, _FLOOR)]
+    low = (major, minor, patch, pre)
+    if op == '^':
+        if major or known == 1:
+            high = bump[0]
+        elif minor or known == 2:
+            high = bump[1]
+        else:
+            high = (0, 0, patch + 1, _FLOOR)
+        return [('>=', low), ('<', high)]
+    if op in ('~', '~>'):
+        return [('>=', low), ('<', bump[0] if known == 1 else bump[1])]
+    if known == 3:
+        return [(op if op not in ('', '=') else '=', low)]
+    next_up = bump[known - 1]
+    if op in ('', '='):
+        return [('>=', low), ('<', next_up)]
+    if op == '>':
+        return [('>=', (*next_up[:3], ()))]
+    if op == '<=':
+        return [('<', next_up)]
+    if op == '<':
+        return [('<', (major, minor, patch, _FLOOR))]
+    return [('>=', low)]
+
+
+def parse_range(text):
+    # npm range syntax as a list of comparator sets (any set may match).
+    sets = []
+    for part in (text or '').split('||'):
+        part = re.sub(r'(<=|>=|<|>|=|\^|~>?)\s+', r'\1', part.strip())
+        hyphen = re.match(r'^(\S+)\s+-\s+(\S+)$', part)
+        comparators = []
+        if hyphen:
+            comparators = _desugar('>=' + hyphen.group(1)) + _desugar('<=' + hyphen.group(2))
+        else:
+            for token in part.split():
+                comparators += _desugar(token)
+        sets.append(comparators)
+    return sets
+
+
+def _compare(version, op, bound):
+    a, b = semver_key(version), semver_key(bound)
+    return {'=': a == b, '<': a < b, '<=': a <= b, '>': a > b, '>=': a >= b}[op]
+
+
+def satisfies(version, sets):
+    for comparators in sets:
+        if not all(_compare(version, op, bound) for op, bound in comparators):
+            continue
+        # A pre-release only matches a set that names a pre-release of the
+        # same major.minor.patch.
+        if not version[3] or any(bound[3] and bound[3] != _FLOOR and bound[:3] == version[:3] for _, bound in comparators):
+            return True
+    return False
+
+
+def max_satisfying(packument, spec):
+    # npm's pick: the 'latest' dist-tag when it satisfies, otherwise the
+    # highest matching version.
+    tags = packument.get('dist-tags', {})
+    spec = (spec or '').strip() or '*'
+    if spec in tags:
+        return tags[spec]
+    try:
+        sets = parse_range(spec)
+    except WarmCacheError:
+        raise WarmCacheError(f"{packument.get('name')}: unsupported dependency spec {spec!r}")
+    latest = parse_semver(tags['latest']) if tags.get('latest') else None
+    if latest and tags['latest'] in packument['versions'] and satisfies(latest, sets):
+        return tags['latest']
+    best = None
+    for text in packument.get('versions', {}):
+        v = parse_semver(text)
+        if v and satisfies(v, sets) and (best is None or semver_key(v) > semver_key(best[0])):
+            best = (v, text)
+    return best[1] if best else None
+
+
+def _matches_platform(values, actual):
+    # npm's os/cpu/libc fields: allow-lists with '!' exclusions.
+    if not values:
+        return True
+    if isinstance(values, str):
+        values = [values]
+    if f'!{actual}' in values:
+        return False
+    allowed = [v for v in values if not v.startswith('!')]
+    return not allowed or actual in allowed
+
+
+def tarball_name(name, version):
+    return f"{name.lstrip('@').replace('/', '-')}-{version}.tgz"
+
+
+def _packument_path(name):
+    return quote(name, safe='@')
+
+
+def _integrity(dist):
+    # (algo, hex digest, SRI string) for a tarball, strongest hash first.
+    for sri in (dist.get('integrity') or '').split():
+        algo, _, b64 = sri.partition('-')
+        if algo in ('sha512', 'sha384', 'sha256'):
+            return algo, base64.b64decode(b64).hex(), sri
+    if dist.get('shasum'):
+        return 'sha1', dist['shasum'], None
+    raise WarmCacheError(f"No integrity for {dist.get('tarball')}")
+
+
+def resolve_npm(manifest, registry, target=None):
+    # A flat, npm-style install tree for package.json: every package hoisted
+    # to node_modules/<name> unless a version already there conflicts, in
+    # which case it nests under the package that needs it. Returns lockfile
+    # paths mapped to node dicts.
+    target = target or target_platform()
+    tree = {'': {'edges': []}}
+    edges = []
+    for kind, key in (('prod', 'dependencies'), ('dev', 'devDependencies'), ('optional', 'optionalDependencies')):
+        for name, spec in sorted((manifest.get(key) or {}).items()):
+            edges.append(('', name, spec, kind))
+
+    while edges:
+        registry.prefetch(_packument_path(name) for _, name, _, _ in edges)
+        next_edges = []
+        for parent, name, spec, kind in edges:
+            path = _place(tree, registry, parent, name, spec, kind)
+            if path is None:
+                continue
+            tree[parent]['edges'].append((kind, name, path))
+            node = tree[path]
+            if node.get('expanded'):
+                continue
+            node['expanded'] = True
+            meta = node['meta']
+            optional = meta.get('optionalDependencies') or {}
+            peer_meta = meta.get('peerDependenciesMeta') or {}
+            for dep, dep_spec in sorted((meta.get('dependencies') or {}).items()):
+                if dep not in optional:
+                    next_edges.append((path, dep, dep_spec, 'prod'))
+            for dep, dep_spec in sorted(optional.items()):
+                next_edges.append((path, dep, dep_spec, 'optional'))
+            for dep, dep_spec in sorted((meta.get('peerDependencies') or {}).items()):
+                if not peer_meta.get(dep, {}).get('optional'):
+                    next_edges.append((path, dep, dep_spec, 'peer'))
+        edges = next_edges
+    _flag_tree(tree)
+    for path, node in tree.items():
+        if path:
+            meta = node['meta']
+            node['installable'] = (_matches_platform(meta.get('os'), target['os'])
+                                   and _matches_platform(meta.get('cpu'), target['cpu'])
+                                   and (not target['libc'] or _matches_platform(meta.get('libc'), target['libc'])))
+    return tree
+
+
+def _spec_allows(packument, version, spec):
+    tags = packument.get('dist-tags', {})
+    if spec in tags:
+        return tags[spec] == version
+    try:
+        return satisfies(parse_semver(version), parse_range(spec))
+    except WarmCacheError:
+        return False
+
+
+def _place(tree, registry, parent, name, spec, kind):
+    # Node's lookup: the nearest node_modules/<name> walking up from the
+    # dependant. Reuse it when it satisfies the spec, else nest a new copy
+    # under the dependant.
+    if spec.startswith(('file:', 'link:', 'git', 'http:', 'https:', 'npm:', 'workspace:', 'github:')) or '/' in spec:
+        raise WarmCacheError(f'{name}@{spec}: only registry dependencies can be packed')
+    packument = registry.get_json(_packument_path(name))
+    if packument is None:
+        if kind == 'optional':
+            return None
+        raise WarmCacheError(f'{name}: not found in {registry.url}')
+    scope = parent
+    while True:
+        candidate = f'{scope}/node_modules/{name}' if scope else f'node_modules/{name}'
+        node = tree.get(candidate)
+        if node is not None:
+            if _spec_allows(packument, node['version'], spec):
+                return candidate
+            break
+        if not scope:
+            break
+        scope = scope.rsplit('/node_modules/', 1)[0] if '/node_modules/' in scope else ''
+    version = max_satisfying(packument, spec)
+    if version is None:
+        if kind == 'optional':
+            return None
+        raise WarmCacheError(f'{name}@{spec}: no matching version in {registry.url}')
+    path = f'{parent}/node_modules/{name}' if node is not None and parent else f'node_modules/{name}'
+    if path in tree:
+        raise WarmCacheError(f'{name}: conflicting requirements for {path}')
+    tree[path] = {'name': name, 'version': version, 'meta': packument['versions'][version], 'edges': []}
+    return path
+
+
+def _reach(tree, root_kinds, follow_kinds):
+    seen = set()
+    stack = [path for kind, _, path in tree.get('', {}).get('edges', ()) if kind in root_kinds]
+    while stack:
+        path = stack.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        stack.extend(p for kind, _, p in tree[path]['edges'] if kind in follow_kinds)
+    return seen
+
+
+def _flag_tree(tree):
+    # npm's dev/optional/devOptional flags, so --omit=dev and
+    # --omit=optional prune the same packages npm itself would.
+    prod = _reach(tree, ('prod', 'optional', 'peer'), ('prod', 'optional', 'peer'))
+    required = _reach(tree, ('prod', 'dev', 'peer'), ('prod', 'peer'))
+    strict = _reach(tree, ('prod', 'peer'), ('prod', 'peer'))
+    for path, node in tree.items():
+        if not path:
+            continue
+        node['dev'] = path not in prod
+        node['optional'] = path not in required
+        node['devOptional'] = not node['dev'] and not node['optional'] and path not in strict
+
+
+def npm_lockfile(manifest, tree):
+    root = {k: manifest[k] for k in ('name', 'version') if k in manifest}
+    for key in ('dependencies', 'devDependencies', 'optionalDependencies'):
+        if manifest.get(key):
+            root[key] = dict(sorted(manifest[key].items()))
+    packages = {'': root}
+    artifacts = []
+    for path in sorted(p for p in tree if p):
+        node = tree[path]
+        meta = node['meta']
+        algo, digest, sri = _integrity(meta.get('dist') or {})
+        file_name = f"{DEPS_DIR}/{tarball_name(node['name'], node['version'])}"
+        entry = {'version': node['version'], 'resolved': f'file:{file_name}'}
+        if sri:
+            entry['integrity'] = sri
+        for flag in ('dev', 'optional', 'devOptional'):
+            if node[flag]:
+                entry[flag] = True
+        for key in ('dependencies', 'optionalDependencies', 'peerDependencies', 'peerDependenciesMeta',
+                    'bin', 'engines', 'os', 'cpu', 'libc', 'license', 'hasInstallScript'):
+            if meta.get(key):
+                entry[key] = meta[key]
+        packages[path] = entry
+        if node['installable']:
+            artifacts.append({'path': file_name, 'url': meta['dist']['tarball'], 'algo': algo, 'digest': digest, 'sri': sri})
+    lock = {'name': manifest.get('name', ''), 'version': manifest.get('version', ''),
+            'lockfileVersion': 3, 'requires': True, 'packages': packages}
+    # One artifact per tarball even when a version is nested more than once.
+    unique = {a['path']: a for a in artifacts}
+    return (json.dumps(lock, indent=2) + '\n').encode('utf-8'), list(unique.values())
+
+
+# -- PyPI -----------------------------------------------------------------
+
+_PEP440 = re.compile(
+    r'^v?(?:(\d+)!)?(\d+(?:\.\d+)*)'
+    r'(?:[-_.]?(a|b|c|rc|alpha|beta|pre|preview)[-_.]?(\d*))?'
+    r'(?:-(\d+)|[-_.]?(post|rev|r)[-_.]?(\d*))?'
+    r'(?:[-_.]?(dev)[-_.]?(\d*))?'
+    r'(?:\+[a-z0-9]+(?:[-_.][a-z0-9]+)*)?$', re.I)
+_PRE_RANK = {'a': 0, 'alpha': 0, 'b': 1, 'beta': 1, 'c': 2, 'rc': 2, 'pre': 2, 'preview': 2}
+_REQUIREMENT = re.compile(r'^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[([^\]]*)\])?\s*\(?([^;()]*)\)?\s*(?:;(.*))?$')
+_INF = float('inf')
+
+
+def canonical_name(name):
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def parse_pep440(text):
+    # Sort key for a PEP 440 version, or None when it does not parse.
+    m = _PEP440.match(text.strip())
+    if not m:
+        return None
+    epoch, release, pre_l, pre_n, post_implicit, post_l, post_n, dev_l, dev_n = m.groups()
+    release = tuple(int(x) for x in release.split('.'))
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+    post = int(post_implicit) if post_implicit else (int(post_n or 0) if post_l else None)
+    dev = int(dev_n or 0) if dev_l else None
+    if pre_l:
+        pre = (_PRE_RANK[pre_l.lower()], int(pre_n or 0))
+    elif post is None and dev is not None:
+        pre = (-_INF, 0)
+    else:
+        pre = (_INF, 0)
+    return (int(epoch or 0), release, pre, -_INF if post is None else post, _INF if dev is None else dev)
+
+
+def is_prerelease(key):
+    return key[2][0] != _INF or key[4] != _INF
+
+
+def _release_prefix_match(version, prefix):
+    v = parse_pep440(version)
+    p = parse_pep440(prefix)
+    if v is None or p is None:
+        return False
+    raw = [int(x) for x in re.match(r'^v?(?:\d+!)?(\d+(?:\.\d+)*)', prefix.strip()).group(1).split('.')]
+    release = list(v[1]) + [0] * len(raw)
+    return v[0] == p[0] and release[:len(raw)] == raw
+
+
+def parse_specifiers(text):
+    specs = []
+    for part in (text or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        m = re.match(r'^(===|==|!=|~=|<=|>=|<|>)\s*(\S+)$', part)
+        if not m:
+            raise WarmCacheError(f'Unsupported version specifier {part!r}')
+        specs.append((m.group(1), m.group(2)))
+    return specs
+
+
+def specifier_allows(version, specs):
+    key = parse_pep440(version)
+    if key is None:
+        return False
+    for op, want in specs:
+        if op == '===':
+            ok = version == want
+        elif op in ('==', '!=') and want.endswith('.*'):
+            ok = _release_prefix_match(version, want[:-2]) == (op == '==')
+        elif op == '~=':
+            release = re.match(r'^v?(?:\d+!)?(\d+(?:\.\d+)*)', want).group(1).split('.')
+            ok = key >= parse_pep440(want) and _release_prefix_match(version, '.'.join(release[:-1]))
+        else:
+            bound = parse_pep440(want)
+            if bound is None:
+                raise WarmCacheError(f'Unsupported version {want!r}')
+            if op in ('==', '!='):
+                ok = (key == bound) == (op == '==')
+            elif op == '<':
+                ok = key < bound and not (is_prerelease(key) and not is_prerelease(bound) and key[1] == bound[1])
+            elif op == '>':
+                ok = key > bound and not (key[3] != -_INF and bound[3] == -_INF and key[1] == bound[1])
+            else:
+                ok = key <= bound if op == '<=' else key >= bound
+        if not ok:
+            return False
+    return True
+
+
+def parse_requirement(line):
+    # (name, extras, specifiers, marker) for a PEP 508 line without a URL.
+    m = _REQUIREMENT.match(line.strip())
+    if not m or '@' in (m.group(3) or ''):
+        raise WarmCacheError(f'Unsupported requirement {line.strip()!r}')
+    extras = {canonical_name(e) for e in (m.group(2) or '').split(',') if e.strip()}
+    return m.group(1), extras, parse_specifiers(m.group(3)), (m.group(4) or '').strip() or None
+
+
+def read_requirements(text):
+    requirements = []
+    for line in text.splitlines():
+        line = line.split(' #', 1)[0].strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('-'):
+            raise WarmCacheError(f'Unsupported requirements option {line!r}')
+        requirements.append(parse_requirement(line))
+    return requirements
+
+
+def marker_environment(target=None):
+    target = target or target_platform()
+    return {
+        'python_version': target['python'],
+        'python_full_version': target['pythonFull'],
+        'os_name': 'nt' if target['os'] == 'win32' else 'posix',
+        'sys_platform': sys.platform,
+        'platform_system': {'win32': 'Windows', 'darwin': 'Darwin', 'linux': 'Linux'}.get(target['os'], platform.system()),
+        'platform_machine': platform.machine(),
+        'platform_release': platform.release(),
+        'platform_version': platform.version(),
+        'implementation_name': sys.implementation.name,
+        'implementation_version': platform.python_version(),
+        'platform_python_implementation': platform.python_implementation(),
+        'extra': '',
+    }
+
+
+_MARKER_TOKEN = re.compile(r'\s*(\(|\)|===|==|!=|~=|<=|>=|<|>|not\s+in\b|in\b|and\b|or\b|"[^"]*"|\'[^\']*\'|[A-Za-z_][A-Za-z0-9_.]*)')
+_VERSION_VARS = {'python_version', 'python_full_version', 'implementation_version'}
+
+
+def _tokenize_marker(text):
+    tokens, pos = [], 0
+    while pos < len(text.rstrip()):
+        m = _MARKER_TOKEN.match(text, pos)
+        if not m:
+            raise WarmCacheError(f'Unsupported environment marker {text!r}')
+        tokens.append(re.sub(r'\s+', ' ', m.group(1)))
+        pos = m.end()
+    return tokens
+
+
+def evaluate_marker(text, env):
+    tokens = _tokenize_marker(text)
+    pos = 0
+
+    def value():
+        nonlocal pos
+        token = tokens[pos]
+        pos += 1
+        if token[0] in '"\'':
+            return token[1:-1], None
+        if token not in env:
+            raise WarmCacheError(f'Unknown marker variable {token!r}')
+        return env[token], token
+
+    def comparison():
+        nonlocal pos
+        if tokens[pos] == '(':
+            pos += 1
+            result = disjunction()
+            pos += 1
+            return result
+        (left, left_var), op = value(), tokens[pos]
+        pos += 1
+        right, right_var = value()
+        if 'extra' in (left_var, right_var):
+            left, right = canonical_name(left), canonical_name(right)
+        if op in ('in', 'not in'):
+            return (left in right) == (op == 'in')
+        if {left_var, right_var} & _VERSION_VARS and parse_pep440(left) and parse_pep440(right):
+            return specifier_allows(left, [(op, right)])
+        if op == '==':
+            return left == right
+        if op == '!=':
+            return left != right
+        raise WarmCacheError(f'Cannot compare {left!r} {op} {right!r}')
+
+    def conjunction():
+        nonlocal pos
+        result = comparison()
+        while pos < len(tokens) and tokens[pos] == 'and':
+            pos += 1
+            result = comparison() and result
+        return result
+
+    def disjunction():
+        nonlocal pos
+        result = conjunction()
+        while pos < len(tokens) and tokens[pos] == 'or':
+            pos += 1
+            result = conjunction() or result
+        return result
+
+    return disjunction()
+
+
+def marker_allows(marker, env, extras=()):
+    if not marker:
+        return True
+    return any(evaluate_marker(marker, dict(env, extra=extra)) for extra in (sorted(extras) or ['']))
+
+
+_GLIBC_ALIASES = {'manylinux1': (2, 5), 'manylinux2010': (2, 12), 'manylinux2014': (2, 17)}
+
+
+def _platform_rank(tag, target):
+    # None when a wheel platform tag cannot run on the target, else a rank
+    # (higher is more specific).
+    if tag == 'any':
+        return 0
+    machine = target['machine']
+    if target['os'] == 'linux':
+        arch = {'amd64': 'x86_64', 'arm64': 'aarch64'}.get(machine, machine)
+        m = re.match(r'^(manylinux_(\d+)_(\d+)|manylinux\d*|musllinux_\d+_\d+|linux)_(.+)$', tag)
+        if not m or m.group(4) != arch:
+            return None
+        if tag.startswith('musllinux'):
+            return 1 if target['libc'] == 'musl' else None
+        if tag.startswith('manylinux'):
+            if target['libc'] != 'glibc':
+                return None
+            need = (int(m.group(2)), int(m.group(3))) if m.group(2) else _GLIBC_ALIASES.get(m.group(1))
+            have = tuple(int(x) for x in (target['glibc'] or '0.0').split('.')[:2])
+            return 1 if need and need <= have else None
+        return 1
+    if target['os'] == 'darwin':
+        arch = 'arm64' if machine in ('arm64', 'aarch64') else 'x86_64'
+        return 1 if tag.startswith('macosx_') and tag.endswith((f'_{arch}', '_universal2', '_universal')) else None
+    if target['os'] == 'win32':
+        return 1 if tag == {'amd64': 'win_amd64', 'x86_64': 'win_amd64', 'arm64': 'win_arm64'}.get(machine, 'win32') else None
+    return None
+
+
+def wheel_rank(filename, target):
+    # How well a wheel fits the target interpreter and platform, or None.
+    parts = filename[:-4].split('-')
+    if len(parts) not in (5, 6):
+        return None
+    py_tags, abi_tags, plat_tags = (set(t.split('.')) for t in parts[-3:])
+    major, minor = target['python'].split('.')
+    cp = f'cp{major}{minor}'
+    plat = max((r for r in (_platform_rank(t, target) for t in plat_tags) if r is not None), default=None)
+    if plat is None:
+        return None
+    best = None
+    for py in py_tags:
+        for abi in abi_tags:
+            if abi == 'none' and py in ('py3', f'py{major}{minor}', f'py{major}', cp):
+                rank = 1 if py == cp else 0
+            elif abi == 'abi3' and py.startswith(f'cp{major}') and py[2:].isdigit() and int(py[3:] or 0) <= int(minor):
+                rank = 2
+            elif abi == cp and py == cp:
+                rank = 3
+            else:
+                continue
+            best = max(best if best is not None else rank, rank)
+    return None if best is None else (plat, best)
+
+
+def _pick_file(name, version, files, target):
+    best = None
+    for f in files:
+        if f.get('yanked') or not f['filename'].endswith('.whl'):
+            continue
+        if f.get('requires_python') and not specifier_allows(target['pythonFull'], parse_specifiers(f['requires_python'])):
+            continue
+        rank = wheel_rank(f['filename'], target)
+        if rank is not None and (best is None or rank > best[0]):
+            best = (rank, f)
+    if best is None:
+        # An sdist would need its build backend at install time, which an
+        # offline install cannot fetch.
+        raise WarmCacheError(f'{name} {version}: no wheel for Python {target["python"]} on {target["os"]}/{target["machine"]}')
+    return best[1]
+
+
+def _pick_version(name, releases, specs, target):
+    candidates = []
+    for text, files in releases.items():
+        key = parse_pep440(text)
+        if key is None or not files or all(f.get('yanked') for f in files):
+            continue
+        if specs and not specifier_allows(text, specs):
+            continue
+        if not any(not f.get('requires_python') or specifier_allows(target['pythonFull'], parse_specifiers(f['requires_python']))
+                   for f in files):
+            continue
+        candidates.append((key, text))
+    final = [c for c in candidates if not is_prerelease(c[0])]
+    explicit_pre = any(parse_pep440(v) and is_prerelease(parse_pep440(v)) for _, v in specs if not v.endswith('.*'))
+    pool = candidates if explicit_pre or not final else final
+    if not pool:
+        raise WarmCacheError(f"{name}{','.join(op + v for op, v in specs)}: no matching release")
+    return max(pool)[1]
+
+
+def resolve_pypi(requirements, index, target=None):
+    # Pins every distribution requirements.txt pulls in. Each package's
+    # constraints are kept per dependant, so re-pinning a dependant drops
+    # the constraints its old version contributed; passes repeat until
+    # nothing changes.
+    target = target or target_platform()
+    env = marker_environment(target)
+    constraints = {}
+    extras = {}
+    display = {}
+    pinned = {}
+    for name, wanted, specs, marker in requirements:
+        if marker_allows(marker, env):
+            key = canonical_name(name)
+            constraints.setdefault(key, {})[''] = specs
+            extras.setdefault(key, set()).update(wanted)
+            display.setdefault(key, name)
+    queue = list(constraints)
+    passes = 0
+    while queue:
+        passes += 1
+        if passes > MAX_PASSES:
+            raise WarmCacheError('Dependency resolution did not settle')
+        index.prefetch(f'pypi/{name}/json' for name in queue)
+        key = queue.pop(0)
+        project = index.get_json(f'pypi/{key}/json')
+        if project is None:
+            raise WarmCacheError(f'{display[key]}: not found in {index.url}')
+        specs = [s for per_source in constraints[key].values() for s in per_source]
+        version = _pick_version(display[key], project.get('releases', {}), specs, target)
+        state = (version, frozenset(extras.get(key, ())))
+        if pinned.get(key, (None,))[:2] == state:
+            continue
+        release = index.get_json(f'pypi/{key}/{version}/json')
+        if release is None:
+            raise WarmCacheError(f'{display[key]} {version}: release metadata missing from {index.url}')
+        info = release.get('info', {})
+        display[key] = info.get('name') or display[key]
+        chosen = _pick_file(display[key], version, release.get('urls') or project['releases'][version], target)
+        for dep_constraints in constraints.values():
+            dep_constraints.pop(key, None)
+        for line in info.get('requires_dist') or ():
+            dep, dep_extras, dep_specs, marker = parse_requirement(line)
+            if not marker_allows(marker, env, extras.get(key, ())):
+                continue
+            dep_key = canonical_name(dep)
+            display.setdefault(dep_key, dep)
+            constraints.setdefault(dep_key, {})[key] = dep_specs
+            if not dep_extras <= extras.setdefault(dep_key, set()):
+                extras[dep_key] |= dep_extras
+            queue.append(dep_key)
+        pinned[key] = (version, state[1], chosen)
+    # Keep what is still reachable from requirements.txt; a package only an
+    # earlier pin asked for drops out.
+    children = {}
+    for dep, per_source in constraints.items():
+        for source in per_source:
+            children.setdefault(source, set()).add(dep)
+    wanted, stack = set(), list(children.get('', ()))
+    while stack:
+        key = stack.pop()
+        if key not in wanted:
+            wanted.add(key)
+            stack.extend(children.get(key, ()))
+    return {display[k]: (v, f) for k, (v, _, f) in sorted(pinned.items()) if k in wanted}
+
+
+def pypi_lockfile(pins):
+    lines = [
+        '# Pinned by tools/make_templates.py --warm-cache. Install offline with:',
+        f'#   {PYPI_INSTALL}',
+    ]
+    artifacts = []
+    for name, (version, f) in sorted(pins.items(), key=lambda kv: canonical_name(kv[0])):
+        lines.append(f"{canonical_name(name)}=={version} \\\n    --hash=sha256:{f['digests']['sha256']}")
+        artifacts.append({'path': f"{DEPS_DIR}/{f['filename']}", 'url': f['url'],
+                          'algo': 'sha256', 'digest': f['digests']['sha256'], 'sri': None})
+    return ('\n'.join(lines) + '\n').encode('utf-8'), artifacts
+
+
+# -- packs ----------------------------------------------------------------
+
+def resolve_template(files, registries, target=None):
+    # (ecosystem, lockfile name, lockfile bytes, artifacts) for a rendered
+    # template, or None when it has nothing to install or no mirror was
+    # given for its package manager.
+    kind = ecosystem(files)
+    registry = registries.get(kind)
+    if registry is None:
+        return None
+    target = target or target_platform()
+    if kind == 'npm':
+        manifest = json.loads(files['package.json'])
+        if not any(manifest.get(k) for k in ('dependencies', 'devDependencies', 'optionalDependencies')):
+            return None
+        lock, artifacts = npm_lockfile(manifest, resolve_npm(manifest, registry, target))
+        return kind, NPM_LOCKFILE, lock, artifacts
+    requirements = read_requirements(files['requirements.txt'].decode('utf-8'))
+    if not requirements:
+        return None
+    lock, artifacts = pypi_lockfile(resolve_pypi(requirements, registry, target))
+    return kind, PYPI_LOCKFILE, lock, artifacts
+
+
+def pack_members(template, resolved, registry, target=None):
+    # Zip members for one template's pack: pack.json, the lockfile and one
+    # blobs/<sha256> per distinct artifact. Returns (members, blob names);
+    # blobs are tarballs and wheels, already compressed.
+    kind, lock_name, lock, artifacts = resolved
+    target = target or target_platform()
+    paths = registry.fetch_all(artifacts)
+    files = {}
+    members = {}
+    for artifact, path in zip(artifacts, paths):
+        digest = sha256_path(path)
+        files[artifact['path']] = digest
+        if f'blobs/{digest}' not in members:
+            with open(path, 'rb') as f:
+                members[f'blobs/{digest}'] = f.read()
+    index = {
+        'schemaVersion': PACK_FORMAT,
+        'template': template,
+        'ecosystem': kind,
+        'source': registry.url,
+        'lockfile': lock_name,
+        'install': NPM_INSTALL if kind == 'npm' else PYPI_INSTALL,
+        'platform': {k: target[k] for k in ('os', 'cpu', 'libc', 'python')},
+        'files': dict(sorted(files.items())),
+    }
+    blobs = set(members)
+    members[PACK_INDEX] = (json.dumps(index, indent=2, sort_keys=True) + '\n').encode('utf-8')
+    members[lock_name] = lock
+    return members, blobs
+
+
+def restore_pack(pack_path, dest):
+    # Writes a pack's lockfile and artifacts into a freshly scaffolded
+    # project, checking every blob against its content address first.
+    # Returns the pack index; its 'install' command then runs offline.
+    with zipfile.ZipFile(pack_path) as z:
+        index = json.loads(z.read(PACK_INDEX))
+        if index.get('schemaVersion') != PACK_FORMAT:
+            raise WarmCacheError(f"{pack_path}: unsupported pack format {index.get('schemaVersion')}")
+        writes = [(safe_path(index['lockfile']), z.read(index['lockfile']))]
+        for rel, digest in sorted(index['files'].items()):
+            safe_path(rel)
+            if not rel.startswith(DEPS_DIR + '/'):
+                raise WarmCacheError(f'{pack_path}: {rel} is outside {DEPS_DIR}')
+            data = z.read(f'blobs/{digest}')
+            if hashlib.sha256(data).hexdigest() != digest:
+                raise WarmCacheError(f'{pack_path}: blob {digest} is corrupt')
+            writes.append((rel, data))
+    for rel, data in writes:
+        path = os.path.join(dest, *rel.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return index
+
+
+def pack_name(template):
+    return f'{template}.deps.zip'
+
+
+def default_registries(npm_registry=None, pypi_index=None, cache_dir=CACHE_DIR, jobs=DEFAULT_JOBS):
+    registries = {}
+    if npm_registry:
+        registries['npm'] = Registry(npm_registry, cache_dir, jobs, NPM_ACCEPT)
+    if pypi_index:
+        registries['pypi'] = Registry(pypi_index, cache_dir, jobs)
+    return registries
+